@@ -34,7 +34,12 @@ ALLOWED_HOSTS = []
 SITE_ID = 1
 
 
-REST_USE_JWT = True
+# dj-rest-auth 3+ reads USE_JWT from REST_AUTH (REST_USE_JWT is ignored), so
+# login used to hand out DRF tokens; this also adds /api/auth/token/refresh/.
+REST_AUTH = {
+   'USE_JWT': True,
+   'JWT_AUTH_HTTPONLY': False,
+}
 ACCOUNT_EMAIL_REQUIRED = False
 ACCOUNT_USERNAME_REQUIRED = True
 ACCOUNT_AUTHENTICATION_METHOD = 'username'
@@ -80,6 +85,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+  'student_app.middleware.RequestMetricsMiddleware',
+  'student_app.routers.ReplicaRoutingMiddleware',
   'django.middleware.security.SecurityMiddleware',
   'django.contrib.sessions.middleware.SessionMiddleware',
   'django.middleware.common.CommonMiddleware',
@@ -117,15 +124,126 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 CACHE_TTL = 60 * 15  # 15 minutes
 
 
+# Cache alias holding serialized object representations (student_app.object_cache)
+OBJECT_CACHE_ALIAS = 'default'
+
+
+# Notification outbox worker (python manage.py send_notifications)
+NOTIFICATION_BATCH_SIZE = 500
+NOTIFICATION_CONCURRENCY = 1
+NOTIFICATION_MAX_ATTEMPTS = 5
+# Seconds after its last checkpoint before a job left PROCESSING by a worker
+# that died is claimed again.
+NOTIFICATION_CLAIM_TIMEOUT = 900
+
+
+# POST /api/enrollments/bulk/
+BULK_ENROLLMENT_MAX_ROWS = 50000
+BULK_ENROLLMENT_CHUNK_SIZE = 2000
+
+
+# POST /api/courses/<pk>/gradebook/
+GRADEBOOK_IMPORT_CHUNK_SIZE = 2000
+
+
+# Course and global leaderboards (student_app.leaderboard): Redis sorted sets
+# when this cache alias uses django-redis, otherwise an in-process stand-in.
+LEADERBOARD_CACHE_ALIAS = 'default'
+LEADERBOARD_MAX_LIMIT = 100
+
+
+# GET /api/search/ (student_app.search). Queries matching more documents than
+# this are returned newest first instead of scoring every match.
+SEARCH_RANK_LIMIT = 5000
+
+
+# GET /api/courses/ is served from a pre-rendered in-memory snapshot
+# (student_app.catalog), rebuilt once per process after courses change.
+CATALOG_SNAPSHOT_ENABLED = True
+
+
+# Password hashing. The cost applies to new hashes; stored hashes with another
+# iteration count (or an older hasher) are upgraded on the next successful
+# login. `python manage.py benchmark_auth` shows what a cost means for login
+# latency.
+PASSWORD_PBKDF2_ITERATIONS = 1_000_000
+PASSWORD_HASHERS = [
+   'student_app.hashers.PBKDF2PasswordHasher',
+   'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+   'django.contrib.auth.hashers.Argon2PasswordHasher',
+   'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+   'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+
+# JWT-authenticated requests reuse the user loaded by an earlier request for
+# this many seconds (student_app.authentication; 0 disables).
+AUTH_PRINCIPAL_CACHE_TTL = 60
+
+
+# POST /api/persons/import/ and `python manage.py import_people`. Password
+# hashes are computed in PERSON_IMPORT_WORKERS processes (0: in process).
+PERSON_IMPORT_MAX_ROWS = 5000
+PERSON_IMPORT_CHUNK_SIZE = 1000
+PERSON_IMPORT_WORKERS = 0
+
+
+# GET /api/courses/<pk>/also-took/ and /similar/ (student_app.coenrollment).
+# Each process reloads its index after COENROLLMENT_MAX_AGE seconds and folds
+# its own enrollment writes in meanwhile, compacting after
+# COENROLLMENT_COMPACT_AFTER of them. With COENROLLMENT_INDEX_PATH set, the
+# index is memory-mapped from the files `python manage.py
+# build_coenrollment_index` writes there instead of read from the database,
+# and the periodic reload only happens when a newer build is there.
+COENROLLMENT_MAX_AGE = 600
+COENROLLMENT_COMPACT_AFTER = 10000
+COENROLLMENT_INDEX_PATH = None
+
+
+# GET /api/courses/marks-report/ (student_app.analytics). Each process keeps
+# the StudentCourse columns in memory for MARKS_ANALYTICS_MAX_AGE seconds;
+# terms are MARKS_TERM_MONTHS long counting from January, and a mark falls in
+# the first grade band whose minimum it reaches.
+MARKS_ANALYTICS_MAX_AGE = 300
+MARKS_TERM_MONTHS = 6
+MARKS_GRADE_BANDS = (('A', 90), ('B', 80), ('C', 70), ('D', 60), ('F', 0))
+
+
+# GET /api/instructors/analytics/ (student_app.analytics); recompute early
+# with `python manage.py refresh_instructor_analytics`.
+INSTRUCTOR_ANALYTICS_TTL = 60 * 15
+
+
+# Per-request instrumentation (student_app.middleware.RequestMetricsMiddleware),
+# exported at /api/internal/metrics/. A request that runs the same SQL statement
+# this many times is logged as a likely N+1. Every request is logged as one
+# JSON line at REQUEST_METRICS_LOG_LEVEL; the default WARNING keeps only the
+# N+1 warnings, INFO logs them all.
+REQUEST_METRICS_ENABLED = True
+REQUEST_METRICS_N_PLUS_ONE_THRESHOLD = 10
+REQUEST_METRICS_LOG_LEVEL = 'WARNING'
+
+LOGGING = {
+   'version': 1,
+   'disable_existing_loggers': False,
+   'handlers': {
+       'console': {'class': 'logging.StreamHandler'},
+   },
+   'loggers': {
+       'student_app.metrics': {'handlers': ['console'], 'level': REQUEST_METRICS_LOG_LEVEL, 'propagate': False},
+   },
+}
+
+
 REST_FRAMEWORK = {
    'DEFAULT_AUTHENTICATION_CLASSES': [
-       'rest_framework_simplejwt.authentication.JWTAuthentication',
+       'student_app.authentication.CachedJWTAuthentication',
        'rest_framework.authentication.TokenAuthentication',
    ],
    'DEFAULT_PERMISSION_CLASSES': [
        'rest_framework.permissions.IsAuthenticated',
    ],
-   'DEFAULT_PAGINATION_CLASS': 'student_app.pagination.StandardResultsSetPagination',
+   'DEFAULT_PAGINATION_CLASS': 'student_app.pagination.StandardCursorPagination',
    'PAGE_SIZE': 5,
 }
 
@@ -161,13 +279,69 @@ WSGI_APPLICATION = 'student.wsgi.application'
 
 
 
+# SQLite tuning: WAL lets readers run alongside the single writer, IMMEDIATE
+# transactions take the write lock up front (a deferred read-then-write can
+# fail with "database is locked" regardless of the timeout), and writers wait
+# up to `timeout` seconds for it. Connections are kept for CONN_MAX_AGE
+# seconds and pinged before reuse (set it to 0 when serving through ASGI,
+# where Django does not manage persistent connections).
+# `python manage.py benchmark_sqlite_writes` compares this with the defaults.
+SQLITE_OPTIONS = {
+  'init_command': (
+      'PRAGMA journal_mode=WAL;'
+      'PRAGMA synchronous=NORMAL;'
+      'PRAGMA cache_size=-20000;'
+      'PRAGMA mmap_size=134217728;'
+      'PRAGMA temp_store=MEMORY;'
+  ),
+  'transaction_mode': 'IMMEDIATE',
+  'timeout': 10,
+}
+
 DATABASES = {
   'default': {
       'ENGINE': 'django.db.backends.sqlite3',
       'NAME': BASE_DIR / 'db.sqlite3',
+      'OPTIONS': SQLITE_OPTIONS,
+      'CONN_MAX_AGE': 600,
+      'CONN_HEALTH_CHECKS': True,
   }
 }
 
+# Queue the write-heavy endpoints (enrollments, reviews, gradebook imports)
+# of one process on a lock (student_app.writes) instead of the busy handler.
+SQLITE_SERIALIZE_WRITES = True
+
+
+# Read replicas (student_app.routers). Safe requests read from these aliases
+# unless the client wrote within REPLICA_STICKY_SECONDS. Locally, set
+# SQLITE_REPLICAS to create file copies of the primary, refreshed with
+# `python manage.py sync_replicas`; tests mirror them onto default.
+SQLITE_REPLICAS = 0
+DATABASE_REPLICAS = []
+
+def _sqlite_replica(index):
+  return {
+      'ENGINE': 'django.db.backends.sqlite3',
+      'NAME': BASE_DIR / f'db.replica{index}.sqlite3',
+      'OPTIONS': SQLITE_OPTIONS,
+      'CONN_MAX_AGE': 600,
+      'CONN_HEALTH_CHECKS': True,
+      'TEST': {'MIRROR': 'default'},
+  }
+
+for index in range(1, SQLITE_REPLICAS + 1):
+  DATABASES[f'replica{index}'] = _sqlite_replica(index)
+  DATABASE_REPLICAS.append(f'replica{index}')
+# replica1 is always declared, but nothing reads from it unless it is listed in
+# DATABASE_REPLICAS; the routing tests list it with override_settings. Under
+# test it mirrors default on its own connection, so other tests keep reading
+# their uncommitted rows from default.
+DATABASES.setdefault('replica1', _sqlite_replica(1))
+
+DATABASE_ROUTERS = ['student_app.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 5
+
 
 
 
@@ -0,0 +1,67 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, DateField, F, Q
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+# "Recent" windows and time-bucketed counts for the dashboard endpoints.
+# A window is [since, until); both bounds are index range conditions on
+# the timestamp column, never a comparison of a column with itself.
+DEFAULT_WINDOW_DAYS = 30
+BUCKETS = ('day', 'week')
+
+
+def _parse_bound(value, name):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'{name} must be an ISO 8601 date or datetime')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_window(params, default_days=DEFAULT_WINDOW_DAYS):
+    # ?since=2024-01-01&until=2024-02-01; since defaults to default_days ago.
+    since = params.get('since')
+    until = params.get('until')
+    since = _parse_bound(since, 'since') if since else timezone.now() - timedelta(days=default_days)
+    until = _parse_bound(until, 'until') if until else None
+    if until is not None and until <= since:
+        raise ValueError('until must be later than since')
+    return since, until
+
+
+def window_filter(field, since, until, date_only=False):
+    # DateField columns compare against dates; a partial first day counts.
+    if date_only:
+        since = timezone.localdate(since)
+        until = None if until is None else timezone.localdate(until - timedelta(microseconds=1)) + timedelta(days=1)
+    condition = Q(**{f'{field}__gte': since})
+    if until is not None:
+        condition &= Q(**{f'{field}__lt': until})
+    return condition
+
+
+def parse_bucket(params):
+    bucket = params.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        raise ValueError(f'bucket must be one of {", ".join(BUCKETS)}')
+    return bucket
+
+
+def bucket_counts(queryset, field, bucket, date_only=False):
+    # One GROUP BY over the window; days (or Monday-starting weeks) without
+    # rows are left out.
+    if bucket == 'week':
+        period = TruncWeek(field, output_field=DateField())
+    elif date_only:
+        period = F(field)
+    else:
+        period = TruncDate(field)
+    rows = queryset.annotate(period=period).values('period').annotate(count=Count('pk')).order_by('period')
+    return [{'period': row['period'], 'count': row['count']} for row in rows]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from student_app.models import Student, Instructor, Course, Module, Enrollment, Review, Person, Profile, StudentCourse
+from student_app.models import Student, Instructor, Course, Module, Enrollment, Review, Person, Profile, StudentCourse, Notification
 
 admin.site.register(Student)
 admin.site.register(Instructor)
@@ -10,6 +10,7 @@ admin.site.register(Review)
 admin.site.register(Person)  
 admin.site.register(Profile)   
 admin.site.register(StudentCourse)   
+admin.site.register(Notification)
 
 
 
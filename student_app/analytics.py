@@ -0,0 +1,293 @@
+import itertools
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Course, Instructor, StudentCourse
+from .object_cache import cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Instructor salary and workload figures for the admin dashboard, computed
+# in one aggregate query and cached for INSTRUCTOR_ANALYTICS_TTL seconds
+# (refresh_instructor_analytics recomputes them on demand).
+INSTRUCTOR_KEY = 'analytics:instructors'
+SALARY_PERCENTILES = (25, 50, 75, 90)
+
+_lock = threading.Lock()
+
+
+def percentile(ordered, percent):
+    # Linear interpolation between closest ranks, like numpy's default.
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _summary(values):
+    if not values:
+        return {'mean': None, 'max': None}
+    return {'mean': round(sum(values) / len(values), 2), 'max': max(values)}
+
+
+def compute_instructor_analytics():
+    # Course counters come from the CourseStats rollups; distinct students
+    # are a correlated subquery, so the whole pass is a single statement.
+    students = (
+        StudentCourse.objects.filter(course__instructor=OuterRef('pk'))
+        .order_by().values('course__instructor')
+        .annotate(total=Count('student', distinct=True)).values('total')
+    )
+    rows = list(
+        Instructor.objects.order_by('-salary', 'pk')
+        .annotate(
+            course_count=Count('courses'),
+            enrollment_count=Coalesce(Sum('courses__stats__enrollment_count'), 0),
+            review_count=Coalesce(Sum('courses__stats__review_count'), 0),
+            rating_sum=Coalesce(Sum('courses__stats__rating_sum'), 0),
+            student_count=Coalesce(Subquery(students, output_field=IntegerField()), 0),
+        )
+        .values(
+            'pk', 'person__email', 'person__first_name', 'person__last_name', 'salary',
+            'course_count', 'enrollment_count', 'review_count', 'rating_sum', 'student_count',
+        )
+    )
+
+    instructors = [
+        {
+            'id': row['pk'],
+            'email': row['person__email'],
+            'first_name': row['person__first_name'],
+            'last_name': row['person__last_name'],
+            'salary': float(row['salary']),
+            'courses': row['course_count'],
+            'students': row['student_count'],
+            'enrollments': row['enrollment_count'],
+            'reviews': row['review_count'],
+            'average_rating': round(row['rating_sum'] / row['review_count'], 2) if row['review_count'] else None,
+        }
+        for row in rows
+    ]
+    salaries = sorted(instructor['salary'] for instructor in instructors)
+    salary = {'min': salaries[0] if salaries else None, 'max': salaries[-1] if salaries else None}
+    salary.update((f'p{percent}', percentile(salaries, percent)) for percent in SALARY_PERCENTILES)
+    salary['mean'] = round(sum(salaries) / len(salaries), 2) if salaries else None
+    return {
+        'generated_at': timezone.now().isoformat(),
+        'instructor_count': len(instructors),
+        'salary': salary,
+        'courses_per_instructor': _summary([instructor['courses'] for instructor in instructors]),
+        'students_per_instructor': _summary([instructor['students'] for instructor in instructors]),
+        'instructors': instructors,
+    }
+
+
+def refresh_instructor_analytics():
+    analytics = compute_instructor_analytics()
+    cache().set(INSTRUCTOR_KEY, analytics, getattr(settings, 'INSTRUCTOR_ANALYTICS_TTL', 900))
+    return analytics
+
+
+def instructor_analytics():
+    analytics = cache().get(INSTRUCTOR_KEY)
+    if analytics is not None:
+        return analytics
+    # One recomputation per process when the cached copy expires.
+    with _lock:
+        analytics = cache().get(INSTRUCTOR_KEY)
+        if analytics is None:
+            analytics = refresh_instructor_analytics()
+    return analytics
+
+
+# Marks reports: StudentCourse loaded into columnar arrays (student, course,
+# marks, enrollment day) and summarized per group in one pass. Marks are
+# integers in 0..100, so each group is reduced to a 101-bin histogram with a
+# single bincount; counts, moments, percentiles, grade bands and the
+# distribution all come from the histograms, without sorting any rows.
+# Columns are cached per process for MARKS_ANALYTICS_MAX_AGE seconds.
+MARKS_GROUPS = ('course', 'term', 'course_term')
+MARK_PERCENTILES = (25, 50, 75, 90)
+DEFAULT_GRADE_BANDS = (('A', 90), ('B', 80), ('C', 70), ('D', 60), ('F', 0))
+_MARK_VALUES = 101
+
+_columns = None
+_columns_loaded_at = 0.0
+_columns_lock = threading.Lock()
+
+
+def load_marks(queryset=None, chunk_size=100000):
+    queryset = (StudentCourse.objects.all() if queryset is None else queryset).filter(marks__isnull=False).order_by()
+    rows = queryset.values_list('student_id', 'course_id', 'marks', 'date_enrolled').iterator(chunk_size=chunk_size)
+    parts = []
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        students, courses, marks, days = zip(*chunk)
+        parts.append((
+            np.array(students, dtype=np.int64), np.array(courses, dtype=np.int64),
+            np.array(marks, dtype=np.int16), np.array(days, dtype='datetime64[D]'),
+        ))
+    if not parts:
+        return {
+            'student': np.zeros(0, dtype=np.int64), 'course': np.zeros(0, dtype=np.int64),
+            'marks': np.zeros(0, dtype=np.int16), 'day': np.zeros(0, dtype='datetime64[D]'),
+        }
+    return {name: np.concatenate([part[index] for part in parts]) for index, name in enumerate(('student', 'course', 'marks', 'day'))}
+
+
+def marks_columns():
+    global _columns, _columns_loaded_at
+    with _columns_lock:
+        if _columns is None or time.time() - _columns_loaded_at > getattr(settings, 'MARKS_ANALYTICS_MAX_AGE', 300):
+            _columns, _columns_loaded_at = load_marks(), time.time()
+        return _columns
+
+
+def invalidate_marks():
+    global _columns
+    with _columns_lock:
+        _columns = None
+
+
+def terms(days, months=None):
+    # Terms of `months` months from January, as an index and a label ('2024-T1').
+    # The month of each day comes from a table over the span of days, which is
+    # much cheaper than a datetime64 conversion per row.
+    months = months or getattr(settings, 'MARKS_TERM_MONTHS', 6)
+    days = days.astype(np.int64)
+    if len(days):
+        first = days.min()
+        table = np.arange(first, days.max() + 1).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        index = table[days - first] // months
+    else:
+        index = days
+    return index, lambda term: f'{1970 + term * months // 12}-T{term * months % 12 // months + 1}'
+
+
+def _dense(keys):
+    # np.unique(keys, return_inverse=True) for small non-negative integer keys
+    # (ids, term indices) in linear time instead of a sort.
+    if not len(keys):
+        return keys, keys
+    first = keys.min()
+    present = np.bincount(keys - first) > 0
+    return np.flatnonzero(present) + first, (np.cumsum(present) - 1)[keys - first]
+
+
+def _rank_values(cumulative, ranks):
+    # Mark at 0-based rank k in each group: the first bin whose cumulative count exceeds k.
+    return (cumulative > ranks[:, None]).argmax(axis=1)
+
+
+def histogram_statistics(histograms, bands=DEFAULT_GRADE_BANDS):
+    # histograms: (groups, 101) counts of each mark per group.
+    values = np.arange(_MARK_VALUES, dtype=np.float64)
+    count = histograms.sum(axis=1)
+    safe = np.maximum(count, 1)
+    mean = histograms @ values / safe
+    variance = np.maximum(histograms @ (values * values) / safe - mean * mean, 0)
+    cumulative = histograms.cumsum(axis=1)
+    statistics = {
+        'count': count,
+        'mean': mean,
+        'std': np.sqrt(variance),
+        'min': (histograms > 0).argmax(axis=1),
+        'max': _MARK_VALUES - 1 - (histograms[:, ::-1] > 0).argmax(axis=1),
+    }
+    for percent in MARK_PERCENTILES:
+        # Linear interpolation between closest ranks, like numpy's default.
+        position = (count - 1).clip(min=0) * percent / 100
+        lower, upper = np.floor(position).astype(np.int64), np.ceil(position).astype(np.int64)
+        low, high = _rank_values(cumulative, lower), _rank_values(cumulative, upper)
+        statistics[f'p{percent}'] = low + (high - low) * (position - lower)
+    edges = [minimum for _, minimum in bands]
+    upper_edges = [_MARK_VALUES] + edges[:-1]
+    statistics['bands'] = {
+        label: histograms[:, minimum:upper].sum(axis=1) for (label, minimum), upper in zip(bands, upper_edges)
+    }
+    # Ten-mark buckets; 100 counts towards the last one.
+    distribution = histograms[:, :100].reshape(len(histograms), 10, 10).sum(axis=2)
+    distribution[:, -1] += histograms[:, 100]
+    statistics['distribution'] = distribution
+    return statistics
+
+
+def grouped_marks(columns, group='course', mask=None):
+    # Returns (group keys, term labeller, statistics); keys are course ids,
+    # term indices or (course id, term index) pairs.
+    courses, marks = columns['course'], columns['marks']
+    term_index, label = terms(columns['day']) if group != 'course' else (None, None)
+    if mask is not None:
+        courses, marks = courses[mask], marks[mask]
+        term_index = None if term_index is None else term_index[mask]
+    if group == 'course':
+        unique, inverse = _dense(courses)
+    elif group == 'term':
+        unique, inverse = _dense(term_index)
+    else:
+        course_keys, course_inverse = _dense(courses)
+        term_keys, term_inverse = _dense(term_index)
+        pairs, inverse = _dense(course_inverse * len(term_keys) + term_inverse)
+        unique = np.stack([course_keys[pairs // len(term_keys)], term_keys[pairs % len(term_keys)]], axis=1)
+    histograms = np.bincount(
+        inverse * _MARK_VALUES + marks.clip(0, _MARK_VALUES - 1), minlength=len(unique) * _MARK_VALUES,
+    ).reshape(len(unique), _MARK_VALUES)
+    bands = tuple(getattr(settings, 'MARKS_GRADE_BANDS', DEFAULT_GRADE_BANDS))
+    keys = [tuple(pair) for pair in unique.tolist()] if group == 'course_term' else unique.tolist()
+    return keys, label, histogram_statistics(histograms, bands)
+
+
+def marks_report(group='course', course_ids=None, since=None, until=None, columns=None):
+    if np is None:
+        raise RuntimeError('Marks reports require NumPy.')
+    columns = marks_columns() if columns is None else columns
+    mask = None
+    if course_ids:
+        mask = np.isin(columns['course'], list(course_ids))
+    if since is not None or until is not None:
+        days = columns['day']
+        window = np.ones(len(days), dtype=bool)
+        if since is not None:
+            window &= days >= np.datetime64(since, 'D')
+        if until is not None:
+            window &= days < np.datetime64(until, 'D')
+        mask = window if mask is None else mask & window
+    keys, label, statistics = grouped_marks(columns, group, mask)
+
+    names = {}
+    if group != 'term':
+        course_keys = keys if group == 'course' else [course for course, _ in keys]
+        names = dict(Course.objects.filter(pk__in=set(course_keys)).values_list('pk', 'name'))
+    rows = []
+    for index, key in enumerate(keys):
+        row = {}
+        if group == 'course':
+            row.update(course=key, name=names.get(key))
+        elif group == 'term':
+            row['term'] = label(key)
+        else:
+            row.update(course=key[0], name=names.get(key[0]), term=label(key[1]))
+        row['count'] = int(statistics['count'][index])
+        row['mean'] = round(float(statistics['mean'][index]), 2)
+        row['std'] = round(float(statistics['std'][index]), 2)
+        row['min'] = int(statistics['min'][index])
+        for percent in MARK_PERCENTILES:
+            row[f'p{percent}'] = round(float(statistics[f'p{percent}'][index]), 2)
+        row['max'] = int(statistics['max'][index])
+        row['bands'] = {band: int(counts[index]) for band, counts in statistics['bands'].items()}
+        row['distribution'] = statistics['distribution'][index].tolist()
+        rows.append(row)
+    return rows
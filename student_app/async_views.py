@@ -0,0 +1,114 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Avg, Max, Min, Sum
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from . import catalog
+from .conditional import representation_version
+from .decorators import handle_async_exceptions
+from .models import Course, Review, Student, StudentCourse
+from .pagination import StandardCursorPagination
+from .serializers import CourseSerializer
+from .views import CourseViewSet
+
+
+# Async (ASGI-native) variants of the hot read endpoints under /api/async/.
+# They return the same payloads as their viewset counterparts but await the
+# ORM instead of holding a worker thread, so under an ASGI server a request
+# only occupies a thread while a query actually runs.
+
+
+def _authenticate(request):
+    user = request.user
+    if not user or not user.is_authenticated:
+        raise NotAuthenticated()
+
+
+def async_api_view(view):
+    # GET-only async view behind the project's REST_FRAMEWORK authenticators
+    # and IsAuthenticated; Response objects are rendered as JSON.
+    view = handle_async_exceptions(view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+            try:
+                # Token and session lookups are synchronous ORM calls.
+                await sync_to_async(_authenticate)(request)
+            except (AuthenticationFailed, NotAuthenticated) as e:
+                # Same body as DRF's exception handler gives the viewsets.
+                response = Response(e.detail if isinstance(e.detail, dict) else {'detail': e.detail}, status=status.HTTP_401_UNAUTHORIZED)
+                if request.authenticators:
+                    response['WWW-Authenticate'] = request.authenticators[0].authenticate_header(request)
+            else:
+                response = await view(request, *args, **kwargs)
+        else:
+            response = Response({'error': f'Method "{request.method}" not allowed.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        if isinstance(response, Response):
+            response.accepted_renderer = JSONRenderer()
+            response.accepted_media_type = 'application/json'
+            response.renderer_context = {}
+        return response
+    return wrapper
+
+
+def _visible_students():
+    # Same rows as StudentViewSet.get_queryset().
+    return Student.objects.filter(courses__name='Mathematics').exclude(registration_number__startswith='2022')
+
+
+@async_api_view
+async def course_list(request):
+    paginator = StandardCursorPagination()
+    if getattr(settings, 'CATALOG_SNAPSHOT_ENABLED', True):
+        return catalog.list_response(request, paginator, await catalog.acurrent())
+    queryset = catalog.queryset().select_related('instructor__person')
+    page = await paginator.apaginate_queryset(queryset, request, view=CourseViewSet)
+    # Serializing consults the object cache, which is blocking I/O.
+    data = await sync_to_async(lambda: CourseSerializer(page, many=True).data)()
+    return paginator.get_paginated_response(data)
+
+
+@async_api_view
+async def course_detail(request, pk):
+    try:
+        course = await catalog.queryset().select_related('instructor__person').aget(pk=pk)
+    except Course.DoesNotExist:
+        raise Http404('No Course matches the given query.')
+    etag, last_modified = representation_version(course, CourseSerializer)
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is None:
+        response = Response(await sync_to_async(lambda: CourseSerializer(course).data)())
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_vary_headers(response, ('Accept', 'Authorization'))
+    return response
+
+
+@async_api_view
+async def student_marks(request, pk):
+    visible, marks = await asyncio.gather(
+        _visible_students().filter(pk=pk).aexists(),
+        StudentCourse.objects.filter(student_id=pk).aaggregate(Avg('marks'), Min('marks'), Max('marks'), Sum('marks')),
+    )
+    if not visible:
+        raise Http404('No Student matches the given query.')
+    return Response(marks, status=status.HTTP_200_OK)
+
+
+@async_api_view
+async def review_statistics(request):
+    statistics = await Review.objects.aaggregate(Avg('rating'), Min('rating'), Max('rating'), Sum('rating'))
+    return Response(statistics, status=status.HTTP_200_OK)
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .object_cache import cache
+
+
+# JWT authentication that keeps the authenticated user in the object cache for
+# AUTH_PRINCIPAL_CACHE_TTL seconds instead of loading it on every request.
+# Only the fields that authentication and permission checks read are cached;
+# the rest of the user (the password hash included) stays deferred and loads
+# from the database if something touches it.
+# signals.invalidate_cached_principal drops the entry whenever the user row
+# is saved or deleted (deactivation, password change, last_login, ...). A
+# queryset .update() sends no signal: after one, call invalidate_principal()
+# for the affected users or the old fields stay in use for up to the TTL.
+PRINCIPAL_FIELDS = ('username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _principal_key(user_id):
+    return f'auth:principal:v2:{user_id}'
+
+
+def _principal_fields(model):
+    return [field.attname for field in model._meta.concrete_fields if field.primary_key or field.name in PRINCIPAL_FIELDS]
+
+
+def invalidate_principal(user_id):
+    transaction.on_commit(lambda: cache().delete(_principal_key(user_id)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        ttl = getattr(settings, 'AUTH_PRINCIPAL_CACHE_TTL', 60)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if not ttl or user_id is None or api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        model = get_user_model()
+        fields = _principal_fields(model)
+        key = _principal_key(user_id)
+        values = cache().get(key)
+        if values is None:
+            user = super().get_user(validated_token)
+            cache().set(key, [getattr(user, field) for field in fields], ttl)
+            return user
+        user = model.from_db(DEFAULT_DB_ALIAS, fields, values)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+
+
+# Signal batch scope. A job that writes row by row through the ORM (a loop of
+# save() calls, a queryset delete() with receivers attached) pays every
+# receiver in student_app.signals once per row. Inside `with batch():` the
+# receivers that support it defer their work to the scope instead, and at the
+# end of the scope each kind of work runs once over everything collected:
+# validation in a few queries, counter deltas summed per course, one
+# notification per course. The scope is a transaction, so a validation error
+# raised at the end rolls back every write made in it.
+_current = ContextVar('signal_batch', default=None)
+
+
+class Batch:
+    def __init__(self):
+        # flush function -> items, in the order the first item arrived.
+        self._pending = {}
+
+    def defer(self, flush, item):
+        self._pending.setdefault(flush, []).append(item)
+
+    def flush(self):
+        while self._pending:
+            flush = next(iter(self._pending))
+            flush(self._pending.pop(flush))
+
+
+def active():
+    return _current.get() is not None
+
+
+def defer(flush, item):
+    # flush(items) runs once at the end of the scope. Returns False outside a
+    # batch, where the receiver should do the work itself.
+    scope = _current.get()
+    if scope is None:
+        return False
+    scope.defer(flush, item)
+    return True
+
+
+@contextmanager
+def batch(using=None):
+    # Nested scopes join the outermost one.
+    if _current.get() is not None:
+        yield _current.get()
+        return
+    scope = Batch()
+    token = _current.set(scope)
+    with transaction.atomic(using=using):
+        try:
+            yield scope
+        finally:
+            _current.reset(token)
+        # Outside the scope, so writes made while flushing fire their receivers normally.
+        scope.flush()
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from asgiref.sync import sync_to_async
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param
+
+from .models import Course
+from .object_cache import cache
+from .serializers import CourseSerializer
+
+
+# The course list (GET /api/courses/) served from an in-memory snapshot: each
+# course pre-rendered to JSON bytes, sorted by the list's cursor ordering
+# (name, id). Writes that can change the list bump a generation in the
+# shared cache; each process rebuilds its snapshot once per generation.
+GENERATION_KEY = 'catalog:generation'
+ORDERING = ('name', 'id')
+
+_renderer = JSONRenderer()
+
+
+class Snapshot:
+    __slots__ = ('generation', 'keys', 'documents', 'built_at', 'build_seconds')
+
+    def __init__(self, generation, keys, documents, build_seconds):
+        self.generation = generation
+        self.keys = keys
+        self.documents = documents
+        self.built_at = time.time()
+        self.build_seconds = build_seconds
+
+
+_snapshot = None
+_build_lock = threading.Lock()
+_builds = 0
+
+
+def queryset():
+    # Same rows as CourseViewSet.get_queryset().
+    return Course.objects.filter(instructor__salary__gte=50000).exclude(description='Deprecated Course')
+
+
+def _generation():
+    store = cache()
+    generation = store.get(GENERATION_KEY)
+    if generation is None:
+        store.add(GENERATION_KEY, os.urandom(8).hex(), timeout=None)
+        generation = store.get(GENERATION_KEY)
+    return generation
+
+
+def _build(generation):
+    global _builds
+    started = time.perf_counter()
+    # Built from the primary: a lagging replica would pin stale rows to the
+    # new generation until the next write.
+    courses = queryset().using(DEFAULT_DB_ALIAS).select_related('instructor__person').order_by(*ORDERING)
+    # The snapshot replaces the per-object cache for these rows; rendering
+    # through it would only fill (and, in a bounded cache, evict) entries.
+    represent = CourseSerializer.to_representation.__wrapped__
+    keys, documents = [], []
+    for course in courses.iterator(chunk_size=2000):
+        keys.append((course.name, course.id))
+        documents.append(_renderer.render(represent(CourseSerializer(), course)))
+    _builds += 1
+    return Snapshot(generation, keys, documents, time.perf_counter() - started)
+
+
+def current():
+    global _snapshot
+    generation = _generation()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.generation == generation:
+        return snapshot
+    # Single flight: concurrent misses wait for one rebuild instead of each
+    # running the catalog queries.
+    with _build_lock:
+        snapshot = _snapshot
+        if snapshot is None or snapshot.generation != generation:
+            snapshot = _snapshot = _build(generation)
+    return snapshot
+
+
+async def acurrent():
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.generation == await cache().aget(GENERATION_KEY):
+        return snapshot
+    return await sync_to_async(current)()
+
+
+def invalidate():
+    # After commit, so no process can rebuild from the old rows and keep the
+    # result under the new generation.
+    transaction.on_commit(lambda: cache().set(GENERATION_KEY, os.urandom(8).hex(), timeout=None))
+
+
+def stats():
+    snapshot = _snapshot
+    return {
+        'builds': _builds,
+        'courses': len(snapshot.keys) if snapshot else 0,
+        'bytes': sum(map(len, snapshot.documents)) if snapshot else 0,
+        'build_ms': round(snapshot.build_seconds * 1000, 2) if snapshot else None,
+    }
+
+
+def reset():
+    global _snapshot, _builds
+    with _build_lock:
+        _snapshot, _builds = None, 0
+
+
+def list_response(request, paginator, snapshot=None):
+    # Same cursor pages and links as StandardCursorPagination over queryset().
+    snapshot = snapshot or current()
+    paginator.page_size = paginator.get_page_size(request)
+    paginator.base_url = request.build_absolute_uri()
+    paginator.ordering = ORDERING
+    values, reverse = paginator.decode_cursor(request)
+    keys = snapshot.keys
+    try:
+        position = None if values is None else tuple(values)
+        if reverse:
+            end = len(keys) if position is None else bisect_left(keys, position)
+            start = max(0, end - paginator.page_size)
+            has_next, has_previous = position is not None, start > 0
+        else:
+            start = 0 if position is None else bisect_right(keys, position)
+            end = min(len(keys), start + paginator.page_size)
+            has_next, has_previous = end < len(keys), position is not None
+    except TypeError:
+        raise NotFound(paginator.invalid_cursor_message)
+
+    next_link = paginator._link(list(keys[end - 1]), reverse=False) if has_next and end > start else None
+    previous_link = None
+    if has_previous:
+        if end > start:
+            previous_link = paginator._link(list(keys[start]), reverse=True)
+        else:
+            previous_link = remove_query_param(paginator.base_url, paginator.cursor_query_param)
+
+    envelope = _renderer.render({'next': next_link, 'previous': previous_link})
+    body = b''.join([envelope[:-1], b',"results":[', b','.join(snapshot.documents[start:end]), b']}'])
+    return HttpResponse(body, content_type='application/json')
@@ -0,0 +1,421 @@
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Enrollment
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Co-enrollment index over Enrollment ("students who took this course also
+# took"). Enrollments are held as two CSR adjacency arrays, course -> students
+# and student -> courses, over dense indices; the co-enrollment counts of a
+# course are then one vectorized gather over its students' course lists.
+#
+# Each process keeps its own index: loaded on first use (from the database,
+# or memory-mapped from the files `build_coenrollment_index` writes to
+# COENROLLMENT_INDEX_PATH), kept current with this process's enrollment
+# writes through an overlay of added/removed pairs, and reloaded after
+# COENROLLMENT_MAX_AGE seconds to pick up other processes' writes (from the
+# files only once a newer build has replaced the manifest). Without
+# NumPy the same questions are answered with SQL self-joins.
+ARRAYS = ('course_ids', 'course_indptr', 'course_students', 'student_ids', 'student_indptr', 'student_courses')
+MANIFEST = 'manifest.json'
+METRICS = ('cosine', 'jaccard')
+
+
+def _csr(rows, columns, size):
+    # rows/columns are dense indices; returns (indptr, columns sorted by row then column).
+    order = np.lexsort((columns, rows))
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, columns[order].astype(np.int32)
+
+
+def _gather(indptr, values, rows):
+    # values[indptr[r]:indptr[r + 1]] for every r in rows, concatenated.
+    starts, ends = indptr[rows], indptr[rows + 1]
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if not total:
+        return values[:0]
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return values[offsets + np.arange(total)]
+
+
+class Snapshot:
+    __slots__ = ARRAYS + ('built_at',)
+
+    def __init__(self, arrays, built_at):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.built_at = built_at
+
+    @classmethod
+    def from_pairs(cls, courses, students):
+        course_ids, course_index = np.unique(courses, return_inverse=True)
+        student_ids, student_index = np.unique(students, return_inverse=True)
+        course_indptr, course_students = _csr(course_index, student_index, len(course_ids))
+        student_indptr, student_courses = _csr(student_index, course_index, len(student_ids))
+        return cls({
+            'course_ids': course_ids, 'course_indptr': course_indptr, 'course_students': course_students,
+            'student_ids': student_ids, 'student_indptr': student_indptr, 'student_courses': student_courses,
+        }, time.time())
+
+    @classmethod
+    def from_database(cls, chunk_size=20000):
+        rows = Enrollment.objects.order_by().values_list('course_id', 'student_id').iterator(chunk_size=chunk_size)
+        flat = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64)
+        return cls.from_pairs(flat[0::2], flat[1::2])
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, MANIFEST)) as manifest:
+            manifest = json.load(manifest)
+        arrays = {name: np.load(os.path.join(path, filename), mmap_mode='r') for name, filename in manifest['arrays'].items()}
+        return cls(arrays, manifest['built_at'])
+
+    def save(self, path):
+        # New files per generation and an atomically replaced manifest, so
+        # processes that mapped the previous files keep working.
+        os.makedirs(path, exist_ok=True)
+        generation = f'{int(self.built_at * 1000)}'
+        arrays = {}
+        for name in ARRAYS:
+            arrays[name] = f'{name}-{generation}.npy'
+            np.save(os.path.join(path, arrays[name]), np.ascontiguousarray(getattr(self, name)))
+        temporary = os.path.join(path, f'{MANIFEST}.{generation}.tmp')
+        with open(temporary, 'w') as manifest:
+            json.dump({'built_at': self.built_at, 'enrollments': len(self.course_students), 'arrays': arrays}, manifest)
+        os.replace(temporary, os.path.join(path, MANIFEST))
+        for filename in os.listdir(path):
+            if filename.endswith('.npy') and filename not in arrays.values():
+                os.remove(os.path.join(path, filename))
+
+    def pairs(self):
+        degrees = np.diff(self.course_indptr)
+        return np.repeat(self.course_ids, degrees), self.student_ids[self.course_students]
+
+    def _index(self, ids, value):
+        position = int(np.searchsorted(ids, value))
+        return position if position < len(ids) and ids[position] == value else None
+
+    def course_index(self, course_id):
+        return self._index(self.course_ids, course_id)
+
+    def student_index(self, student_id):
+        return self._index(self.student_ids, student_id)
+
+    def has_pair(self, course_id, student_id):
+        course, student = self.course_index(course_id), self.student_index(student_id)
+        if course is None or student is None:
+            return False
+        students = self.course_students[self.course_indptr[course]:self.course_indptr[course + 1]]
+        position = int(np.searchsorted(students, student))
+        return position < len(students) and students[position] == student
+
+
+class CoEnrollmentIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._reset_overlay()
+
+    def _reset_overlay(self):
+        # Invariant: added pairs are not in the snapshot, removed pairs are.
+        self._added_by_course = defaultdict(set)
+        self._added_by_student = defaultdict(set)
+        self._removed_by_course = defaultdict(set)
+        self._removed_by_student = defaultdict(set)
+        self._overlay_size = 0
+
+    def _ensure_loaded(self):
+        if self._snapshot is None or time.time() - self._loaded_at > getattr(settings, 'COENROLLMENT_MAX_AGE', 600):
+            self._load()
+
+    def _load(self):
+        path = getattr(settings, 'COENROLLMENT_INDEX_PATH', None)
+        built_at = _manifest_built_at(path) if path else None
+        if built_at is None:
+            self._snapshot = Snapshot.from_database()
+            self._reset_overlay()
+        elif self._snapshot is None or built_at > self._snapshot.built_at:
+            self._snapshot = Snapshot.load(path)
+            self._reset_overlay()
+        # Otherwise the files are the ones already mapped: reloading them
+        # would only drop the overlay of this process's writes. Other
+        # processes' writes arrive with the next build_coenrollment_index.
+        self._loaded_at = time.time()
+
+    def _compact(self):
+        courses, students = self._snapshot.pairs()
+        removed = [(course << 32) | student for course, members in self._removed_by_course.items() for student in members]
+        if removed:
+            keep = ~np.isin((courses << 32) | students, np.array(removed, dtype=np.int64))
+            courses, students = courses[keep], students[keep]
+        added = [(course, student) for course, members in self._added_by_course.items() for student in members]
+        if added:
+            courses = np.concatenate([courses, np.array([course for course, _ in added], dtype=np.int64)])
+            students = np.concatenate([students, np.array([student for _, student in added], dtype=np.int64)])
+        built_at = self._snapshot.built_at
+        self._snapshot = Snapshot.from_pairs(courses, students)
+        self._snapshot.built_at = built_at
+        self._reset_overlay()
+
+    def add(self, pairs):
+        with self._lock:
+            if self._snapshot is None:
+                return
+            for course_id, student_id in pairs:
+                if student_id in self._removed_by_course.get(course_id, ()):
+                    self._removed_by_course[course_id].discard(student_id)
+                    self._removed_by_student[student_id].discard(course_id)
+                    self._overlay_size -= 1
+                elif not self._snapshot.has_pair(course_id, student_id) and student_id not in self._added_by_course[course_id]:
+                    self._added_by_course[course_id].add(student_id)
+                    self._added_by_student[student_id].add(course_id)
+                    self._overlay_size += 1
+            if self._overlay_size > getattr(settings, 'COENROLLMENT_COMPACT_AFTER', 10000):
+                self._compact()
+
+    def remove(self, pairs):
+        with self._lock:
+            if self._snapshot is None:
+                return
+            for course_id, student_id in pairs:
+                if student_id in self._added_by_course.get(course_id, ()):
+                    self._added_by_course[course_id].discard(student_id)
+                    self._added_by_student[student_id].discard(course_id)
+                    self._overlay_size -= 1
+                elif self._snapshot.has_pair(course_id, student_id) and student_id not in self._removed_by_course[course_id]:
+                    self._removed_by_course[course_id].add(student_id)
+                    self._removed_by_student[student_id].add(course_id)
+                    self._overlay_size += 1
+            if self._overlay_size > getattr(settings, 'COENROLLMENT_COMPACT_AFTER', 10000):
+                self._compact()
+
+    def invalidate(self):
+        # Reloaded by the next query in this process.
+        with self._lock:
+            self._snapshot = None
+            self._reset_overlay()
+
+    def _split(self, values):
+        # {course_id: amount} -> (dense positions, amounts) for indexed
+        # courses, and {course_id: amount} for courses the snapshot lacks.
+        course_ids = self._snapshot.course_ids
+        ids = np.fromiter(values.keys(), dtype=np.int64, count=len(values))
+        amounts = np.fromiter(values.values(), dtype=np.int64, count=len(values))
+        if not len(course_ids):
+            return ids[:0], amounts[:0], values
+        positions = np.minimum(np.searchsorted(course_ids, ids), len(course_ids) - 1)
+        indexed = course_ids[positions] == ids
+        return positions[indexed], amounts[indexed], dict(zip(ids[~indexed].tolist(), amounts[~indexed].tolist()))
+
+    def _members(self, course_id):
+        # Dense indices of the course's students, and ids of those added
+        # since the snapshot who are not in it at all.
+        snapshot = self._snapshot
+        course = snapshot.course_index(course_id)
+        if course is None:
+            members = np.zeros(0, dtype=np.int32)
+        else:
+            members = snapshot.course_students[snapshot.course_indptr[course]:snapshot.course_indptr[course + 1]]
+        removed = self._removed_by_course.get(course_id)
+        if removed:
+            dropped = np.array([snapshot.student_index(student_id) for student_id in removed], dtype=np.int32)
+            members = members[~np.isin(members, dropped)]
+        added, unindexed = [], []
+        for student_id in self._added_by_course.get(course_id, ()):
+            index = snapshot.student_index(student_id)
+            (unindexed if index is None else added).append(student_id if index is None else index)
+        if added:
+            members = np.concatenate([members, np.array(added, dtype=np.int32)])
+        return members, unindexed
+
+    def _co_counts(self, course_id):
+        # Co-enrollment count per indexed course, and {course_id: count} for
+        # courses added since the snapshot.
+        snapshot = self._snapshot
+        members, unindexed = self._members(course_id)
+        counts = np.bincount(_gather(snapshot.student_indptr, snapshot.student_courses, members), minlength=len(snapshot.course_ids))
+        # The base counts miss the members' added pairs and include their removed ones.
+        overlay = self._added_by_student.keys() | self._removed_by_student.keys()
+        if not overlay:
+            return counts, {}
+        overlay = np.fromiter(overlay, dtype=np.int64, count=len(overlay))
+        affected = overlay[np.isin(overlay, snapshot.student_ids[members])].tolist() + unindexed
+        deltas = defaultdict(int)
+        for student_id in affected:
+            for other in self._added_by_student.get(student_id, ()):
+                deltas[other] += 1
+            for other in self._removed_by_student.get(student_id, ()):
+                deltas[other] -= 1
+        positions, amounts, extra = self._split(deltas)
+        counts[positions] += amounts
+        return counts, extra
+
+    def _degrees(self):
+        # Students per indexed course, and per course added since the snapshot.
+        degrees = np.diff(self._snapshot.course_indptr)
+        changed = {
+            course_id: len(self._added_by_course.get(course_id, ())) - len(self._removed_by_course.get(course_id, ()))
+            for course_id in self._added_by_course.keys() | self._removed_by_course.keys()
+        }
+        positions, amounts, extra = self._split(changed)
+        degrees[positions] += amounts
+        return degrees, extra
+
+    def _value(self, values, extra, course_id):
+        index = self._snapshot.course_index(course_id)
+        return int(values[index]) if index is not None else extra.get(course_id, 0)
+
+    def _rank(self, values, extra, exclude, limit):
+        # Top `limit` courses by value, then id; extra holds the values of
+        # courses outside the snapshot.
+        snapshot = self._snapshot
+        values = values.astype(np.float64)
+        index = snapshot.course_index(exclude)
+        if index is not None:
+            values[index] = 0
+        candidates = np.flatnonzero(values > 0)
+        order = np.lexsort((snapshot.course_ids[candidates], -values[candidates]))[:limit]
+        ranked = [(int(snapshot.course_ids[candidates[i]]), float(values[candidates[i]])) for i in order]
+        ranked.extend((course_id, float(value)) for course_id, value in extra.items() if value > 0 and course_id != exclude)
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def also_took(self, course_id, limit):
+        with self._lock:
+            self._ensure_loaded()
+            counts, extra = self._co_counts(course_id)
+            return [(other, int(count)) for other, count in self._rank(counts, extra, course_id, limit)]
+
+    def similar(self, course_id, limit, metric='cosine'):
+        with self._lock:
+            self._ensure_loaded()
+            counts, extra_counts = self._co_counts(course_id)
+            degrees, extra_degrees = self._degrees()
+            size = self._value(degrees, extra_degrees, course_id)
+            if not size:
+                return []
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if metric == 'jaccard':
+                    scores = counts / (size + degrees - counts)
+                else:
+                    scores = counts / np.sqrt(size * degrees)
+            scores = np.nan_to_num(scores)
+            extra = {other: _score(count, size, extra_degrees.get(other, 0), metric) for other, count in extra_counts.items()}
+            ranked = self._rank(scores, extra, course_id, limit)
+            return [(other, round(score, 6), self._value(counts, extra_counts, other)) for other, score in ranked]
+
+    def stats(self):
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return {'loaded': False}
+            return {
+                'loaded': True,
+                'courses': len(snapshot.course_ids),
+                'students': len(snapshot.student_ids),
+                'enrollments': len(snapshot.course_students),
+                'overlay': self._overlay_size,
+                'age_seconds': round(time.time() - snapshot.built_at, 1),
+                'memory_mapped': isinstance(snapshot.course_students, np.memmap),
+            }
+
+
+def _manifest_built_at(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as manifest:
+            return json.load(manifest)['built_at']
+    except FileNotFoundError:
+        return None
+
+
+def _score(count, size, other_size, metric):
+    if count <= 0 or not size or not other_size:
+        return 0.0
+    if metric == 'jaccard':
+        return count / (size + other_size - count)
+    return count / (size * other_size) ** 0.5
+
+
+class SQLBackend:
+    # Self-joins on Enrollment; used when NumPy is not installed.
+
+    def add(self, pairs):
+        pass
+
+    def remove(self, pairs):
+        pass
+
+    def invalidate(self):
+        pass
+
+    def _co_counts(self, course_id):
+        rows = (
+            Enrollment.objects.filter(student__enrollments__course_id=course_id).exclude(course_id=course_id)
+            .order_by().values('course_id').annotate(students=Count('student_id'))
+        )
+        return {row['course_id']: row['students'] for row in rows}
+
+    def also_took(self, course_id, limit):
+        counts = self._co_counts(course_id)
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def similar(self, course_id, limit, metric='cosine'):
+        counts = self._co_counts(course_id)
+        sizes = dict(
+            Enrollment.objects.filter(course_id__in=[course_id, *counts]).order_by()
+            .values('course_id').annotate(students=Count('student_id')).values_list('course_id', 'students')
+        )
+        scored = [(other, round(_score(count, sizes.get(course_id, 0), sizes.get(other, 0), metric), 6), count) for other, count in counts.items()]
+        return sorted(scored, key=lambda item: (-item[1], item[0]))[:limit]
+
+    def stats(self):
+        return {'loaded': False, 'backend': 'sql'}
+
+
+_index = CoEnrollmentIndex() if np is not None else SQLBackend()
+
+
+def backend():
+    return _index
+
+
+def record_enrollments(pairs):
+    pairs = [(int(course_id), int(student_id)) for course_id, student_id in pairs]
+    transaction.on_commit(lambda: _index.add(pairs))
+
+
+def record_unenrollments(pairs):
+    pairs = [(int(course_id), int(student_id)) for course_id, student_id in pairs]
+    transaction.on_commit(lambda: _index.remove(pairs))
+
+
+def invalidate():
+    transaction.on_commit(_index.invalidate)
+
+
+def also_took(course_id, limit=10):
+    return _index.also_took(course_id, limit)
+
+
+def similar(course_id, limit=10, metric='cosine'):
+    return _index.similar(course_id, limit, metric)
+
+
+def stats():
+    return _index.stats()
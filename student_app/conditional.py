@@ -0,0 +1,36 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from . import object_cache
+from .decorators import handle_exceptions
+
+
+def representation_version(instance, serializer_class):
+    # Every row embedded in the representation carries updated_at, and rows
+    # nested in a parent (see object_cache.EMBEDDED_IN) touch it on save and
+    # delete, so the ETag changes whenever the serialized output can.
+    rows = [instance, *object_cache.dependencies(instance)]
+    stamps = sorted({(row._meta.label_lower, row.pk, row.updated_at.isoformat()) for row in rows})
+    version = getattr(serializer_class, 'cache_version', 1)
+    digest = hashlib.md5(repr((serializer_class.__name__, version, stamps)).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"', max(row.updated_at for row in rows)
+
+
+class ConditionalRetrieveMixin:
+    # Side-effect free retrieve with ETag/Last-Modified. A matching
+    # If-None-Match (or If-Modified-Since) returns 304 before serializing.
+
+    @handle_exceptions
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = representation_version(instance, self.get_serializer_class())
+        response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
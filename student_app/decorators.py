@@ -1,19 +1,58 @@
 from rest_framework.exceptions import ValidationError, NotAuthenticated, PermissionDenied, NotFound
 from rest_framework.response import Response
 from rest_framework import status
+from django.http import Http404
+from functools import wraps
+import logging
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
 
 def handle_exceptions(func):
+    @wraps(func)
     def wrapper(self, request, *args, **kwargs):
         try:
             return func(self, request, *args, **kwargs)
         except ValidationError as e:
+            metrics.record_exception(f'{type(self).__name__}.{func.__name__}', e)
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except NotAuthenticated as e:
+            metrics.record_exception(f'{type(self).__name__}.{func.__name__}', e)
+            return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+        except PermissionDenied as e:
+            metrics.record_exception(f'{type(self).__name__}.{func.__name__}', e)
+            return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except (NotFound, Http404) as e:
+            metrics.record_exception(f'{type(self).__name__}.{func.__name__}', e)
+            return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            metrics.record_exception(f'{type(self).__name__}.{func.__name__}', e)
+            logger.exception('Unhandled error in %s.%s', type(self).__name__, func.__name__)
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return wrapper
+
+
+def handle_async_exceptions(func):
+    # handle_exceptions for async function views (student_app.async_views).
+    @wraps(func)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await func(request, *args, **kwargs)
+        except ValidationError as e:
+            metrics.record_exception(func.__name__, e)
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except NotAuthenticated as e:
+            metrics.record_exception(func.__name__, e)
             return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
         except PermissionDenied as e:
+            metrics.record_exception(func.__name__, e)
             return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
-        except NotFound as e:
+        except (NotFound, Http404) as e:
+            metrics.record_exception(func.__name__, e)
             return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
+            metrics.record_exception(func.__name__, e)
+            logger.exception('Unhandled error in %s', func.__name__)
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     return wrapper
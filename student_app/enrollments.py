@@ -0,0 +1,295 @@
+from collections import Counter, defaultdict
+from datetime import date
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+
+from . import analytics, batching, coenrollment, object_cache, writes
+from .models import Course, CourseStats, Enrollment, Student, StudentCourse
+from .notifications import enqueue_notification
+
+
+# The single write path for enrollments. Every enrollment is an Enrollment row
+# and a StudentCourse row (marks NULL until graded) written together, so
+# reports can read StudentCourse alone; reconcile_enrollments repairs rows
+# written before this held.
+
+
+CREATED = 'created'
+ALREADY_ENROLLED = 'already_enrolled'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _lookup(queryset, ids, field, chunk_size):
+    found = {}
+    for chunk in _chunks(ids, chunk_size):
+        found.update(queryset.filter(pk__in=chunk).values_list('pk', field))
+    return found
+
+
+def existing_pairs(pairs, chunk_size):
+    # One query per chunk of students; the (student, course) match is done in memory.
+    existing = set()
+    by_student = defaultdict(set)
+    for student_id, course_id in pairs:
+        by_student[student_id].add(course_id)
+    course_ids = {course_id for _, course_id in pairs}
+    for student_ids in _chunks(by_student, chunk_size):
+        rows = Enrollment.objects.filter(student_id__in=student_ids, course_id__in=course_ids).values_list('student_id', 'course_id')
+        existing.update(row for row in rows if row[1] in by_student[row[0]])
+    return existing
+
+
+def _touch_students(student_ids, chunk_size):
+    # Their StudentCourse rows are part of the cached student representation.
+    student_ids = list(student_ids)
+    now = timezone.now()
+    for chunk in _chunks(student_ids, chunk_size):
+        Student.objects.filter(pk__in=chunk).update(updated_at=now)
+    object_cache.invalidate_pks(Student, student_ids)
+
+
+def _insert(model, rows, extra, ignore_conflicts=False):
+    # INSERT of (student_id, course_id) rows plus the `extra` column values,
+    # shared by every row. bulk_create builds and prepares a model instance per
+    # row, which at bulk-enroll sizes costs several times the insert itself.
+    connection = connections[DEFAULT_DB_ALIAS]
+    ops = connection.ops
+    fields = [model._meta.get_field(name) for name in ('student', 'course', *extra)]
+    values = [field.get_db_prep_save(value, connection) for field, value in zip(fields[2:], extra.values())]
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+    sql = '{} {} ({}) VALUES ({}) {}'.format(
+        ops.insert_statement(on_conflict=on_conflict),
+        ops.quote_name(model._meta.db_table),
+        ', '.join(ops.quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+        ops.on_conflict_suffix_sql(fields, on_conflict, None, None),
+    )
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(student_id, course_id, *values) for student_id, course_id in rows])
+
+
+def _insert_enrollments(pairs, extra):
+    # Returns the pairs this call inserted. Another writer may have enrolled
+    # some of them since they were read; those rows conflict and are left out.
+    try:
+        with transaction.atomic():
+            _insert(Enrollment, pairs, extra)
+        return list(pairs)
+    except IntegrityError:
+        pass
+    inserted = []
+    for pair in pairs:
+        try:
+            with transaction.atomic():
+                _insert(Enrollment, [pair], extra)
+        except IntegrityError:
+            continue
+        inserted.append(pair)
+    return inserted
+
+
+def _write(pairs, chunk_size):
+    # pairs: (student_id, course_id) not yet in Enrollment when they were read.
+    # Returns the pairs actually inserted. A StudentCourse row that already
+    # exists keeps its marks.
+    # The values auto_now/auto_now_add would give the rows.
+    now = timezone.now()
+    today = date.today()
+    inserted = []
+    for chunk in _chunks(pairs, chunk_size):
+        written = _insert_enrollments(chunk, {'enrollment_date': today, 'updated_at': now})
+        _insert(StudentCourse, written, {'marks': None, 'date_enrolled': today, 'updated_at': now}, ignore_conflicts=True)
+        inserted.extend(written)
+    # The inserts skip the per-row signals: apply their effects once per course.
+    per_course = Counter(course_id for _, course_id in inserted)
+    for course_id, total in per_course.items():
+        CourseStats.objects.apply(course_id, {'enrollment_count': total})
+    coenrollment.record_enrollments([(course_id, student_id) for student_id, course_id in inserted])
+    _touch_students({student_id for student_id, _ in inserted}, chunk_size)
+    if inserted:
+        transaction.on_commit(analytics.invalidate_marks)
+    return inserted
+
+
+def ensure_enrolled(pairs, chunk_size=2000):
+    # Enrolls, without notifying, the given known students in known courses
+    # they are not enrolled in yet (marks imports); returns the new pairs.
+    pairs = set(pairs)
+    return _write(sorted(pairs - existing_pairs(pairs, chunk_size)), chunk_size)
+
+
+def _parse(row):
+    try:
+        return int(row['student']), int(row['course'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def bulk_enroll(rows, chunk_size=2000):
+    results = []
+    candidates = {}
+    for index, row in enumerate(rows):
+        pair = _parse(row) if isinstance(row, dict) else None
+        if pair is None:
+            results.append({'index': index, 'status': INVALID, 'error': 'Expected integer "student" and "course".'})
+            continue
+        result = {'index': index, 'student': pair[0], 'course': pair[1]}
+        if pair in candidates:
+            result['status'] = DUPLICATE
+        else:
+            candidates[pair] = result
+        results.append(result)
+
+    with transaction.atomic():
+        # The emails and names double as existence checks and feed the notification.
+        students = _lookup(Student.objects.all(), {student_id for student_id, _ in candidates}, 'person__email', chunk_size)
+        courses = _lookup(Course.objects.all(), {course_id for _, course_id in candidates}, 'name', chunk_size)
+        for (student_id, course_id), result in list(candidates.items()):
+            if student_id not in students or course_id not in courses:
+                result['status'] = INVALID
+                result['error'] = 'Unknown student.' if student_id not in students else 'Unknown course.'
+                del candidates[(student_id, course_id)]
+
+        existing = existing_pairs(candidates, chunk_size)
+        new_pairs = [pair for pair in candidates if pair not in existing]
+        for pair in existing:
+            candidates[pair]['status'] = ALREADY_ENROLLED
+
+        inserted = set(_write(new_pairs, chunk_size))
+        for pair in new_pairs:
+            candidates[pair]['status'] = CREATED if pair in inserted else ALREADY_ENROLLED
+        _notify([pair for pair in new_pairs if pair in inserted], students, courses)
+    return results
+
+
+def unenroll(pairs, chunk_size=2000):
+    # Deleted through the ORM so the receivers keep course stats, leaderboards,
+    # the co-enrollment index and notifications in step; in a signal batch most
+    # of them run once for all the rows. Students leaving the same set of
+    # courses share their DELETEs.
+    by_student = defaultdict(set)
+    for student_id, course_id in pairs:
+        by_student[student_id].add(course_id)
+    by_courses = defaultdict(list)
+    for student_id, course_ids in by_student.items():
+        by_courses[frozenset(course_ids)].append(student_id)
+    removed = 0
+    with batching.batch():
+        for course_ids, student_ids in by_courses.items():
+            for chunk in _chunks(student_ids, chunk_size):
+                removed += Enrollment.objects.filter(student_id__in=chunk, course_id__in=course_ids).delete()[0]
+                StudentCourse.objects.filter(student_id__in=chunk, course_id__in=course_ids).delete()
+    return removed
+
+
+def _replace(current, wanted, chunk_size):
+    # Enrolls the pairs in `wanted` and unenrolls the rest of `current`.
+    results = bulk_enroll([{'student': student_id, 'course': course_id} for student_id, course_id in sorted(wanted)], chunk_size)
+    removed = sorted(current - wanted)
+    unenroll(removed, chunk_size)
+    return [result for result in results if result['status'] == CREATED], removed, [result['error'] for result in results if result['status'] == INVALID]
+
+
+def set_courses(student_id, course_ids, chunk_size=2000):
+    # Student.courses.set() for both tables: enrolls in the missing courses and
+    # unenrolls from the rest. Nothing is written if a course does not exist.
+    course_ids = set(course_ids)
+    known = set(_lookup(Course.objects.all(), course_ids, 'pk', chunk_size))
+    unknown = sorted(course_ids - known)
+    if unknown:
+        return {'enrolled': [], 'unenrolled': [], 'errors': [f'Unknown course {course_id}.' for course_id in unknown]}
+    with transaction.atomic():
+        current = set(Enrollment.objects.filter(student_id=student_id).values_list('student_id', 'course_id'))
+        current.update(StudentCourse.objects.filter(student_id=student_id).values_list('student_id', 'course_id'))
+        created, removed, errors = _replace(current, {(student_id, course_id) for course_id in course_ids}, chunk_size)
+    return {
+        'enrolled': [result['course'] for result in created],
+        'unenrolled': [course_id for _, course_id in removed],
+        'errors': errors,
+    }
+
+
+def set_students(course_id, student_ids, chunk_size=2000):
+    # Course.students.set() for both tables, the course-side set_courses.
+    student_ids = set(student_ids)
+    known = set(_lookup(Student.objects.all(), student_ids, 'pk', chunk_size))
+    unknown = sorted(student_ids - known)
+    if unknown:
+        return {'enrolled': [], 'unenrolled': [], 'errors': [f'Unknown student {student_id}.' for student_id in unknown]}
+    with transaction.atomic():
+        current = set(Enrollment.objects.filter(course_id=course_id).values_list('student_id', 'course_id'))
+        current.update(StudentCourse.objects.filter(course_id=course_id).values_list('student_id', 'course_id'))
+        created, removed, errors = _replace(current, {(student_id, course_id) for student_id in student_ids}, chunk_size)
+    return {
+        'enrolled': [result['student'] for result in created],
+        'unenrolled': [student_id for student_id, _ in removed],
+        'errors': errors,
+    }
+
+
+def _copy_dates(model, field, rows, dates):
+    # bulk_create stamps auto_now_add dates with today; put back the date of the
+    # row each one mirrors, one UPDATE per distinct date.
+    by_date = defaultdict(list)
+    for row in rows:
+        by_date[dates[(row.student_id, row.course_id)]].append(row.pk)
+    for day, pks in by_date.items():
+        model.objects.filter(pk__in=pks).update(**{field: day})
+
+
+def reconcile(chunk_size=1000, dry_run=False):
+    # Adds the missing half of every enrollment, one batch of students at a
+    # time: an ungraded StudentCourse row for an Enrollment, or an Enrollment
+    # for a StudentCourse row. Neither side is ever deleted.
+    totals = Counter()
+    student_ids = list(Student.objects.order_by('pk').values_list('pk', flat=True))
+    for chunk in _chunks(student_ids, chunk_size):
+        with writes.serialized(), transaction.atomic():
+            enrolled = {
+                (student_id, course_id): day
+                for student_id, course_id, day in Enrollment.objects.filter(student_id__in=chunk).values_list('student_id', 'course_id', 'enrollment_date')
+            }
+            graded = {
+                (student_id, course_id): day
+                for student_id, course_id, day in StudentCourse.objects.filter(student_id__in=chunk).values_list('student_id', 'course_id', 'date_enrolled')
+            }
+            missing_marks = sorted(set(enrolled) - set(graded))
+            missing_enrollments = sorted(set(graded) - set(enrolled))
+            totals['students'] += len(chunk)
+            totals['studentcourse_created'] += len(missing_marks)
+            totals['enrollment_created'] += len(missing_enrollments)
+            if dry_run or not (missing_marks or missing_enrollments):
+                continue
+            rows = StudentCourse.objects.bulk_create([StudentCourse(student_id=student_id, course_id=course_id, marks=None) for student_id, course_id in missing_marks])
+            _copy_dates(StudentCourse, 'date_enrolled', rows, enrolled)
+            rows = Enrollment.objects.bulk_create([Enrollment(student_id=student_id, course_id=course_id) for student_id, course_id in missing_enrollments])
+            _copy_dates(Enrollment, 'enrollment_date', rows, graded)
+            for course_id, total in Counter(course_id for _, course_id in missing_enrollments).items():
+                CourseStats.objects.apply(course_id, {'enrollment_count': total})
+            coenrollment.record_enrollments([(course_id, student_id) for student_id, course_id in missing_enrollments])
+            _touch_students({student_id for student_id, _ in missing_marks}, chunk_size)
+    return dict(totals)
+
+
+def _notify(pairs, emails, names):
+    # One outbox row per course rather than one per enrollment.
+    students_by_course = defaultdict(list)
+    for student_id, course_id in pairs:
+        students_by_course[course_id].append(student_id)
+    for course_id, student_ids in students_by_course.items():
+        enqueue_notification(
+            'Enrollment Confirmed',
+            f'You have been enrolled in the course: {names[course_id]}.',
+            [emails[student_id] for student_id in student_ids],
+        )
@@ -0,0 +1,73 @@
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .models import StudentCourse
+
+
+GRADEBOOK_COLUMNS = ['course', 'first_name', 'last_name', 'registration_number', 'marks', 'date_enrolled']
+GRADEBOOK_FIELDS = [
+   'course__name',
+   'student__person__first_name',
+   'student__person__last_name',
+   'student__registration_number',
+   'marks',
+   'date_enrolled',
+]
+
+EXPORT_FORMATS = {
+   'csv': 'text/csv',
+   'ndjson': 'application/x-ndjson',
+}
+
+
+def gradebook_rows(queryset, chunk_size=2000):
+   # values_list + iterator keeps a single chunk of tuples alive at a time.
+   return queryset.order_by('pk').values_list(*GRADEBOOK_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def _blocks(rows, block_size):
+   block = []
+   for row in rows:
+       block.append(row)
+       if len(block) == block_size:
+           yield block
+           block = []
+   if block:
+       yield block
+
+
+def stream_csv(rows, block_size=1000):
+   buffer = io.StringIO()
+   writer = csv.writer(buffer)
+   writer.writerow(GRADEBOOK_COLUMNS)
+   yield buffer.getvalue()
+   for block in _blocks(rows, block_size):
+       buffer.seek(0)
+       buffer.truncate()
+       writer.writerows(block)
+       yield buffer.getvalue()
+
+
+def stream_ndjson(rows, block_size=1000):
+   encoder = DjangoJSONEncoder(separators=(',', ':'))
+   for block in _blocks(rows, block_size):
+       yield ''.join(encoder.encode(dict(zip(GRADEBOOK_COLUMNS, row))) + '\n' for row in block)
+
+
+def gradebook_response(queryset, export_format, filename, chunk_size=2000):
+   rows = gradebook_rows(queryset, chunk_size)
+   content = stream_ndjson(rows) if export_format == 'ndjson' else stream_csv(rows)
+   response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+   response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+   return response
+
+
+def course_gradebook(course):
+   return StudentCourse.objects.filter(course=course)
+
+
+def instructor_gradebook(instructor):
+   return StudentCourse.objects.filter(course__instructor=instructor)
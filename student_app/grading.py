@@ -0,0 +1,116 @@
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import analytics, leaderboard, object_cache
+from .enrollments import ensure_enrolled
+from .models import CourseStats, Student, StudentCourse
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def read_csv_rows(uploaded_file):
+    return list(csv.DictReader(io.StringIO(uploaded_file.read().decode('utf-8-sig'))))
+
+
+def _integer(value):
+    # Via Decimal so 95.7 is rejected like "95.7" rather than truncated; 95.0 and "95" pass.
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(value)
+    if not number.is_finite() or number != number.to_integral_value():
+        raise ValueError(value)
+    return int(number)
+
+
+def _parse(rows):
+    # Validate every row before touching the database.
+    parsed, errors = [], []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({'index': index, 'error': 'Expected an object with "student" or "registration_number" and "marks".'})
+            continue
+        try:
+            marks = _integer(row.get('marks'))
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'error': 'marks must be an integer.'})
+            continue
+        if not 0 <= marks <= 100:
+            errors.append({'index': index, 'error': 'marks must be between 0 and 100.'})
+            continue
+        student = row.get('student')
+        if student not in (None, ''):
+            try:
+                parsed.append((index, ('id', int(student)), marks))
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'student must be an integer id.'})
+        elif row.get('registration_number'):
+            parsed.append((index, ('registration_number', str(row['registration_number'])), marks))
+        else:
+            errors.append({'index': index, 'error': 'Either student or registration_number is required.'})
+    return parsed, errors
+
+
+def _resolve_students(parsed, chunk_size):
+    ids = {value for _, (kind, value), _ in parsed if kind == 'id'}
+    numbers = {value for _, (kind, value), _ in parsed if kind == 'registration_number'}
+    known_ids = set()
+    for chunk in _chunks(ids, chunk_size):
+        known_ids.update(Student.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+    by_number = {}
+    for chunk in _chunks(numbers, chunk_size):
+        for pk, number in Student.objects.filter(registration_number__in=chunk).values_list('pk', 'registration_number'):
+            # Registration numbers are not unique; ambiguous ones are rejected below.
+            by_number[number] = None if number in by_number else pk
+    return known_ids, by_number
+
+
+def import_marks(course, rows, chunk_size=2000):
+    parsed, errors = _parse(rows)
+    known_ids, by_number = _resolve_students(parsed, chunk_size)
+
+    marks_by_student = {}
+    for index, (kind, value), marks in parsed:
+        if kind == 'id':
+            student_id = value if value in known_ids else None
+            error = 'Unknown student.'
+        else:
+            student_id = by_number.get(value)
+            error = 'Ambiguous registration_number.' if value in by_number else 'Unknown registration_number.'
+        if student_id is None:
+            errors.append({'index': index, 'error': error})
+            continue
+        # Later rows for the same student win, as they would with row-by-row saves.
+        marks_by_student[student_id] = marks
+
+    with transaction.atomic():
+        # Graded students are enrolled students.
+        ensure_enrolled([(student_id, course.pk) for student_id in marks_by_student], chunk_size)
+        for chunk in _chunks(marks_by_student.items(), chunk_size):
+            StudentCourse.objects.bulk_create(
+                [StudentCourse(student_id=student_id, course=course, marks=marks) for student_id, marks in chunk],
+                update_conflicts=True,
+                unique_fields=['student', 'course'],
+                # updated_at too, or changed marks would keep serving the old ETag.
+                update_fields=['marks', 'updated_at'],
+            )
+        # bulk_create bypasses the post_save receivers.
+        CourseStats.objects.rebuild([course.pk])
+        student_ids = list(marks_by_student)
+        now = timezone.now()
+        for chunk in _chunks(student_ids, chunk_size):
+            Student.objects.filter(pk__in=chunk).update(updated_at=now)
+        object_cache.invalidate_pks(Student, student_ids)
+        transaction.on_commit(analytics.invalidate_marks)
+        leaderboard.record_marks(course.pk, marks_by_student)
+
+    errors.sort(key=lambda error: error['index'])
+    return {'imported': len(marks_by_student), 'errors': errors}
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    # Same algorithm name as Django's hasher, so existing hashes verify with
+    # it; a stored iteration count other than PASSWORD_PBKDF2_ITERATIONS makes
+    # must_update() true and check_password re-hashes on the next login.
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', None) or hashers.PBKDF2PasswordHasher.iterations
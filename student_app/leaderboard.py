@@ -0,0 +1,278 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Avg
+
+from .models import Student, StudentCourse
+
+
+# Sorted sets keyed per course ("shards") plus one global set ranking
+# students by their average marks. Members are student ids, scores marks.
+GLOBAL_KEY = 'leaderboard:global'
+
+
+def course_key(course_id):
+    return f'leaderboard:course:{course_id}'
+
+
+class LocalSortedSet:
+    # In-process stand-in for a Redis sorted set: an ascending list of
+    # (score, member) pairs plus a member -> score map. Rank, count and
+    # score lookups are O(log n) binary searches, but add and remove shift
+    # the list and are O(n) (a memmove, cheap at course sizes); the Redis
+    # backend is O(log n) throughout. Each process holds its own copy, so
+    # use Redis with several workers.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._scores = {}
+
+    def _remove(self, key, member):
+        score = self._scores.get(key, {}).pop(member, None)
+        if score is not None:
+            entries = self._entries[key]
+            del entries[bisect_left(entries, (score, member))]
+
+    def exists(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def add(self, key, mapping):
+        with self._lock:
+            entries = self._entries.setdefault(key, [])
+            scores = self._scores.setdefault(key, {})
+            for member, score in mapping.items():
+                self._remove(key, member)
+                insort(entries, (score, member))
+                scores[member] = score
+
+    def remove(self, key, member):
+        with self._lock:
+            self._remove(key, member)
+
+    def replace(self, key, mapping):
+        with self._lock:
+            self._entries[key] = sorted((score, member) for member, score in mapping.items())
+            self._scores[key] = dict(mapping)
+
+    def score(self, key, member):
+        with self._lock:
+            return self._scores.get(key, {}).get(member)
+
+    def card(self, key):
+        with self._lock:
+            return len(self._entries.get(key, ()))
+
+    def count(self, key, low, high, low_inclusive=True, high_inclusive=True):
+        with self._lock:
+            entries = self._entries.get(key, [])
+            start = bisect_left(entries, (low,)) if low_inclusive else bisect_right(entries, (low, float('inf')))
+            end = bisect_right(entries, (high, float('inf'))) if high_inclusive else bisect_left(entries, (high,))
+            return max(0, end - start)
+
+    def top(self, key, limit, min_score=None):
+        # Highest scores first; ties in descending member order, like ZREVRANGE.
+        with self._lock:
+            entries = self._entries.get(key, [])
+            start = 0 if min_score is None else bisect_left(entries, (min_score,))
+            if limit is not None:
+                start = max(start, len(entries) - limit)
+            return [(member, score) for score, member in reversed(entries[start:])]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scores.clear()
+
+
+class RedisSortedSet:
+    # Members are stored as strings by Redis and converted back to ints.
+
+    def __init__(self, client):
+        self.client = client
+
+    def exists(self, key):
+        return bool(self.client.exists(key))
+
+    def add(self, key, mapping):
+        if mapping:
+            self.client.zadd(key, mapping)
+
+    def remove(self, key, member):
+        self.client.zrem(key, member)
+
+    def replace(self, key, mapping):
+        pipeline = self.client.pipeline()
+        pipeline.delete(key)
+        if mapping:
+            pipeline.zadd(key, mapping)
+        pipeline.execute()
+
+    def score(self, key, member):
+        return self.client.zscore(key, member)
+
+    def card(self, key):
+        return self.client.zcard(key)
+
+    def count(self, key, low, high, low_inclusive=True, high_inclusive=True):
+        return self.client.zcount(key, low if low_inclusive else f'({low}', high if high_inclusive else f'({high}')
+
+    def top(self, key, limit, min_score=None):
+        if min_score is None:
+            rows = self.client.zrevrange(key, 0, -1 if limit is None else limit - 1, withscores=True)
+        else:
+            rows = self.client.zrevrangebyscore(key, '+inf', min_score, start=0, num=-1 if limit is None else limit, withscores=True)
+        return [(int(member), score) for member, score in rows]
+
+    def clear(self):
+        for key in self.client.scan_iter('leaderboard:*'):
+            self.client.delete(key)
+
+
+_local = LocalSortedSet()
+
+
+def store():
+    cache = caches[getattr(settings, 'LEADERBOARD_CACHE_ALIAS', 'default')]
+    if cache.__class__.__module__.startswith('django_redis'):
+        from django_redis import get_redis_connection
+        return RedisSortedSet(get_redis_connection(getattr(settings, 'LEADERBOARD_CACHE_ALIAS', 'default')))
+    return _local
+
+
+def _load_course(sorted_set, course_id):
+    marks = dict(StudentCourse.objects.filter(course_id=course_id, marks__isnull=False).values_list('student_id', 'marks'))
+    sorted_set.replace(course_key(course_id), marks)
+
+
+def _load_global(sorted_set):
+    averages = StudentCourse.objects.filter(marks__isnull=False).values('student_id').annotate(average=Avg('marks')).order_by().values_list('student_id', 'average')
+    sorted_set.replace(GLOBAL_KEY, {student_id: float(average) for student_id, average in averages})
+
+
+def _ensure(sorted_set, key, course_id=None):
+    # A missing key (new process, flushed Redis) is rebuilt from the database once.
+    if not sorted_set.exists(key):
+        if course_id is None:
+            _load_global(sorted_set)
+        else:
+            _load_course(sorted_set, course_id)
+
+
+def rebuild(course_ids=None):
+    sorted_set = store()
+    if course_ids is None:
+        course_ids = StudentCourse.objects.values_list('course_id', flat=True).distinct().order_by()
+    for course_id in course_ids:
+        _load_course(sorted_set, course_id)
+    _load_global(sorted_set)
+
+
+def _student_averages(student_ids, chunk_size=2000):
+    student_ids = list(student_ids)
+    averages = {}
+    for start in range(0, len(student_ids), chunk_size):
+        rows = StudentCourse.objects.filter(student_id__in=student_ids[start:start + chunk_size], marks__isnull=False).values('student_id').annotate(average=Avg('marks')).order_by()
+        averages.update((row['student_id'], float(row['average'])) for row in rows)
+    return averages
+
+
+def _apply(course_id, marks, removed_from=(), student_ids=()):
+    sorted_set = store()
+    key = course_key(course_id)
+    if sorted_set.exists(key):
+        sorted_set.add(key, marks)
+    for student_id, other_course_id in removed_from:
+        if sorted_set.exists(course_key(other_course_id)):
+            sorted_set.remove(course_key(other_course_id), student_id)
+    if sorted_set.exists(GLOBAL_KEY):
+        averages = _student_averages(student_ids)
+        sorted_set.add(GLOBAL_KEY, averages)
+        for student_id in set(student_ids) - set(averages):
+            sorted_set.remove(GLOBAL_KEY, student_id)
+
+
+def record_marks(course_id, marks):
+    # marks: {student_id: marks}. Applied after commit so rolled back writes never rank.
+    transaction.on_commit(lambda: _apply(course_id, marks, student_ids=list(marks)))
+
+
+def record_move(student_id, course_id, marks, previous_course_id):
+    transaction.on_commit(lambda: _apply(course_id, {student_id: marks}, [(student_id, previous_course_id)], [student_id]))
+
+
+def record_removal(student_id, course_id):
+    transaction.on_commit(lambda: _apply(course_id, {}, [(student_id, course_id)], [student_id]))
+
+
+def _ranking(sorted_set, key, member):
+    score = sorted_set.score(key, member)
+    if score is None:
+        return None
+    total = sorted_set.card(key)
+    above = sorted_set.count(key, score, float('inf'), low_inclusive=False)
+    below = sorted_set.count(key, float('-inf'), score, high_inclusive=False)
+    equal = total - above - below
+    return {
+        'score': score,
+        'rank': above + 1,
+        'total': total,
+        # Percentile rank: share of the class below, counting ties as half.
+        'percentile': round((below + 0.5 * equal) / total * 100, 2),
+    }
+
+
+def course_top(course_id, limit=10, min_marks=None):
+    sorted_set = store()
+    _ensure(sorted_set, course_key(course_id), course_id)
+    return sorted_set.top(course_key(course_id), limit, min_marks)
+
+
+def course_rank(course_id, student_id):
+    sorted_set = store()
+    _ensure(sorted_set, course_key(course_id), course_id)
+    return _ranking(sorted_set, course_key(course_id), student_id)
+
+
+def global_top(limit=10, min_average=None):
+    sorted_set = store()
+    _ensure(sorted_set, GLOBAL_KEY)
+    return sorted_set.top(GLOBAL_KEY, limit, min_average)
+
+
+def global_rank(student_id):
+    sorted_set = store()
+    _ensure(sorted_set, GLOBAL_KEY)
+    return _ranking(sorted_set, GLOBAL_KEY, student_id)
+
+
+def describe(entries, score_field):
+    # Leaderboard rows with competition ranking (equal scores share a rank).
+    students = {
+        row['pk']: row
+        for row in Student.objects.filter(pk__in=[member for member, _ in entries]).values(
+            'pk', 'registration_number', 'person__email', 'person__first_name', 'person__last_name',
+        )
+    }
+    # Members whose student has been deleted since the set was loaded are
+    # dropped before ranking, so they leave no gaps.
+    entries = [(member, score) for member, score in entries if member in students]
+    rows, rank, previous = [], 0, None
+    for position, (member, score) in enumerate(entries, start=1):
+        if score != previous:
+            rank, previous = position, score
+        student = students[member]
+        rows.append({
+            'rank': rank,
+            'student': member,
+            'registration_number': student['registration_number'],
+            'email': student['person__email'],
+            'first_name': student['person__first_name'],
+            'last_name': student['person__last_name'],
+            score_field: score,
+        })
+    return rows
@@ -0,0 +1,169 @@
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+
+from student_app import catalog
+from student_app.async_views import _visible_students
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the synchronous viewsets behind a threaded WSGI worker with the async views '
+        '(/api/async/...) behind the ASGI application, at increasing numbers of concurrent clients. '
+        'Both applications are driven in process, without sockets. --db-latency adds a sleep to '
+        'every query to stand in for a networked database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,8,32,128', help='Comma separated numbers of concurrent clients.')
+        parser.add_argument('--requests', type=int, default=400, help='Requests per route, mode and concurrency level.')
+        parser.add_argument('--wsgi-threads', type=int, default=8, help='Worker threads of the WSGI server.')
+        parser.add_argument('--db-latency', type=float, default=0.0, help='Milliseconds added to every query.')
+        parser.add_argument('--routes', help='Comma separated substrings of route names to run.')
+
+    def handle(self, *args, **options):
+        course = catalog.queryset().order_by('pk').first()
+        if course is None:
+            raise CommandError('No catalog courses; run generate_synthetic_data first.')
+        user, _ = get_user_model().objects.get_or_create(username='benchmark', defaults={'is_staff': True})
+        self.authorization = f'Bearer {AccessToken.for_user(user)}'
+
+        routes = [
+            ('course-list', '/api/courses/?page_size=20', '/api/async/courses/?page_size=20'),
+            ('course-detail', f'/api/courses/{course.pk}/', f'/api/async/courses/{course.pk}/'),
+            ('review-statistics', '/api/reviews/statistics/', '/api/async/reviews/statistics/'),
+        ]
+        student_id = _visible_students().filter(studentcourse__isnull=False).values_list('pk', flat=True).first()
+        if student_id is not None:
+            routes.insert(2, ('student-marks', f'/api/students/{student_id}/marks/', f'/api/async/students/{student_id}/marks/'))
+        else:
+            self.stderr.write("Skipping student-marks: no student with marks is visible to StudentViewSet (enrolled in 'Mathematics').")
+        if options['routes']:
+            routes = [route for route in routes if any(part in route[0] for part in options['routes'].split(','))]
+
+        if options['db_latency']:
+            self._add_db_latency(options['db_latency'] / 1000)
+        self.wsgi = get_wsgi_application()
+        self.asgi = get_asgi_application()
+
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        self.stdout.write(f"WSGI: {options['wsgi_threads']} worker threads; db latency {options['db_latency']} ms")
+        self.stdout.write(f"{'route':<18} {'mode':<5} {'clients':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+        for name, sync_url, async_url in routes:
+            for clients in levels:
+                for mode, run in (('wsgi', self._run_wsgi), ('asgi', self._run_asgi)):
+                    url = sync_url if mode == 'wsgi' else async_url
+                    latencies, errors, elapsed = run(url, clients, options['requests'], options['wsgi_threads'])
+                    self.stdout.write(
+                        f'{name:<18} {mode:<5} {clients:>7} {len(latencies) / elapsed:>9.1f} '
+                        f'{_percentile(latencies, 50) * 1000:>9.2f} {_percentile(latencies, 95) * 1000:>9.2f} {errors:>7}'
+                    )
+
+    def _add_db_latency(self, seconds):
+        def sleep_wrapper(execute, sql, params, many, context):
+            time.sleep(seconds)
+            return execute(sql, params, many, context)
+
+        def install(connection):
+            if sleep_wrapper not in connection.execute_wrappers:
+                connection.execute_wrappers.append(sleep_wrapper)
+
+        connection_created.connect(lambda sender, connection, **kwargs: install(connection), weak=False)
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+
+    def _run_wsgi(self, url, clients, requests, threads):
+        # Each client waits for one of the server's worker threads, as behind
+        # a threaded WSGI server; the wait counts towards its latency.
+        path, _, query = url.partition('?')
+        workers = threading.BoundedSemaphore(threads)
+        latencies, errors = [], []
+
+        def request(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'localhost', 'HTTP_ACCEPT': 'application/json', 'HTTP_AUTHORIZATION': self.authorization,
+                'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(b''), 'wsgi.errors': sys.stderr,
+                'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            statuses = []
+            started = time.perf_counter()
+            with workers:
+                body = self.wsgi(environ, lambda status, headers, exc_info=None: statuses.append(status))
+                for _ in body:
+                    pass
+                body.close()
+            latencies.append(time.perf_counter() - started)
+            if not statuses or not statuses[0].startswith('2'):
+                errors.append(statuses[:1])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(request, range(requests)))
+        return latencies, len(errors), time.perf_counter() - started
+
+    def _run_asgi(self, url, clients, requests, threads):
+        return asyncio.run(self._asgi_load(url, clients, requests))
+
+    async def _asgi_load(self, url, clients, requests):
+        parts = urlsplit(url)
+        headers = [
+            (b'host', b'localhost'), (b'accept', b'application/json'),
+            (b'authorization', self.authorization.encode()),
+        ]
+        slots = asyncio.Semaphore(clients)
+        latencies, errors = [], []
+
+        async def request():
+            async with slots:
+                scope = {
+                    'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+                    'path': parts.path, 'raw_path': parts.path.encode(), 'query_string': parts.query.encode(),
+                    'root_path': '', 'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+                }
+                done = asyncio.Event()
+                received = []
+
+                async def receive():
+                    if not received:
+                        received.append(True)
+                        return {'type': 'http.request', 'body': b'', 'more_body': False}
+                    await done.wait()
+                    return {'type': 'http.disconnect'}
+
+                statuses = []
+
+                async def send(message):
+                    if message['type'] == 'http.response.start':
+                        statuses.append(message['status'])
+                    elif not message.get('more_body'):
+                        done.set()
+
+                started = time.perf_counter()
+                await self.asgi(scope, receive, send)
+                latencies.append(time.perf_counter() - started)
+                if not statuses or statuses[0] >= 300:
+                    errors.append(statuses[:1])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(requests)))
+        return latencies, len(errors), time.perf_counter() - started
@@ -0,0 +1,121 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from student_app import authentication, object_cache
+from student_app.hashers import PBKDF2PasswordHasher
+
+
+USERNAME = 'benchmark-login'
+PASSWORD = 'benchmark-login-password'
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Profile the login path: PBKDF2 cost per iteration count, POST /api/auth/login/ (successful and '
+        'failed), /api/auth/token/refresh/, rehash-on-login after a cost change, and the queries an '
+        'authenticated JWT request spends loading its user with and without the principal cache. '
+        'Runs inside a rolled-back transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default='100000,600000,1000000', help='Comma separated PBKDF2 iteration counts to time.')
+        parser.add_argument('--logins', type=int, default=10, help='Login requests per measurement.')
+        parser.add_argument('--requests', type=int, default=200, help='Authenticated API requests per measurement.')
+
+    def handle(self, *args, **options):
+        self._hash_costs([int(value) for value in options['iterations'].split(',')])
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(USERNAME, password=PASSWORD)
+            client = Client(HTTP_HOST='localhost')
+            tokens = self._logins(client, options['logins'])
+            self._rehash(client, user)
+            if tokens:
+                self._principal_cache(client, user, tokens['access'], options['requests'])
+            transaction.set_rollback(True)
+
+    def _row(self, name, latencies, extra=''):
+        self.stdout.write(
+            f'{name:<32} {len(latencies):>6} {_percentile(latencies, 50) * 1000:>9.2f} '
+            f'{_percentile(latencies, 95) * 1000:>9.2f} {extra}'
+        )
+
+    def _hash_costs(self, counts):
+        self.stdout.write(f'Configured: PASSWORD_PBKDF2_ITERATIONS={PBKDF2PasswordHasher().iterations}')
+        self.stdout.write(f"{'pbkdf2_sha256 iterations':<26} {'hash ms':>9} {'verify ms':>9}")
+        hasher = PBKDF2PasswordHasher()
+        for count in counts:
+            started = time.perf_counter()
+            encoded = hasher.encode(PASSWORD, hasher.salt(), count)
+            hashed = time.perf_counter() - started
+            started = time.perf_counter()
+            hasher.verify(PASSWORD, encoded)
+            verified = time.perf_counter() - started
+            self.stdout.write(f'{count:<26} {hashed * 1000:>9.1f} {verified * 1000:>9.1f}')
+        self.stdout.write('')
+
+    def _post(self, client, path, data, latencies):
+        started = time.perf_counter()
+        response = client.post(path, data, content_type='application/json')
+        latencies.append(time.perf_counter() - started)
+        return response
+
+    def _logins(self, client, count):
+        self.stdout.write(f"{'endpoint':<32} {'n':>6} {'p50 ms':>9} {'p95 ms':>9}")
+        ok, failed, refreshed = [], [], []
+        response = None
+        for _ in range(count):
+            response = self._post(client, '/api/auth/login/', {'username': USERNAME, 'password': PASSWORD}, ok)
+        self._row('login', ok, f'(status {response.status_code})')
+        for _ in range(count):
+            self._post(client, '/api/auth/login/', {'username': USERNAME, 'password': 'wrong'}, failed)
+        self._row('login, wrong password', failed)
+
+        tokens = response.json() if response.status_code == 200 else {}
+        if 'refresh' not in tokens:
+            self.stdout.write('Login returned no JWT pair; check REST_AUTH["USE_JWT"].')
+            return None
+        for _ in range(count * 10):
+            refresh = self._post(client, '/api/auth/token/refresh/', {'refresh': tokens['refresh']}, refreshed)
+        self._row('token refresh', refreshed, f'(status {refresh.status_code})')
+        return tokens
+
+    def _rehash(self, client, user):
+        # Store a hash at a different cost, log in once and look at the stored hash again.
+        hasher = PBKDF2PasswordHasher()
+        other = hasher.iterations // 2 or 1
+        user.password = hasher.encode(PASSWORD, hasher.salt(), other)
+        user.save(update_fields=['password'])
+        client.post('/api/auth/login/', {'username': USERNAME, 'password': PASSWORD}, content_type='application/json')
+        user.refresh_from_db(fields=['password'])
+        stored = identify_hasher(user.password).decode(user.password)['iterations']
+        self.stdout.write(f'\nrehash on login: {other} -> {stored} iterations ({"upgraded" if stored == hasher.iterations else "NOT upgraded"})\n')
+
+    def _principal_cache(self, client, user, access, count):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {access}'}
+        path = '/api/auth/user/'
+        self.stdout.write(f"{'authenticated GET ' + path:<32} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} queries/request")
+        ttl = getattr(settings, 'AUTH_PRINCIPAL_CACHE_TTL', 60) or 60
+        for name, enabled in (('principal cache off', False), ('principal cache on', True)):
+            object_cache.cache().delete(authentication._principal_key(user.pk))
+            with override_settings(AUTH_PRINCIPAL_CACHE_TTL=ttl if enabled else 0):
+                client.get(path, **headers)
+                latencies = []
+                with CaptureQueriesContext(connection) as queries:
+                    for _ in range(count):
+                        started = time.perf_counter()
+                        client.get(path, **headers)
+                        latencies.append(time.perf_counter() - started)
+            self._row(name, latencies, f'{len(queries.captured_queries) / count:.2f}')
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from student_app.enrollments import CREATED, bulk_enroll
+from student_app.models import Course, Instructor, Person, Student
+
+
+class Command(BaseCommand):
+    help = 'Time bulk_enroll() for N synthetic students into one course (inside a rolled-back transaction).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = options['students']
+        with transaction.atomic():
+            course = self._course()
+            persons = Person.objects.bulk_create([
+                Person(email=f'bench-enroll-{index}@example.invalid', first_name='Bench', last_name='Student',
+                       phone_number='+100000000', address='-', password='!')
+                for index in range(total)
+            ], batch_size=5000)
+            students = Student.objects.bulk_create(
+                [Student(person=person, registration_number=f'BENCH{index}') for index, person in enumerate(persons)],
+                batch_size=5000,
+            )
+            rows = [{'student': student.pk, 'course': course.pk} for student in students]
+
+            started = time.perf_counter()
+            results = bulk_enroll(rows, chunk_size=options['chunk_size'])
+            elapsed = time.perf_counter() - started
+
+            created = sum(result['status'] == CREATED for result in results)
+            self.stdout.write(f'{created}/{total} enrollments in {elapsed * 1000:.1f} ms ({created / elapsed:.0f} rows/s)')
+            transaction.set_rollback(True)
+
+    def _course(self):
+        person = Person.objects.create(email='bench-instructor@example.invalid', first_name='Bench', last_name='Instructor',
+                                       phone_number='+100000000', address='-', password='!')
+        instructor = Instructor.objects.create(person=person, bio='-', salary=0)
+        return Course.objects.create(name='Bench course', description='-', instructor=instructor)
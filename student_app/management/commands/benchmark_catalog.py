@@ -0,0 +1,95 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from student_app import catalog
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test GET /api/courses/ with concurrent clients, first through the queryset '
+        '(CATALOG_SNAPSHOT_ENABLED=False) and then from the catalog snapshot, and report '
+        'requests/sec and latency. With --invalidate-every the catalog is invalidated while '
+        'the clients run, to show one rebuild per change rather than one per waiting request.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--pages', type=int, default=3, help='Each client walks this many pages by cursor, then starts over.')
+        parser.add_argument('--invalidate-every', type=float, default=0.0, help='Seconds between invalidations; 0 disables.')
+
+    def handle(self, *args, **options):
+        self.user = get_user_model()(username='benchmark', is_staff=True, is_superuser=True)
+        courses = catalog.queryset().count()
+        self.stdout.write(f"{courses} catalog courses, {options['threads']} threads, {options['seconds']:.0f}s per mode")
+        self.stdout.write(f"{'mode':<10} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'rebuilds':>9}")
+        for mode, enabled in (('queryset', False), ('snapshot', True)):
+            catalog.reset()
+            with override_settings(CATALOG_SNAPSHOT_ENABLED=enabled):
+                latencies, elapsed = self._run(options)
+            rebuilds = catalog.stats()['builds']
+            self.stdout.write(
+                f'{mode:<10} {len(latencies):>9} {len(latencies) / elapsed:>9.1f} '
+                f'{_percentile(latencies, 50) * 1000:>8.2f} {_percentile(latencies, 95) * 1000:>8.2f} {rebuilds:>9}'
+            )
+        snapshot = catalog.stats()
+        self.stdout.write(f"snapshot: {snapshot['courses']} courses, {snapshot['bytes'] / 1024:.1f} KiB, built in {snapshot['build_ms']} ms")
+
+    def _run(self, options):
+        deadline = time.perf_counter() + options['seconds']
+        start = threading.Barrier(options['threads'] + 1)
+        results = []
+        failures = []
+
+        def client_loop():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            latencies = []
+            start.wait()
+            url = f"/api/courses/?page_size={options['page_size']}"
+            page = 0
+            try:
+                while time.perf_counter() < deadline:
+                    began = time.perf_counter()
+                    response = client.get(url, HTTP_ACCEPT='application/json', HTTP_HOST='localhost')
+                    latencies.append(time.perf_counter() - began)
+                    if response.status_code != 200:
+                        failures.append(response.status_code)
+                        break
+                    page += 1
+                    url = response.json()['next']
+                    if url is None or page >= options['pages']:
+                        url, page = f"/api/courses/?page_size={options['page_size']}", 0
+            finally:
+                connections.close_all()
+                results.append(latencies)
+
+        threads = [threading.Thread(target=client_loop) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        if options['invalidate_every']:
+            while time.perf_counter() + options['invalidate_every'] < deadline:
+                time.sleep(options['invalidate_every'])
+                catalog.invalidate()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        if failures:
+            self.stderr.write(f'{len(failures)} client(s) stopped on status {failures[0]}')
+        latencies = [latency for batch in results for latency in batch]
+        return latencies or [0.0], elapsed
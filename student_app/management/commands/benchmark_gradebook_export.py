@@ -0,0 +1,65 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from student_app.exports import course_gradebook, gradebook_rows, stream_csv, stream_ndjson
+from student_app.models import Course, Instructor, Person, Student, StudentCourse
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a synthetic course gradebook and report the peak Python memory of the export. '
+        'Rows are inserted inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--export-format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--max-peak-mb', type=float, default=64.0, help='Fail if the export peak exceeds this ceiling.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            course = self._populate(options['rows'])
+            stream = stream_ndjson if options['export_format'] == 'ndjson' else stream_csv
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            size = 0
+            for chunk in stream(gradebook_rows(course_gradebook(course), options['chunk_size'])):
+                size += len(chunk)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            transaction.set_rollback(True)
+
+        peak_mb = peak / 2 ** 20
+        self.stdout.write(
+            f"{options['rows']} rows, {size / 2 ** 20:.1f} MiB {options['export_format']} in {elapsed:.2f}s, "
+            f'peak traced memory {peak_mb:.2f} MiB'
+        )
+        if peak_mb > options['max_peak_mb']:
+            raise CommandError(f"Peak memory {peak_mb:.2f} MiB exceeds the {options['max_peak_mb']} MiB ceiling.")
+
+    def _populate(self, rows, batch_size=5000):
+        self.stdout.write(f'Inserting {rows} synthetic gradebook rows...')
+        person = Person.objects.create(email='bench-export-instructor@example.invalid', first_name='Bench',
+                                       last_name='Instructor', phone_number='+100000000', address='-', password='!')
+        instructor = Instructor.objects.create(person=person, bio='-', salary=0)
+        course = Course.objects.create(name='Bench export course', description='-', instructor=instructor)
+        for start in range(0, rows, batch_size):
+            indexes = range(start, min(start + batch_size, rows))
+            persons = Person.objects.bulk_create([
+                Person(email=f'bench-export-{index}@example.invalid', first_name='Bench', last_name=f'Student{index}',
+                       phone_number='+100000000', address='-', password='!')
+                for index in indexes
+            ])
+            students = Student.objects.bulk_create(
+                [Student(person=person, registration_number=f'EXP{index}') for index, person in zip(indexes, persons)]
+            )
+            StudentCourse.objects.bulk_create(
+                [StudentCourse(student=student, course=course, marks=index % 101) for index, student in zip(indexes, students)]
+            )
+        return course
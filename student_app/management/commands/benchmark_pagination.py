@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from student_app.models import Person
+from student_app.pagination import keyset_filter
+
+
+ORDERING = ('last_name', 'id')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare OFFSET and keyset (cursor) pagination over the Person list ordering. '
+        'Synthetic rows are inserted inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', default='1,1000,100000', help='Comma separated page numbers to measure.')
+        parser.add_argument('--page-size', type=int, default=5)
+        parser.add_argument('--rows', type=int, help='Synthetic persons to insert (default: enough for the deepest page).')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per measurement; the median is reported.')
+
+    def handle(self, *args, **options):
+        pages = [int(page) for page in options['pages'].split(',')]
+        page_size = options['page_size']
+        rows = options['rows'] or max(pages) * page_size
+
+        with transaction.atomic():
+            self._populate(rows)
+            queryset = Person.objects.order_by(*ORDERING)
+            self.stdout.write(f'{queryset.count()} persons, page size {page_size}')
+            self.stdout.write(f"{'page':>8} {'offset ms':>12} {'cursor ms':>12}")
+            for page in pages:
+                offset = (page - 1) * page_size
+                offset_time = self._time(lambda: list(queryset[offset:offset + page_size]), options['repeat'])
+                if offset:
+                    position = list(queryset.values_list(*ORDERING)[offset - 1])
+                    keyset = queryset.filter(keyset_filter(ORDERING, position))
+                else:
+                    keyset = queryset
+                cursor_time = self._time(lambda: list(keyset[:page_size]), options['repeat'])
+                self.stdout.write(f'{page:>8} {offset_time * 1000:>12.3f} {cursor_time * 1000:>12.3f}')
+            transaction.set_rollback(True)
+
+    def _populate(self, rows, batch_size=5000):
+        existing = Person.objects.count()
+        if existing >= rows:
+            return
+        self.stdout.write(f'Inserting {rows - existing} synthetic persons...')
+        for start in range(existing, rows, batch_size):
+            Person.objects.bulk_create([
+                Person(
+                    email=f'bench-{index}@example.invalid',
+                    first_name='Bench',
+                    last_name=f'Person{index % 9973:04d}',
+                    phone_number='+100000000',
+                    address='-',
+                    password='!',
+                )
+                for index in range(start, min(start + batch_size, rows))
+            ])
+
+    def _time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
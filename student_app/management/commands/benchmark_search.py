@@ -0,0 +1,79 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+
+from student_app import search
+
+
+SUBJECTS = ['algebra', 'biology', 'chemistry', 'databases', 'economics', 'geometry', 'history', 'physics', 'statistics']
+QUERIES = {
+    'rare term': 'w4999',
+    'common term': 'course',
+    'two terms': 'physics w12',
+    'prefix': 'stat*',
+    'rare prefix': 'w498*',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure search latency over synthetic documents for the FTS5 and in-process backends. '
+        'FTS rows are inserted inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=100000)
+        parser.add_argument('--backend', choices=['fts5', 'python', 'both'], default='both')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query; the median is reported.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--rank-limit', type=int, default=getattr(settings, 'SEARCH_RANK_LIMIT', 5000))
+
+    def handle(self, *args, **options):
+        documents = list(self._documents(options['documents'], random.Random(options['seed'])))
+        self.stdout.write(f'{len(documents)} documents, page size {options["page_size"]}')
+        if options['backend'] in ('fts5', 'both'):
+            if not search._has_fts_table(DEFAULT_DB_ALIAS):
+                raise CommandError('The FTS5 table is missing (SQLite without FTS5, or migrations not applied).')
+            with transaction.atomic():
+                started = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+                search.FTS5Backend(DEFAULT_DB_ALIAS).index(documents)
+                self.stdout.write(f'fts5: indexed in {time.perf_counter() - started:.1f}s')
+                self._run('fts5', search.FTS5Backend(DEFAULT_DB_ALIAS), options)
+                transaction.set_rollback(True)
+        if options['backend'] in ('python', 'both'):
+            backend = search.PythonBackend()
+            started = time.perf_counter()
+            for doc_type, object_id, title, body in documents:
+                backend._add(search._rowid(doc_type, object_id), title, body)
+            backend._loaded = True
+            self.stdout.write(f'python: indexed in {time.perf_counter() - started:.1f}s')
+            self._run('python', backend, options)
+
+    def _documents(self, count, rng):
+        # Zipf-like vocabulary: w0 is frequent, w4999 rare.
+        vocabulary = [f'w{index}' for index in range(5000)]
+        weights = [1 / (index + 1) for index in range(5000)]
+        for object_id in range(1, count + 1):
+            title = f'{rng.choice(SUBJECTS)} course {object_id}'
+            body = ' '.join(rng.choices(vocabulary, weights, k=12))
+            yield ('course', object_id, title, body)
+
+    def _run(self, name, backend, options):
+        for label, query in QUERIES.items():
+            terms = search.parse_query(query)
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                hits, ranked = backend.search(terms, None, options['page_size'], 0, options['rank_limit'])
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(
+                f"{name:>7} {label:<12} {query!r:<16} {statistics.median(timings) * 1000:>9.2f} ms  "
+                f"({len(hits)} hits, {'ranked' if ranked else 'newest first'})"
+            )
@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from student_app import batching, metrics
+from student_app.models import Enrollment, Notification, Person, Review
+
+
+class Command(BaseCommand):
+    help = (
+        'Row-by-row ORM writes with and without a signal batch scope (student_app.batching): reviews '
+        'saved one at a time, persons updated one at a time and a queryset delete of enrollments. Reports '
+        'queries, time, receiver executions and notifications written. Runs inside a rolled-back transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        reviewed = set(Review.objects.values_list('student_id', 'course_id'))
+        pairs = [
+            pair for pair in Enrollment.objects.order_by('pk').values_list('student_id', 'course_id')[:rows * 2]
+            if pair not in reviewed
+        ][:rows]
+        persons = list(Person.objects.filter(profile__isnull=False).order_by('pk')[:rows])
+        enrollment_ids = list(Enrollment.objects.order_by('-pk').values_list('pk', flat=True)[:rows])
+        if not (pairs and persons and enrollment_ids):
+            raise CommandError('Not enough data; run generate_synthetic_data first.')
+
+        def save_reviews():
+            for student_id, course_id in pairs:
+                Review(student_id=student_id, course_id=course_id, rating=4, comment='Benchmark review.').save()
+
+        def save_persons():
+            for person in persons:
+                person.address = f'{person.address} '
+                person.save()
+
+        def delete_enrollments():
+            Enrollment.objects.filter(pk__in=enrollment_ids).delete()
+
+        self.stdout.write(f"{'job':<22} {'mode':<8} {'rows':>5} {'queries':>8} {'ms':>9} {'receivers':>10} {'notifications':>14}")
+        with transaction.atomic():
+            for name, job, count in (
+                ('save reviews', save_reviews, len(pairs)),
+                ('save persons', save_persons, len(persons)),
+                ('delete enrollments', delete_enrollments, len(enrollment_ids)),
+            ):
+                for mode in ('per row', 'batched'):
+                    self._run(name, mode, job, count)
+            transaction.set_rollback(True)
+
+    def _run(self, name, mode, job, count):
+        savepoint = transaction.savepoint()
+        notifications = Notification.objects.count()
+        request_metrics, token = metrics.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                if mode == 'batched':
+                    with batching.batch():
+                        job()
+                else:
+                    job()
+                elapsed = time.perf_counter() - started
+        finally:
+            metrics.stop(token)
+        written = Notification.objects.count() - notifications
+        transaction.savepoint_rollback(savepoint)
+        self.stdout.write(
+            f'{name:<22} {mode:<8} {count:>5} {len(queries.captured_queries):>8} {elapsed * 1000:>9.1f} '
+            f'{sum(request_metrics.signals.values()):>10} {written:>14}'
+        )
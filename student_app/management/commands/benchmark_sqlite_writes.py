@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, close_old_connections, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.test.utils import override_settings
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _worker(job):
+    # Runs in a child process: point the default alias at the profile's copy,
+    # then let `threads` threads write concurrently, one transaction per
+    # simulated request.
+    django.setup()
+    from student_app import writes
+    from student_app.models import CourseStats, Notification
+
+    profile, path, threads, transactions, start_at = job
+    database = connections.settings[DEFAULT_DB_ALIAS]
+    database.update(NAME=path, OPTIONS=profile['options'], CONN_MAX_AGE=profile['conn_max_age'], CONN_HEALTH_CHECKS=profile['conn_max_age'] != 0)
+    course_ids = list(CourseStats.objects.values_list('pk', flat=True))
+    connections.close_all()
+    opened = []
+    connection_created.connect(lambda sender, connection, **kwargs: opened.append(1), weak=False)
+
+    def run(_):
+        committed, locked, failed, latencies = 0, 0, 0, []
+        for _ in range(transactions):
+            course_id = random.choice(course_ids)
+            started = time.perf_counter()
+            try:
+                with writes.serialized():
+                    with transaction.atomic():
+                        # Read, then write: the pattern of the enrollment and review endpoints.
+                        stats = CourseStats.objects.get(pk=course_id)
+                        Notification.objects.create(subject='benchmark', message=f'course {stats.pk}', recipients=[])
+                        CourseStats.objects.filter(pk=course_id).update(enrollment_count=F('enrollment_count') + 1)
+                committed += 1
+                latencies.append(time.perf_counter() - started)
+            except OperationalError as e:
+                if 'locked' in str(e) or 'busy' in str(e):
+                    locked += 1
+                else:
+                    failed += 1
+            finally:
+                # The end of a request: closes the connection unless CONN_MAX_AGE keeps it.
+                close_old_connections()
+        connections.close_all()
+        return committed, locked, failed, latencies
+
+    time.sleep(max(0.0, start_at - time.time()))
+    with override_settings(SQLITE_SERIALIZE_WRITES=profile['serialize']):
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(run, range(threads)))
+    return (
+        sum(result[0] for result in results), sum(result[1] for result in results), sum(result[2] for result in results),
+        [latency for result in results for latency in result[3]], len(opened), time.time(),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Concurrent write benchmark for the SQLite settings: several processes with several threads each run '
+        'short read-then-write transactions against copies of the database, once with SQLite and Django '
+        'defaults and once per tuned profile (settings.DATABASES["default"]). Reports committed '
+        'transactions per second, "database is locked" errors, latency and connections opened.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--threads', type=int, default=4, help='Threads per process.')
+        parser.add_argument('--transactions', type=int, default=100, help='Transactions per thread.')
+        parser.add_argument('--profiles', default='baseline,tuned,tuned+serialized')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite' or primary.is_in_memory_db():
+            raise CommandError('The default database is not an SQLite file.')
+        configured = settings.DATABASES[DEFAULT_DB_ALIAS]
+        profiles = {
+            'baseline': {'options': {}, 'conn_max_age': 0, 'serialize': False, 'journal_mode': 'DELETE'},
+            'tuned': {'options': dict(configured.get('OPTIONS', {})), 'conn_max_age': configured.get('CONN_MAX_AGE', 0), 'serialize': False},
+        }
+        profiles['tuned+serialized'] = dict(profiles['tuned'], serialize=True)
+        names = options['profiles'].split(',')
+        unknown = set(names) - set(profiles)
+        if unknown:
+            raise CommandError(f'Unknown profiles: {", ".join(sorted(unknown))} (choose from {", ".join(profiles)})')
+
+        workdir = tempfile.mkdtemp(prefix='sqlite-writes-')
+        try:
+            template = os.path.join(workdir, 'template.sqlite3')
+            primary.ensure_connection()
+            with sqlite3.connect(template) as target:
+                primary.connection.backup(target)
+            target.close()
+            connections.close_all()
+
+            self.stdout.write(
+                f"{options['processes']} processes x {options['threads']} threads x {options['transactions']} transactions\n"
+                f"{'profile':<18} {'tx/s':>8} {'committed':>10} {'locked':>7} {'failed':>7} {'p50 ms':>8} {'p95 ms':>8} {'connections':>12}"
+            )
+            context = multiprocessing.get_context()
+            for name in names:
+                profile = profiles[name]
+                path = os.path.join(workdir, f'{name.replace("+", "-")}.sqlite3')
+                shutil.copyfile(template, path)
+                with sqlite3.connect(path) as copy:
+                    copy.execute(f"PRAGMA journal_mode={profile.get('journal_mode', 'DELETE')}")
+                copy.close()
+
+                start_at = time.time() + 1.0
+                jobs = [(profile, path, options['threads'], options['transactions'], start_at)] * options['processes']
+                with context.Pool(options['processes']) as pool:
+                    results = pool.map(_worker, jobs)
+                elapsed = max(result[5] for result in results) - start_at
+                committed = sum(result[0] for result in results)
+                latencies = [latency for result in results for latency in result[3]]
+                self.stdout.write(
+                    f'{name:<18} {committed / elapsed:>8.1f} {committed:>10} {sum(result[1] for result in results):>7} '
+                    f'{sum(result[2] for result in results):>7} {_percentile(latencies, 50) * 1000:>8.2f} '
+                    f'{_percentile(latencies, 95) * 1000:>8.2f} {sum(result[4] for result in results):>12}'
+                )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,65 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from student_app import coenrollment
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the co-enrollment index from Enrollment and write it as memory-mappable .npy files to '
+        '--output (default COENROLLMENT_INDEX_PATH), where web processes pick it up on their next reload. '
+        '--queries times "also took" and "similar" lookups on random courses, and --compare-sql checks '
+        'them against the SQL self-join backend.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None)
+        parser.add_argument('--queries', type=int, default=0, help='Random courses to time lookups for.')
+        parser.add_argument('--compare-sql', action='store_true')
+
+    def handle(self, *args, **options):
+        if coenrollment.np is None:
+            raise CommandError('NumPy is not installed; the co-enrollment endpoints fall back to SQL.')
+        started = time.perf_counter()
+        snapshot = coenrollment.Snapshot.from_database()
+        built = time.perf_counter() - started
+        size = sum(getattr(snapshot, name).nbytes for name in coenrollment.ARRAYS)
+        self.stdout.write(
+            f'{len(snapshot.course_students)} enrollments, {len(snapshot.course_ids)} courses, {len(snapshot.student_ids)} students: '
+            f'built in {built * 1000:.0f} ms, {size / 1024 / 1024:.1f} MiB'
+        )
+        output = options['output'] or getattr(settings, 'COENROLLMENT_INDEX_PATH', None)
+        if output:
+            snapshot.save(output)
+            self.stdout.write(f'Written to {output}')
+        if options['queries']:
+            self._time_queries(snapshot, options['queries'], options['compare_sql'])
+
+    def _time_queries(self, snapshot, count, compare):
+        index = coenrollment.CoEnrollmentIndex()
+        index._snapshot, index._loaded_at = snapshot, time.time()
+        sql = coenrollment.SQLBackend()
+        courses = random.sample(snapshot.course_ids.tolist(), min(count, len(snapshot.course_ids)))
+        timings = {'also_took': [], 'similar': [], 'sql also_took': []}
+        mismatches = 0
+        for course_id in courses:
+            started = time.perf_counter()
+            also_took = index.also_took(course_id, 10)
+            timings['also_took'].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            similar = index.similar(course_id, 10)
+            timings['similar'].append(time.perf_counter() - started)
+            if compare:
+                started = time.perf_counter()
+                expected = sql.also_took(course_id, 10)
+                timings['sql also_took'].append(time.perf_counter() - started)
+                mismatches += also_took != expected or similar != sql.similar(course_id, 10)
+        for name, values in timings.items():
+            if values:
+                values.sort()
+                self.stdout.write(f'{name:<14} p50 {values[len(values) // 2] * 1000:8.2f} ms   max {values[-1] * 1000:8.2f} ms')
+        if compare:
+            self.stdout.write(f'{mismatches} of {len(courses)} courses differ from the SQL backend')
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student_app.models import CourseStats
+
+
+class Command(BaseCommand):
+    help = 'Diff CourseStats rollups against live aggregates and report (or --fix) any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('courses', nargs='*', type=int, help='Course ids to check (default: all courses).')
+        parser.add_argument('--fix', action='store_true', help='Rebuild the rollups that drifted.')
+
+    def handle(self, *args, **options):
+        course_ids = options['courses'] or None
+        live = CourseStats.objects.compute(course_ids)
+        stored = CourseStats.objects.in_bulk(course_ids)
+
+        drifted = []
+        for course_id, expected in live.items():
+            actual = stored.get(course_id)
+            if actual is None:
+                self.stdout.write(f'course {course_id}: missing rollup')
+                drifted.append(course_id)
+                continue
+            differences = actual.differences(expected)
+            if differences:
+                details = ', '.join(f'{field} stored={got} live={want}' for field, (got, want) in differences.items())
+                self.stdout.write(f'course {course_id}: {details}')
+                drifted.append(course_id)
+
+        if not drifted:
+            self.stdout.write(f'{len(live)} course rollup(s) consistent.')
+            return
+        if options['fix']:
+            CourseStats.objects.rebuild(drifted)
+            self.stdout.write(f'Rebuilt {len(drifted)} drifted rollup(s).')
+            return
+        raise CommandError(f'{len(drifted)} course rollup(s) out of sync; rerun with --fix to rebuild them.')
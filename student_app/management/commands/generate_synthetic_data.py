@@ -0,0 +1,136 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from student_app import catalog, coenrollment, leaderboard, search
+from student_app.models import (
+    Person, Profile, Instructor, Student, Course, Module, Enrollment, StudentCourse, Review, CourseStats,
+)
+
+
+FIRST_NAMES = [
+    'Aarav', 'Ana', 'Ben', 'Chen', 'Diya', 'Elena', 'Farah', 'George', 'Hana', 'Ivan', 'Jia', 'Kofi',
+    'Lena', 'Mateo', 'Nadia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sam', 'Tariq', 'Uma', 'Victor', 'Wei',
+]
+LAST_NAMES = [
+    'Ahmed', 'Brown', 'Costa', 'Dubois', 'Evans', 'Fischer', 'Garcia', 'Hughes', 'Ito', 'Jensen', 'Kim',
+    'Lopez', 'Mehta', 'Nowak', 'Okafor', 'Patel', 'Rossi', 'Silva', 'Tanaka', 'Usman', 'Varga', 'Wang',
+]
+SUBJECTS = [
+    'Algebra', 'Biology', 'Chemistry', 'Databases', 'Economics', 'French', 'Geometry', 'History',
+    'Machine Learning', 'Mathematics', 'Networks', 'Physics', 'Statistics', 'Web Development',
+]
+LEVELS = ['Introduction to', 'Intermediate', 'Advanced', 'Applied', 'Topics in']
+COMMENTS = ['Great course.', 'Too fast for me.', 'Clear explanations.', 'Good exercises.', 'Could be better.']
+
+
+class Command(BaseCommand):
+    help = (
+        'Insert synthetic persons, instructors, students, courses, modules, enrollments, marks and reviews '
+        'with bulk inserts. Course statistics, leaderboards, the search index, the course catalog and the co-enrollment index are rebuilt afterwards; no notifications are queued.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--instructors', type=int, default=20)
+        parser.add_argument('--courses', type=int, default=50)
+        parser.add_argument('--modules-per-course', type=int, default=8)
+        parser.add_argument('--courses-per-student', type=int, default=4, help='Enrollments (with marks) per student.')
+        parser.add_argument('--review-rate', type=float, default=0.3, help='Fraction of enrollments that get a review.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible datasets.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['instructors'] < 1 and options['courses']:
+            raise CommandError('Courses need at least one instructor.')
+        if options['courses_per_student'] > options['courses']:
+            raise CommandError('--courses-per-student cannot exceed --courses.')
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            # Emails are unique: number this run after any earlier synthetic rows.
+            self.offset = Person.objects.filter(email__startswith='synthetic-').count()
+            instructors = self._instructors(options['instructors'])
+            students = self._students(options['students'])
+            courses = self._courses(options['courses'], instructors)
+            self._modules(courses, options['modules_per_course'])
+            self._enrollments(students, courses, options['courses_per_student'], options['review_rate'])
+            # bulk_create bypasses the signals that maintain the rollups.
+            CourseStats.objects.rebuild(courses)
+            transaction.on_commit(lambda: leaderboard.rebuild(courses))
+            search.rebuild()
+            catalog.invalidate()
+            coenrollment.invalidate()
+
+        self.stdout.write(f'Done in {time.perf_counter() - started:.1f}s')
+
+    def _bulk(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.stdout.write(f'{len(created):>9} {model._meta.verbose_name_plural}')
+        return created
+
+    def _persons(self, count, role):
+        persons = []
+        for index in range(count):
+            number = self.offset + index
+            persons.append(Person(
+                email=f'synthetic-{role}-{number}@example.invalid',
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=self.random.choice(LAST_NAMES),
+                phone_number=f'+1555{self.random.randrange(10 ** 7):07d}',
+                address=f'{self.random.randint(1, 999)} Synthetic Street',
+                password='!',
+            ))
+        persons = self._bulk(Person, persons)
+        self._bulk(Profile, [Profile(person=person, bio='') for person in persons])
+        return persons
+
+    def _instructors(self, count):
+        persons = self._persons(count, 'instructor')
+        return self._bulk(Instructor, [
+            Instructor(person=person, bio='Synthetic instructor.', salary=self.random.randrange(30000, 150000, 500))
+            for person in persons
+        ])
+
+    def _students(self, count):
+        persons = self._persons(count, 'student')
+        return [student.pk for student in self._bulk(Student, [
+            Student(person=person, registration_number=f'REG{person.pk:08d}')
+            for person in persons
+        ])]
+
+    def _courses(self, count, instructors):
+        return [course.pk for course in self._bulk(Course, [
+            Course(
+                name=f'{self.random.choice(LEVELS)} {self.random.choice(SUBJECTS)} {index}',
+                description='Synthetic course.',
+                instructor=self.random.choice(instructors),
+            )
+            for index in range(count)
+        ])]
+
+    def _modules(self, courses, per_course):
+        self._bulk(Module, [
+            Module(course_id=course_id, name=f'Module {number}', description='Synthetic module.')
+            for course_id in courses
+            for number in range(1, per_course + 1)
+        ])
+
+    def _enrollments(self, students, courses, per_student, review_rate):
+        enrollments, marks, reviews = [], [], []
+        for student_id in students:
+            ability = self.random.gauss(65, 12)
+            for course_id in self.random.sample(courses, per_student):
+                enrollments.append(Enrollment(student_id=student_id, course_id=course_id))
+                mark = min(100, max(0, round(self.random.gauss(ability, 10))))
+                marks.append(StudentCourse(student_id=student_id, course_id=course_id, marks=mark))
+                if self.random.random() < review_rate:
+                    rating = self.random.choices((1, 2, 3, 4, 5), weights=(1, 2, 4, 6, 4))[0]
+                    reviews.append(Review(student_id=student_id, course_id=course_id, rating=rating, comment=self.random.choice(COMMENTS)))
+        self._bulk(Enrollment, enrollments)
+        self._bulk(StudentCourse, marks)
+        self._bulk(Review, reviews)
@@ -0,0 +1,103 @@
+import csv
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, Max, Min
+
+from student_app import analytics
+from student_app.models import StudentCourse
+
+
+class Command(BaseCommand):
+    help = (
+        'Marks statistics per course, term or course and term from the columnar engine behind '
+        '/api/courses/marks-report/, optionally written to --output as CSV. --synthetic N runs the '
+        'grouping on N random rows instead of the database and reports timings; --check compares '
+        'sampled groups against numpy.percentile and numpy.std on the raw rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', choices=analytics.MARKS_GROUPS, default='course')
+        parser.add_argument('--output', default=None, help='CSV file for the report rows.')
+        parser.add_argument('--synthetic', type=int, default=0, help='Rows of random marks to benchmark on.')
+        parser.add_argument('--courses', type=int, default=1000, help='Courses in the synthetic data.')
+        parser.add_argument('--check', type=int, default=0, help='Groups to verify against the raw rows.')
+
+    def handle(self, *args, **options):
+        if analytics.np is None:
+            raise CommandError('NumPy is not installed.')
+        if options['synthetic']:
+            columns = self._synthetic(options['synthetic'], options['courses'])
+        else:
+            started = time.perf_counter()
+            columns = analytics.load_marks()
+            self.stdout.write(f'Loaded {len(columns["marks"])} rows in {(time.perf_counter() - started) * 1000:.0f} ms')
+            self._sql_baseline()
+
+        started = time.perf_counter()
+        keys, label, statistics = analytics.grouped_marks(columns, options['group'])
+        self.stdout.write(f'{len(keys)} {options["group"]} groups in {(time.perf_counter() - started) * 1000:.0f} ms')
+        if options['check']:
+            self._check(columns, options['group'], keys, statistics, options['check'])
+        if options['output']:
+            rows = analytics.marks_report(options['group'], columns=columns)
+            self._write(options['output'], rows)
+            self.stdout.write(f'Written {len(rows)} rows to {options["output"]}')
+
+    def _synthetic(self, count, courses):
+        np = analytics.np
+        started = time.perf_counter()
+        generator = np.random.default_rng(0)
+        columns = {
+            'student': generator.integers(1, count // 8 + 2, count, dtype=np.int64),
+            'course': generator.integers(1, courses + 1, count, dtype=np.int64),
+            'marks': generator.normal(70, 15, count).clip(0, 100).astype(np.int16),
+            'day': np.datetime64('2020-01-01') + generator.integers(0, 6 * 365, count).astype('timedelta64[D]'),
+        }
+        self.stdout.write(f'Generated {count} rows over {courses} courses in {(time.perf_counter() - started) * 1000:.0f} ms')
+        return columns
+
+    def _sql_baseline(self):
+        # What the per-course figures cost as a GROUP BY (without percentiles or bands).
+        started = time.perf_counter()
+        groups = list(
+            StudentCourse.objects.order_by().values('course')
+            .annotate(count=Count('pk'), mean=Avg('marks'), low=Min('marks'), high=Max('marks'))
+        )
+        self.stdout.write(f'SQL GROUP BY course (count, avg, min, max): {len(groups)} groups in {(time.perf_counter() - started) * 1000:.0f} ms')
+
+    def _check(self, columns, group, keys, statistics, count):
+        np = analytics.np
+        term_index, _ = analytics.terms(columns['day'])
+        mismatches = 0
+        for index in random.sample(range(len(keys)), min(count, len(keys))):
+            key = keys[index]
+            if group == 'course':
+                mask = columns['course'] == key
+            elif group == 'term':
+                mask = term_index == key
+            else:
+                mask = (columns['course'] == key[0]) & (term_index == key[1])
+            marks = columns['marks'][mask].astype(np.float64)
+            expected = [len(marks), marks.mean(), marks.std(), marks.min(), marks.max()]
+            expected += [np.percentile(marks, percent) for percent in analytics.MARK_PERCENTILES]
+            actual = [statistics[name][index] for name in ('count', 'mean', 'std', 'min', 'max')]
+            actual += [statistics[f'p{percent}'][index] for percent in analytics.MARK_PERCENTILES]
+            mismatches += not np.allclose(actual, expected)
+        self.stdout.write(f'Checked {min(count, len(keys))} groups against the raw rows: {mismatches} mismatches')
+
+    def _write(self, path, rows):
+        bands = [label for label, _ in analytics.DEFAULT_GRADE_BANDS]
+        if rows:
+            bands = list(rows[0]['bands'])
+        with open(path, 'w', newline='') as handle:
+            writer = None
+            for row in rows:
+                flat = {name: value for name, value in row.items() if name not in ('bands', 'distribution')}
+                flat.update((f'band_{band}', row['bands'][band]) for band in bands)
+                flat.update((f'{bucket * 10}-{bucket * 10 + 9 + (bucket == 9)}', value) for bucket, value in enumerate(row['distribution']))
+                if writer is None:
+                    writer = csv.DictWriter(handle, fieldnames=list(flat))
+                    writer.writeheader()
+                writer.writerow(flat)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from student_app.models import CourseStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute CourseStats rollups from live Review/Enrollment/StudentCourse aggregates (run after bulk writes).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('courses', nargs='*', type=int, help='Course ids to rebuild (default: all courses).')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        stats = CourseStats.objects.rebuild(options['courses'] or None, batch_size=options['batch_size'])
+        self.stdout.write(f'Rebuilt statistics for {len(stats)} course(s).')
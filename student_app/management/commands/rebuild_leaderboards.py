@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from student_app import leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        'Reload the course and global leaderboards from StudentCourse marks (run after bulk writes). '
+        'Only useful with the Redis backend; the in-process stand-in is rebuilt lazily by each process.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('courses', nargs='*', type=int, help='Course ids to rebuild (default: all courses).')
+
+    def handle(self, *args, **options):
+        if isinstance(leaderboard.store(), leaderboard.LocalSortedSet):
+            self.stdout.write('Leaderboards are in-process (LEADERBOARD_CACHE_ALIAS is not a Redis cache); nothing to do.')
+            return
+        leaderboard.rebuild(options['courses'] or None)
+        self.stdout.write('Rebuilt leaderboards.')
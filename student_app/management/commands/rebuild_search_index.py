@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from student_app import search
+
+
+class Command(BaseCommand):
+    help = 'Reindex every course, module and review (run after bulk writes that bypass signals).'
+
+    def handle(self, *args, **options):
+        backend = search.backend()
+        search.rebuild()
+        self.stdout.write(f'Rebuilt the search index ({type(backend).__name__}).')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student_app.enrollments import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Pair every Enrollment with a StudentCourse row and the reverse, in batches of students that each '
+        'commit on their own: an enrollment without marks gets an ungraded StudentCourse row, and marks '
+        'without an enrollment get their Enrollment. --dry-run only reports the drift.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Students per batch.')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        totals = reconcile(chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        missing = totals.get('studentcourse_created', 0) + totals.get('enrollment_created', 0)
+        self.stdout.write(
+            f"{totals.get('students', 0)} student(s): {totals.get('studentcourse_created', 0)} enrollment(s) without a "
+            f"StudentCourse row, {totals.get('enrollment_created', 0)} StudentCourse row(s) without an enrollment."
+        )
+        if not missing:
+            self.stdout.write('Enrollment and StudentCourse are consistent.')
+        elif options['dry_run']:
+            raise CommandError(f'{missing} row(s) missing; rerun without --dry-run to add them.')
+        else:
+            self.stdout.write(f'Added {missing} row(s).')
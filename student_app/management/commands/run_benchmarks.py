@@ -0,0 +1,213 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from rest_framework.test import APIClient
+
+from student_app import urls
+from student_app.models import Course, StudentCourse
+from student_app.urls import router
+
+
+CACHE_BACKENDS = {
+    'dummy': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    'locmem': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+}
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every GET route in student_app/urls.py against the current database '
+        '(see generate_synthetic_data) and report p50/p95 latency, queries and peak memory per route. '
+        'Write the results with --output and compare two runs with --compare.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--cache', choices=['dummy', 'locmem', 'configured'], default='dummy',
+                            help='Cache backend for the run; "dummy" measures uncached representations.')
+        parser.add_argument('--routes', help='Comma separated substrings; only matching route names are run.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='Baseline JSON file from an earlier run.')
+        parser.add_argument('--threshold', type=float, default=10.0, help='Regression threshold for p50, in percent.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model()(username='benchmark', is_staff=True, is_superuser=True))
+        routes = self._routes(options['page_size'])
+        if options['routes']:
+            wanted = options['routes'].split(',')
+            routes = [route for route in routes if any(part in route[0] for part in wanted)]
+
+        caches = {} if options['cache'] == 'configured' else {'CACHES': CACHE_BACKENDS[options['cache']]}
+        results, skipped = {}, {}
+        with override_settings(**caches):
+            self.stdout.write(f"{'route':<40} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'peak KiB':>9}")
+            for name, url, params in routes:
+                # Error responses are not timed: they would only measure the error path.
+                status = self._request(url, params).status_code
+                if not (200 <= status < 300 or status == 304):
+                    skipped[name] = {'url': url, 'status': status}
+                    self.stdout.write(f'{name:<40} {status:>6} skipped')
+                    continue
+                results[name] = self._measure(url, params, options['iterations'], options['warmup'])
+                result = results[name]
+                self.stdout.write(
+                    f"{name:<40} {result['status']:>6} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                    f"{result['queries']:>8} {result['peak_kib']:>9.1f}"
+                )
+
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cache': options['cache'],
+                'iterations': options['iterations'],
+                'page_size': options['page_size'],
+            },
+            'results': results,
+            'skipped': skipped,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['compare']:
+            regressions = self._compare(options['compare'], results, skipped, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} route(s) regressed: ' + ', '.join(regressions))
+
+    def _routes(self, page_size):
+        # (name, url, query params) for every GET route: router list, detail and
+        # extra actions, then the plain views in urlpatterns. Detail routes use
+        # the first row the viewset itself serves, so its filters apply.
+        routes = []
+        for prefix, viewset, basename in router.registry:
+            view = viewset(action='retrieve', request=None, format_kwarg=None, kwargs={})
+            pk = view.get_queryset().order_by('pk').values_list('pk', flat=True).first()
+            routes.append((f'{basename}-list', reverse(f'{basename}-list'), {'page_size': page_size}))
+            if pk is None:
+                self.stdout.write(f'{basename}: no rows in get_queryset(), detail routes skipped')
+            else:
+                routes.append((f'{basename}-detail', reverse(f'{basename}-detail', args=[pk]), {}))
+            for extra in viewset.get_extra_actions():
+                if 'get' not in extra.mapping:
+                    continue
+                name = f'{basename}-{extra.url_name}'
+                if extra.detail:
+                    if pk is not None:
+                        routes.append((name, reverse(name, args=[pk]), self._params(name, pk)))
+                else:
+                    routes.append((name, reverse(name), self._params(name, None)))
+        for pattern in urls.urlpatterns:
+            if isinstance(pattern, URLPattern) and pattern.name and not pattern.pattern.converters:
+                routes.append((pattern.name, reverse(pattern.name), self._params(pattern.name, None)))
+        return routes
+
+    def _params(self, name, pk):
+        # Query parameters the route requires.
+        if name == 'course-get-student-rank':
+            student_id = StudentCourse.objects.filter(course_id=pk, marks__isnull=False).values_list('student_id', flat=True).first()
+            return {'student': student_id} if student_id is not None else {}
+        if name == 'search':
+            course = Course.objects.order_by('pk').values_list('name', flat=True).first()
+            return {'q': course.split()[0]} if course else {}
+        return {}
+
+    def _request(self, url, params):
+        response = self.client.get(url, params, HTTP_HOST='localhost')
+        if getattr(response, 'streaming', False):
+            # Streaming responses do their work while being consumed.
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def _measure(self, url, params, iterations, warmup):
+        for _ in range(warmup):
+            self._request(url, params)
+
+        timings, query_counts = [], []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = self._request(url, params)
+                timings.append(time.perf_counter() - started)
+            query_counts.append(len(queries))
+
+        # tracemalloc slows everything down, so memory gets its own request.
+        tracemalloc.start()
+        try:
+            self._request(url, params)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': statistics.median(timings) * 1000,
+            'p95_ms': _percentile(timings, 95) * 1000,
+            'mean_ms': statistics.fmean(timings) * 1000,
+            'queries': max(query_counts),
+            'peak_kib': peak / 1024,
+        }
+
+    def _compare(self, path, results, skipped, threshold):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        self.stdout.write(f"\nCompared with {path} (commit {baseline['meta'].get('commit')}):")
+        regressions = []
+        for name, result in skipped.items():
+            if name in baseline['results']:
+                self.stdout.write(f"{name:<40} now returns {result['status']}  REGRESSION")
+                regressions.append(name)
+        for name, result in results.items():
+            before = baseline['results'].get(name)
+            if before is None:
+                self.stdout.write(f'{name:<40} new route')
+                continue
+            if not (200 <= before['status'] < 300 or before['status'] == 304):
+                # Baselines written before error responses were skipped.
+                self.stdout.write(f"{name:<40} baseline returned {before['status']}, not compared")
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+            regressed = change > threshold or result['queries'] > before['queries']
+            if regressed:
+                regressions.append(name)
+            self.stdout.write(
+                f"{name:<40} p50 {before['p50_ms']:>8.2f} -> {result['p50_ms']:>8.2f} ms ({change:+.1f}%) "
+                f"queries {before['queries']} -> {result['queries']}{'  REGRESSION' if regressed else ''}"
+            )
+        return regressions
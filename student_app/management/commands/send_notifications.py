@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from student_app.notifications import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = 'Drain the notification outbox, sending queued emails in batches over a shared connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Messages per send_messages() call.')
+        parser.add_argument('--concurrency', type=int, help='Number of sender threads, each with its own connection.')
+        parser.add_argument('--limit', type=int, help='Maximum number of outbox rows to process per pass.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting once it is empty.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls in --loop mode.')
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(batch_size=options['batch_size'], concurrency=options['concurrency'])
+        while True:
+            stats = worker.drain(limit=options['limit'])
+            if stats['jobs'] or stats['failed']:
+                self.stdout.write(
+                    f"jobs={stats['jobs']} failed={stats['failed']} batches={stats['batches']} "
+                    f"messages={stats['messages']} elapsed={stats['elapsed']:.3f}s "
+                    f"rate={stats['messages_per_second']:.1f} msg/s"
+                )
+            if not options['loop']:
+                break
+            if not stats['jobs'] and not stats['failed']:
+                time.sleep(options['interval'])
@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database onto every SQLite alias in DATABASE_REPLICAS '
+        '(online backup, so the primary stays usable). Stands in for replication when '
+        'trying replica routing locally; use --loop to refresh them continuously.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep copying every --interval seconds.')
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        replicas = list(getattr(settings, 'DATABASE_REPLICAS', []))
+        if not replicas:
+            raise CommandError('DATABASE_REPLICAS is empty (see SQLITE_REPLICAS in settings).')
+        for alias in [DEFAULT_DB_ALIAS, *replicas]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias} is not SQLite; replication is up to the database server.')
+
+        while True:
+            started = time.perf_counter()
+            self._sync(replicas)
+            self.stdout.write(f'Synced {len(replicas)} replica(s) in {(time.perf_counter() - started) * 1000:.1f} ms')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def _sync(self, replicas):
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        for alias in replicas:
+            # Closing first so the replica's own Django connection sees the new file contents.
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
@@ -0,0 +1,251 @@
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+logger = logging.getLogger('student_app.metrics')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('request_metrics', default=None)
+
+# Shortens "IN (%s, %s, ...)" placeholder lists in reported shapes.
+_PLACEHOLDER_LIST = re.compile(r'%s(?:, %s)+')
+
+
+class RequestMetrics:
+    __slots__ = ('view', 'started', 'queries', 'db_time', 'shapes', 'aliases', 'cache_hits', 'cache_misses',
+                 'serializer_time', 'serializer_depth', 'signals', 'exception')
+
+    def __init__(self):
+        self.view = None
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+        self.aliases = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.signals = Counter()
+        self.exception = None
+
+    def repeated_shapes(self, threshold):
+        return [(shape, count) for shape, count in self.shapes.items() if count >= threshold]
+
+
+def current():
+    return _current.get()
+
+
+def start():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    # Installed permanently on every connection by RequestMetricsMiddleware (a
+    # scoped connection.execute_wrapper() would miss the sync_to_async threads
+    # async views query from); it only records while a request's metrics are current.
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+        metrics.shapes[sql] += 1
+        metrics.aliases[context['connection'].alias] += 1
+
+
+def record_cache(name, amount=1):
+    metrics = _current.get()
+    if metrics is not None:
+        if name == 'hits':
+            metrics.cache_hits += amount
+        elif name == 'misses':
+            metrics.cache_misses += amount
+
+
+@contextmanager
+def serializer_timer():
+    # Nested serializers run inside their parent's timer; only the outermost is counted.
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    metrics.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_depth -= 1
+        if not metrics.serializer_depth:
+            metrics.serializer_time += time.perf_counter() - started
+
+
+def counting_receiver(func):
+    # Wraps a signal receiver to count its executions in the current request.
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.signals[func.__name__] += 1
+        return func(*args, **kwargs)
+    wrapper.counts_signals = True
+    return wrapper
+
+
+def record_exception(view, exc):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.view = metrics.view or view
+        metrics.exception = type(exc).__name__
+
+
+class _Series:
+    __slots__ = ('count', 'duration', 'buckets', 'queries', 'aliases', 'db_time', 'cache_hits', 'cache_misses',
+                 'serializer_time', 'signals', 'n_plus_one')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.queries = 0
+        self.aliases = Counter()
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serializer_time = 0.0
+        self.signals = 0
+        self.n_plus_one = 0
+
+
+class Registry:
+    # Per-process aggregates keyed by (view, method, status).
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = defaultdict(_Series)
+
+    def observe(self, key, metrics, duration, n_plus_one):
+        with self._lock:
+            series = self._series[key]
+            series.count += 1
+            series.duration += duration
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    series.buckets[index] += 1
+                    break
+            series.queries += metrics.queries
+            series.aliases.update(metrics.aliases)
+            series.db_time += metrics.db_time
+            series.cache_hits += metrics.cache_hits
+            series.cache_misses += metrics.cache_misses
+            series.serializer_time += metrics.serializer_time
+            series.signals += sum(metrics.signals.values())
+            series.n_plus_one += n_plus_one
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        with self._lock:
+            series = sorted(self._series.items())
+            lines = []
+            for name, kind, help_text, value in _FAMILIES:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for key, item in series:
+                    if kind == 'histogram':
+                        lines.extend(_histogram_lines(name, key, item))
+                    elif value is None:
+                        lines.extend(f'{name}{{{_labels(key, alias=alias)}}} {count}' for alias, count in sorted(item.aliases.items()))
+                    else:
+                        lines.append(f'{name}{{{_labels(key)}}} {value(item)}')
+            return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(key, **extra):
+    view, method, status = key
+    pairs = [('view', view), ('method', method), ('status', status), *extra.items()]
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def _histogram_lines(name, key, item):
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, item.buckets):
+        cumulative += count
+        yield f'{name}_bucket{{{_labels(key, le=bound)}}} {cumulative}'
+    yield f'{name}_bucket{{{_labels(key, le="+Inf")}}} {item.count}'
+    yield f'{name}_sum{{{_labels(key)}}} {item.duration}'
+    yield f'{name}_count{{{_labels(key)}}} {item.count}'
+
+
+_FAMILIES = [
+    ('http_request_duration_seconds', 'histogram', 'Wall time spent producing the response.', None),
+    ('db_queries_total', 'counter', 'Database queries executed.', lambda item: item.queries),
+    ('db_queries_by_alias_total', 'counter', 'Database queries executed, by database alias.', None),
+    ('db_query_duration_seconds_total', 'counter', 'Time spent in database queries.', lambda item: item.db_time),
+    ('object_cache_hits_total', 'counter', 'Serializer cache hits.', lambda item: item.cache_hits),
+    ('object_cache_misses_total', 'counter', 'Serializer cache misses.', lambda item: item.cache_misses),
+    ('serializer_duration_seconds_total', 'counter', 'Time spent in serializer to_representation.', lambda item: item.serializer_time),
+    ('signal_receiver_calls_total', 'counter', 'Executions of student_app.signals receivers.', lambda item: item.signals),
+    ('n_plus_one_requests_total', 'counter', 'Requests that repeated one SQL shape above the threshold.', lambda item: item.n_plus_one),
+]
+
+
+registry = Registry()
+
+
+def finish(metrics, method, status):
+    duration = time.perf_counter() - metrics.started
+    threshold = getattr(settings, 'REQUEST_METRICS_N_PLUS_ONE_THRESHOLD', 10)
+    repeated = metrics.repeated_shapes(threshold)
+    view = metrics.view or 'unresolved'
+    registry.observe((view, method, status), metrics, duration, 1 if repeated else 0)
+
+    level = logging.WARNING if repeated else logging.INFO
+    if not logger.isEnabledFor(level):
+        return None
+    record = {
+        'view': view,
+        'method': method,
+        'status': status,
+        'duration_ms': round(duration * 1000, 3),
+        'queries': metrics.queries,
+        'queries_by_alias': dict(metrics.aliases),
+        'db_ms': round(metrics.db_time * 1000, 3),
+        'cache_hits': metrics.cache_hits,
+        'cache_misses': metrics.cache_misses,
+        'serializer_ms': round(metrics.serializer_time * 1000, 3),
+        'signals': sum(metrics.signals.values()),
+    }
+    if metrics.signals:
+        record['signals_by_receiver'] = dict(metrics.signals.most_common())
+    if metrics.exception:
+        record['exception'] = metrics.exception
+    if repeated:
+        record['n_plus_one'] = [{'sql': _PLACEHOLDER_LIST.sub('%s, ...', shape), 'count': count} for shape, count in repeated]
+    logger.log(level, json.dumps(record))
+    return record
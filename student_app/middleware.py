@@ -0,0 +1,79 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+
+def _instrument(connection):
+    if metrics.query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.query_wrapper)
+
+
+def _instrument_new_connection(sender, connection, **kwargs):
+    _instrument(connection)
+
+
+class RequestMetricsMiddleware:
+    # Records wall time, query count/time, object cache hits, serializer time and
+    # signal receiver calls per view; see student_app.metrics for the aggregation
+    # and export.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Otherwise Django runs process_view through sync_to_async.
+            self.process_view = self._aprocess_view
+        # Async views query from sync_to_async threads, so the wrapper goes on
+        # every connection as it opens; outside a request it is a no-op.
+        connection_created.connect(_instrument_new_connection, dispatch_uid='student_app.middleware.instrument')
+        for connection in connections.all(initialized_only=True):
+            _instrument(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request_metrics, token = metrics.start()
+        try:
+            response = self.get_response(request)
+            metrics.finish(request_metrics, request.method, response.status_code)
+            return response
+        finally:
+            metrics.stop(token)
+
+    async def __acall__(self, request):
+        request_metrics, token = metrics.start()
+        try:
+            response = await self.get_response(request)
+            metrics.finish(request_metrics, request.method, response.status_code)
+            return response
+        finally:
+            metrics.stop(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self._name_view(request, view_func)
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self._name_view(request, view_func)
+        return None
+
+    def _name_view(self, request, view_func):
+        request_metrics = metrics.current()
+        if request_metrics is None:
+            return
+        cls = getattr(view_func, 'cls', None)
+        actions = getattr(view_func, 'actions', None)
+        if cls is not None and actions:
+            request_metrics.view = f'{cls.__name__}.{actions.get(request.method.lower(), request.method.lower())}'
+        elif cls is not None:
+            request_metrics.view = cls.__name__
+        else:
+            request_metrics.view = getattr(request.resolver_match, 'view_name', None) or view_func.__name__
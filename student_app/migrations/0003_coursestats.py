@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_course_stats(apps, schema_editor):
+    Course = apps.get_model('student_app', 'Course')
+    CourseStats = apps.get_model('student_app', 'CourseStats')
+    Review = apps.get_model('student_app', 'Review')
+    Enrollment = apps.get_model('student_app', 'Enrollment')
+    StudentCourse = apps.get_model('student_app', 'StudentCourse')
+
+    stats = {pk: CourseStats(course_id=pk) for pk in Course.objects.values_list('pk', flat=True)}
+    for row in Review.objects.values('course_id', 'rating').annotate(total=Count('id')).order_by():
+        course_stats = stats[row['course_id']]
+        course_stats.review_count += row['total']
+        course_stats.rating_sum += row['rating'] * row['total']
+        setattr(course_stats, f"rating_{row['rating']}", row['total'])
+    for row in Enrollment.objects.values('course_id').annotate(total=Count('id')).order_by():
+        stats[row['course_id']].enrollment_count = row['total']
+    for row in StudentCourse.objects.values('course_id').annotate(total=Count('id'), marks=Sum('marks')).order_by():
+        stats[row['course_id']].marks_count = row['total']
+        stats[row['course_id']].marks_sum = row['marks'] or 0
+    CourseStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0002_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='student_app.course')),
+                ('review_count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_1', models.IntegerField(default=0)),
+                ('rating_2', models.IntegerField(default=0)),
+                ('rating_3', models.IntegerField(default=0)),
+                ('rating_4', models.IntegerField(default=0)),
+                ('rating_5', models.IntegerField(default=0)),
+                ('enrollment_count', models.IntegerField(default=0)),
+                ('marks_sum', models.BigIntegerField(default=0)),
+                ('marks_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_course_stats, migrations.RunPython.noop),
+    ]
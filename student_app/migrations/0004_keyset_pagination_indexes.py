@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0003_coursestats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['name', 'id'], name='course_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['-enrollment_date', 'id'], name='enrollment_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='instructor',
+            index=models.Index(fields=['-salary', 'id'], name='instructor_salary_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(fields=['name', 'id'], name='module_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['last_name', 'id'], name='person_last_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-rating', 'id'], name='review_rating_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['registration_number', 'id'], name='student_registration_id_idx'),
+        ),
+    ]
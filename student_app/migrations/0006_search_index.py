@@ -0,0 +1,44 @@
+from django.db import migrations, transaction
+from django.db.utils import OperationalError
+
+
+# Mirrors student_app.search.DOCUMENT_TYPES: rowid = object id * 4 + type code.
+DOCUMENTS = [
+    (1, 'student_app_course', 'name', 'description'),
+    (2, 'student_app_module', 'name', 'description'),
+    (3, 'student_app_review', "''", 'comment'),
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Other databases (and SQLite builds without FTS5) use the in-process index.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE student_app_search USING fts5("
+                "title, body, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+            )
+    except OperationalError:
+        return
+    for code, table, title, body in DOCUMENTS:
+        schema_editor.execute(
+            f'INSERT INTO student_app_search (rowid, title, body) SELECT id * 4 + {code}, {title}, {body} FROM {table}'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS student_app_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,86 @@
+import datetime
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import DateTimeField, Min, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce
+
+
+# Rows with no dated history at all (a course nobody enrolled in, a student
+# without courses) get this fixed date, so they sort as old rather than as
+# created when the migration ran.
+EPOCH = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _earliest(model, field, **filters):
+    rows = model.objects.filter(**filters).order_by().values(*filters).annotate(first=Min(field)).values('first')
+    return Cast(Subquery(rows), DateTimeField())
+
+
+def backfill_created_at(apps, schema_editor):
+    # Existing rows get the earliest date they are known to have existed:
+    # a student's first enrollment, a course's first enrollment, a review's
+    # enrollment in its course. updated_at would not do: migration 0005
+    # filled it with the time it ran.
+    Course, Student, Review = (apps.get_model('student_app', name) for name in ('Course', 'Student', 'Review'))
+    Enrollment, StudentCourse = (apps.get_model('student_app', name) for name in ('Enrollment', 'StudentCourse'))
+    epoch = models.Value(EPOCH, output_field=DateTimeField())
+    Student.objects.update(created_at=Coalesce(
+        _earliest(StudentCourse, 'date_enrolled', student=OuterRef('pk')),
+        _earliest(Enrollment, 'enrollment_date', student=OuterRef('pk')),
+        epoch,
+    ))
+    Course.objects.update(created_at=Coalesce(
+        _earliest(Enrollment, 'enrollment_date', course=OuterRef('pk')),
+        _earliest(StudentCourse, 'date_enrolled', course=OuterRef('pk')),
+        epoch,
+    ))
+    Review.objects.update(created_at=Coalesce(
+        _earliest(Enrollment, 'enrollment_date', student=OuterRef('student_id'), course=OuterRef('course_id')),
+        epoch,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-created_at', 'id'], name='course_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at', 'id'], name='review_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-created_at', 'id'], name='student_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentcourse',
+            index=models.Index(fields=['student', 'date_enrolled'], name='student_date_enrolled_idx'),
+        ),
+    ]
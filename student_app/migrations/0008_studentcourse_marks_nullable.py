@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:55
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0007_created_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentcourse',
+            name='marks',
+            field=models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)]),
+        ),
+    ]
@@ -1,8 +1,12 @@
 from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Avg, Min, Max, Sum, F, Q, Value, Case, When
-from django.db.models.functions import Concat
+from django.db.models import Avg, Min, Max, Sum, Count, F, Q, Value, Case, When
+from django.db.models.functions import Concat, NullIf
+from django.utils import timezone
+from datetime import timedelta
+
+from .activity import window_filter
 
 
 class PersonManager(BaseUserManager):
@@ -45,6 +49,8 @@ class Person(AbstractBaseUser):
    address = models.CharField(max_length=255)
    is_active = models.BooleanField(default=True)
    is_admin = models.BooleanField(default=False)
+   # Bumped on every save; conditional GETs derive their ETag from it.
+   updated_at = models.DateTimeField(auto_now=True)
 
 
    objects = PersonManager()
@@ -58,9 +64,16 @@ class Person(AbstractBaseUser):
        return self.email
 
 
+   class Meta:
+       indexes = [
+           models.Index(fields=['last_name', 'id'], name='person_last_name_id_idx'),
+       ]
+
+
 class Profile(models.Model):
    person = models.OneToOneField(Person, on_delete=models.CASCADE)
    bio = models.TextField(blank=True)
+   updated_at = models.DateTimeField(auto_now=True)
 
 
    def __str__(self):
@@ -71,6 +84,7 @@ class Instructor(models.Model):
    person = models.OneToOneField(Person, on_delete=models.CASCADE)
    bio = models.TextField()
    salary = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+   updated_at = models.DateTimeField(auto_now=True)
 
 
    def __str__(self):
@@ -83,31 +97,49 @@ class Instructor(models.Model):
 
 
    def get_top_rated_course(self):
-       return self.courses.annotate(average_rating=Avg('reviews__rating')).order_by('-average_rating').first()
+       return self.courses.annotate(
+           average_rating=F('stats__rating_sum') * 1.0 / NullIf(F('stats__review_count'), 0)
+       ).order_by(F('average_rating').desc(nulls_last=True)).first()
 
 
    def get_high_salary_instructors_above(self, base_salary):
         return Instructor.objects.filter(salary__gte=base_salary * 1.2)
 
 
+   class Meta:
+       indexes = [
+           models.Index(fields=['-salary', 'id'], name='instructor_salary_id_idx'),
+       ]
+
+
 
 class Course(models.Model):
    name = models.CharField(max_length=255)
    description = models.TextField()
    instructor = models.ForeignKey(Instructor, on_delete=models.CASCADE, related_name='courses')
+   created_at = models.DateTimeField(auto_now_add=True)
+   updated_at = models.DateTimeField(auto_now=True)
 
 
    def __str__(self):
        return self.name
 
 
+   @property
+   def course_stats(self):
+       try:
+           return self.stats
+       except CourseStats.DoesNotExist:
+           return CourseStats.objects.compute([self.pk])[self.pk]
+
+
    @property
    def number_of_students(self):
-       return self.students.count()
+       return self.course_stats.enrollment_count
 
 
    def get_average_rating(self):
-       return self.reviews.aggregate(Avg('rating'))['rating__avg']
+       return self.course_stats.average_rating
 
 
    def get_students_values(self):
@@ -132,10 +164,19 @@ class Course(models.Model):
        ).values('full_name')
 
 
+   class Meta:
+       indexes = [
+           models.Index(fields=['name', 'id'], name='course_name_id_idx'),
+           models.Index(fields=['-created_at', 'id'], name='course_created_id_idx'),
+       ]
+
+
 class Student(models.Model):
    person = models.OneToOneField(Person, on_delete=models.CASCADE)
    registration_number = models.CharField(max_length=30)
    courses = models.ManyToManyField(Course, through='StudentCourse', related_name='students')
+   created_at = models.DateTimeField(auto_now_add=True)
+   updated_at = models.DateTimeField(auto_now=True)
 
 
    def __str__(self):
@@ -155,46 +196,74 @@ class Student(models.Model):
        return self.studentcourse_set.filter(marks__gt=90).values('course__name', 'marks')
 
 
-   def get_recent_courses(self):
-       return self.courses.filter(studentcourse__date_enrolled__gte=F('studentcourse__date_enrolled') - timedelta(days=30))
+   def get_recent_courses(self, since=None, until=None):
+       # Both conditions in one filter() so they apply to this student's own
+       # StudentCourse rows (the student_date_enrolled_idx range).
+       since = since or timezone.now() - timedelta(days=30)
+       return Course.objects.filter(window_filter('studentcourse__date_enrolled', since, until, date_only=True), studentcourse__student=self)
+
+
+   class Meta:
+       indexes = [
+           models.Index(fields=['registration_number', 'id'], name='student_registration_id_idx'),
+           models.Index(fields=['-created_at', 'id'], name='student_created_id_idx'),
+       ]
 
 
 class StudentCourse(models.Model):
    student = models.ForeignKey(Student, on_delete=models.CASCADE)
    course = models.ForeignKey(Course, on_delete=models.CASCADE)
-   marks = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(100)])
+   # NULL until graded: every enrollment has its row here (student_app.enrollments).
+   marks = models.IntegerField(null=True, blank=True, validators=[MinValueValidator(0), MaxValueValidator(100)])
    date_enrolled = models.DateField(auto_now_add=True)
+   updated_at = models.DateTimeField(auto_now=True)
 
 
    class Meta:
        unique_together = ('student', 'course')
+       indexes = [
+           models.Index(fields=['student', 'date_enrolled'], name='student_date_enrolled_idx'),
+       ]
 
 
 class Enrollment(models.Model):
    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrollments')
    course = models.ForeignKey(Course, on_delete=models.CASCADE)
    enrollment_date = models.DateField(auto_now_add=True)
+   updated_at = models.DateTimeField(auto_now=True)
 
 
    class Meta:
        unique_together = ('student', 'course')
+       indexes = [
+           models.Index(fields=['-enrollment_date', 'id'], name='enrollment_date_id_idx'),
+       ]
 
 
 class Module(models.Model):
    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='modules')
    name = models.CharField(max_length=100)
    description = models.TextField()
+   updated_at = models.DateTimeField(auto_now=True)
 
 
    def __str__(self):
        return self.name
 
 
+   class Meta:
+       indexes = [
+           models.Index(fields=['name', 'id'], name='module_name_id_idx'),
+       ]
+
+
 class Review(models.Model):
    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='reviews')
    student = models.ForeignKey(Student, on_delete=models.CASCADE)
    rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
    comment = models.TextField()
+   created_at = models.DateTimeField(auto_now_add=True)
+   updated_at = models.DateTimeField(auto_now=True)
 
 
    def __str__(self):
@@ -202,6 +271,10 @@ class Review(models.Model):
 
 
    class Meta:
+       indexes = [
+           models.Index(fields=['-rating', 'id'], name='review_rating_id_idx'),
+           models.Index(fields=['-created_at', 'id'], name='review_created_id_idx'),
+       ]
        constraints = [
            models.UniqueConstraint(
                fields=['course', 'student'],
@@ -215,3 +288,164 @@ class Review(models.Model):
 
 
 
+
+
+
+class CourseStatsManager(models.Manager):
+   def compute(self, course_ids=None):
+       # Live aggregates for the given courses (all courses when None), unsaved.
+       courses = Course.objects.all()
+       reviews = Review.objects.all()
+       enrollments = Enrollment.objects.all()
+       marks = StudentCourse.objects.all()
+       if course_ids is not None:
+           courses = courses.filter(pk__in=course_ids)
+           reviews = reviews.filter(course_id__in=course_ids)
+           enrollments = enrollments.filter(course_id__in=course_ids)
+           marks = marks.filter(course_id__in=course_ids)
+
+       stats = {pk: self.model(course_id=pk) for pk in courses.values_list('pk', flat=True)}
+       for row in reviews.values('course_id', 'rating').annotate(total=Count('id')).order_by():
+           course_stats = stats[row['course_id']]
+           course_stats.review_count += row['total']
+           course_stats.rating_sum += row['rating'] * row['total']
+           setattr(course_stats, f"rating_{row['rating']}", row['total'])
+       for row in enrollments.values('course_id').annotate(total=Count('id')).order_by():
+           stats[row['course_id']].enrollment_count = row['total']
+       for row in marks.values('course_id').annotate(total=Count('marks'), marks=Sum('marks')).order_by():
+           stats[row['course_id']].marks_count = row['total']
+           stats[row['course_id']].marks_sum = row['marks'] or 0
+       return stats
+
+
+   def rebuild(self, course_ids=None, batch_size=500):
+       stats = self.compute(course_ids)
+       self.bulk_create(
+           stats.values(),
+           batch_size=batch_size,
+           update_conflicts=True,
+           unique_fields=['course'],
+           update_fields=self.model.COUNTER_FIELDS,
+       )
+       return stats
+
+
+   def apply(self, course_id, deltas, sign=1):
+       if deltas:
+           self.filter(course_id=course_id).update(**{field: F(field) + sign * delta for field, delta in deltas.items()})
+
+
+class CourseStats(models.Model):
+   COUNTER_FIELDS = [
+       'review_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
+       'enrollment_count', 'marks_sum', 'marks_count',
+   ]
+
+   course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+   review_count = models.IntegerField(default=0)
+   rating_sum = models.IntegerField(default=0)
+   rating_1 = models.IntegerField(default=0)
+   rating_2 = models.IntegerField(default=0)
+   rating_3 = models.IntegerField(default=0)
+   rating_4 = models.IntegerField(default=0)
+   rating_5 = models.IntegerField(default=0)
+   enrollment_count = models.IntegerField(default=0)
+   # marks_count is the number of graded StudentCourse rows
+   marks_sum = models.BigIntegerField(default=0)
+   marks_count = models.IntegerField(default=0)
+
+
+   objects = CourseStatsManager()
+
+
+   def __str__(self):
+       return f"Statistics for course {self.course_id}"
+
+
+   @property
+   def rating_histogram(self):
+       return {rating: getattr(self, f'rating_{rating}') for rating in range(1, 6)}
+
+
+   @property
+   def rating_min(self):
+       return next((rating for rating, total in self.rating_histogram.items() if total > 0), None)
+
+
+   @property
+   def rating_max(self):
+       return next((rating for rating, total in reversed(self.rating_histogram.items()) if total > 0), None)
+
+
+   @property
+   def average_rating(self):
+       return self.rating_sum / self.review_count if self.review_count else None
+
+
+   @property
+   def average_marks(self):
+       return self.marks_sum / self.marks_count if self.marks_count else None
+
+
+   def as_statistics(self):
+       # Same keys as reviews.aggregate(Avg, Min, Max, Sum) on 'rating'
+       return {
+           'rating__avg': self.average_rating,
+           'rating__min': self.rating_min,
+           'rating__max': self.rating_max,
+           'rating__sum': self.rating_sum if self.review_count else None,
+       }
+
+
+   def differences(self, other):
+       return {
+           field: (getattr(self, field), getattr(other, field))
+           for field in self.COUNTER_FIELDS
+           if getattr(self, field) != getattr(other, field)
+       }
+
+
+class Notification(models.Model):
+   PENDING = 'pending'
+   PROCESSING = 'processing'
+   SENT = 'sent'
+   FAILED = 'failed'
+   STATUS_CHOICES = [
+       (PENDING, 'Pending'),
+       (PROCESSING, 'Processing'),
+       (SENT, 'Sent'),
+       (FAILED, 'Failed'),
+   ]
+
+   # Audiences are expanded by the worker at send time instead of being
+   # materialized into one row per recipient.
+   AUDIENCE_STUDENTS = 'students'
+   AUDIENCE_CHOICES = [
+       (AUDIENCE_STUDENTS, 'All students'),
+   ]
+
+   subject = models.CharField(max_length=255)
+   message = models.TextField()
+   from_email = models.EmailField(default='from@example.com')
+   audience = models.CharField(max_length=20, choices=AUDIENCE_CHOICES, blank=True)
+   recipients = models.JSONField(default=list, blank=True)
+   status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+   cursor = models.PositiveBigIntegerField(default=0)
+   attempts = models.PositiveIntegerField(default=0)
+   sent_count = models.PositiveIntegerField(default=0)
+   last_error = models.TextField(blank=True)
+   created_at = models.DateTimeField(auto_now_add=True)
+   # Set when a worker claims the job and on every checkpoint; a PROCESSING
+   # job whose claim is older than NOTIFICATION_CLAIM_TIMEOUT is reclaimed.
+   claimed_at = models.DateTimeField(null=True, blank=True)
+   processed_at = models.DateTimeField(null=True, blank=True)
+
+
+   def __str__(self):
+       return f"{self.subject} ({self.status})"
+
+
+   class Meta:
+       indexes = [
+           models.Index(fields=['status', 'created_at'], name='notification_status_idx'),
+       ]
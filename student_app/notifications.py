@@ -0,0 +1,149 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification, Student
+
+
+def enqueue_notification(subject, message, recipients=None, audience=''):
+    # The row is written in the caller's transaction, so the worker only
+    # sees it once the change that triggered it has committed.
+    return Notification.objects.create(
+        subject=subject,
+        message=message,
+        recipients=list(recipients or []),
+        audience=audience,
+    )
+
+
+def _claimable():
+    # Pending jobs, and jobs still PROCESSING long after their last checkpoint
+    # (the worker died); those resume from their cursor.
+    stale = timezone.now() - timedelta(seconds=getattr(settings, 'NOTIFICATION_CLAIM_TIMEOUT', 900))
+    return Q(status=Notification.PENDING) | (Q(status=Notification.PROCESSING) & (Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale)))
+
+
+def _claim_pending(limit=None):
+    pending = Notification.objects.filter(_claimable()).order_by('created_at', 'pk')
+    if limit:
+        pending = pending[:limit]
+    for pk in list(pending.values_list('pk', flat=True)):
+        claimed = Notification.objects.filter(_claimable(), pk=pk).update(status=Notification.PROCESSING, claimed_at=timezone.now())
+        if claimed:
+            yield Notification.objects.get(pk=pk)
+
+
+def _recipient_batches(notification, batch_size):
+    # Yields (cursor, emails) where cursor is the resume position after the batch.
+    if notification.audience == Notification.AUDIENCE_STUDENTS:
+        rows = Student.objects.filter(pk__gt=notification.cursor).order_by('pk').values_list('pk', 'person__email')
+        batch = []
+        for pk, email in rows.iterator(chunk_size=batch_size):
+            batch.append(email)
+            if len(batch) == batch_size:
+                yield pk, batch
+                batch = []
+        if batch:
+            yield pk, batch
+    else:
+        recipients = notification.recipients
+        for start in range(notification.cursor, len(recipients), batch_size):
+            batch = recipients[start:start + batch_size]
+            yield start + len(batch), batch
+
+
+class OutboxWorker:
+    def __init__(self, batch_size=None, concurrency=None, max_attempts=None):
+        self.batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+        self.concurrency = concurrency or getattr(settings, 'NOTIFICATION_CONCURRENCY', 1)
+        self.max_attempts = max_attempts or getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+
+    def _send(self, messages):
+        # One SMTP connection per worker thread, reused for every batch.
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = get_connection()
+            connection.open()
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection.send_messages(messages) or 0
+
+
+    def _close_connections(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+
+
+    def _flush(self, notification, window, stats):
+        # Checkpoint after each batch in the order they were submitted: when
+        # one fails, the batches before it are not sent again on retry.
+        for cursor, future in window:
+            sent = future.result()
+            notification.cursor = cursor
+            notification.sent_count += sent
+            Notification.objects.filter(pk=notification.pk).update(
+                cursor=notification.cursor,
+                sent_count=notification.sent_count,
+                claimed_at=timezone.now(),
+            )
+            stats['batches'] += 1
+            stats['messages'] += sent
+
+
+    def _deliver(self, notification, executor, stats):
+        window = []
+        for cursor, emails in _recipient_batches(notification, self.batch_size):
+            messages = [
+                EmailMessage(notification.subject, notification.message, notification.from_email, [email])
+                for email in emails
+            ]
+            window.append((cursor, executor.submit(self._send, messages)))
+            if len(window) >= self.concurrency:
+                self._flush(notification, window, stats)
+                window = []
+        if window:
+            self._flush(notification, window, stats)
+
+
+    def drain(self, limit=None):
+        stats = {'jobs': 0, 'failed': 0, 'batches': 0, 'messages': 0}
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                for notification in _claim_pending(limit):
+                    try:
+                        self._deliver(notification, executor, stats)
+                    except Exception as e:
+                        attempts = notification.attempts + 1
+                        Notification.objects.filter(pk=notification.pk).update(
+                            status=Notification.FAILED if attempts >= self.max_attempts else Notification.PENDING,
+                            attempts=attempts,
+                            last_error=str(e),
+                        )
+                        stats['failed'] += 1
+                        continue
+                    Notification.objects.filter(pk=notification.pk).update(
+                        status=Notification.SENT,
+                        attempts=notification.attempts + 1,
+                        processed_at=timezone.now(),
+                    )
+                    stats['jobs'] += 1
+        finally:
+            self._close_connections()
+        elapsed = time.perf_counter() - started
+        stats['elapsed'] = elapsed
+        stats['messages_per_second'] = stats['messages'] / elapsed if elapsed else 0.0
+        return stats
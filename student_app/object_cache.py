@@ -0,0 +1,192 @@
+import functools
+import os
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import metrics
+from .models import Person, Profile, Instructor, Student, Course, Module, Enrollment, Review, StudentCourse
+
+
+_counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_counters_lock = threading.Lock()
+_local = threading.local()
+
+
+def _count(name, amount=1):
+    with _counters_lock:
+        _counters[name] += amount
+    metrics.record_cache(name, amount)
+
+
+def stats():
+    with _counters_lock:
+        return dict(_counters)
+
+
+def reset_stats():
+    with _counters_lock:
+        for name in _counters:
+            _counters[name] = 0
+
+
+def cache():
+    return caches[getattr(settings, 'OBJECT_CACHE_ALIAS', 'default')]
+
+
+def _generation_key(model, pk):
+    return f'objcache:gen:{model._meta.label_lower}:{pk}'
+
+
+def _entry_key(serializer_class, instance):
+    version = getattr(serializer_class, 'cache_version', 1)
+    return f'objcache:{instance._meta.label_lower}:{instance.pk}:{serializer_class.__name__}:v{version}'
+
+
+def _new_generation():
+    return os.urandom(8).hex()
+
+
+# Related objects whose fields end up embedded in a model's representation.
+# Changing any of them must invalidate the cached representation.
+def _course_dependencies(course):
+    return [course.instructor, course.instructor.person]
+
+
+def _instructor_dependencies(instructor):
+    dependencies = [instructor.person]
+    for course in instructor.courses.all():
+        dependencies.append(course)
+        dependencies.extend(_course_dependencies(course))
+    return dependencies
+
+
+def _student_dependencies(student):
+    return [student.person]
+
+
+def _review_dependencies(review):
+    return [review.course, *_course_dependencies(review.course), review.student, *_student_dependencies(review.student)]
+
+
+DEPENDENCIES = {
+    Course: _course_dependencies,
+    Instructor: _instructor_dependencies,
+    Student: _student_dependencies,
+    Module: lambda module: [module.course, *_course_dependencies(module.course)],
+    Enrollment: lambda enrollment: [enrollment.course, *_course_dependencies(enrollment.course), enrollment.student, enrollment.student.person],
+    Review: _review_dependencies,
+}
+
+
+# Rows that are not serialized themselves but change the representation of
+# their parent: a new Course shows up in Instructor.courses, marks in Student.courses.
+EMBEDDED_IN = {
+    Course: [(Instructor, 'instructor_id')],
+    StudentCourse: [(Student, 'student_id')],
+}
+
+
+CACHED_MODELS = (Person, Profile, Instructor, Student, Course, Module, Enrollment, Review, StudentCourse)
+
+
+def dependencies(instance):
+    return DEPENDENCIES.get(type(instance), lambda obj: [])(instance)
+
+
+def _dependency_keys(instance):
+    keys = {_generation_key(type(instance), instance.pk)}
+    for dependency in dependencies(instance):
+        keys.add(_generation_key(type(dependency), dependency.pk))
+    return sorted(keys)
+
+
+def _generations(keys):
+    store = cache()
+    generations = store.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    if missing:
+        # Seed missing generations so an evicted key can never match an old stamp.
+        for key in missing:
+            store.add(key, _new_generation(), timeout=None)
+        generations.update(store.get_many(missing))
+    return [generations.get(key) for key in keys]
+
+
+def _pending():
+    # Generation keys invalidated by this thread's open transaction. Their new
+    # stamps are only written on commit, so until then the current stamps
+    # describe the committed rows and this thread builds those
+    # representations without the cache. Outside a transaction nothing is
+    # pending (a rolled back one leaves nothing to bump).
+    if not connections[DEFAULT_DB_ALIAS].in_atomic_block or not hasattr(_local, 'pending'):
+        _local.pending = set()
+    return _local.pending
+
+
+def get_or_set(serializer_class, instance, build):
+    if instance.pk is None:
+        return build()
+    pending = _pending()
+    store = cache()
+    key = _entry_key(serializer_class, instance)
+    entry = store.get(key)
+    if entry is not None and not pending.intersection(entry['keys']):
+        stamps = store.get_many(entry['keys'])
+        if [stamps.get(dependency) for dependency in entry['keys']] == entry['stamps']:
+            _count('hits')
+            return entry['data']
+    _count('misses')
+    keys = _dependency_keys(instance)
+    if pending.intersection(keys):
+        return build()
+    stamps = _generations(keys)
+    data = build()
+    timeout = getattr(settings, 'CACHE_TTL', 300)
+    if instance._state.db != DEFAULT_DB_ALIAS:
+        # A replica may not have applied the write behind the latest
+        # invalidation yet; keep what it returned only for the lag allowance.
+        timeout = min(timeout, getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+    store.set(key, {'keys': keys, 'stamps': stamps, 'data': data}, timeout)
+    return data
+
+
+def _bump(keys):
+    # New generations are written once the transaction commits: written
+    # earlier, a concurrent reader could stamp a build of the old committed
+    # row with them and serve it as current for CACHE_TTL.
+    if not keys:
+        return
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        _pending().update(keys)
+
+    def write():
+        cache().set_many({key: _new_generation() for key in keys}, timeout=None)
+        _count('invalidations', len(keys))
+        getattr(_local, 'pending', set()).difference_update(keys)
+
+    transaction.on_commit(write)
+
+
+def invalidate(instance):
+    keys = [_generation_key(type(instance), instance.pk)]
+    for model, attname in EMBEDDED_IN.get(type(instance), []):
+        parent_pk = getattr(instance, attname, None)
+        if parent_pk is not None:
+            keys.append(_generation_key(model, parent_pk))
+    _bump(keys)
+
+
+def invalidate_pks(model, pks):
+    # For bulk writes that bypass post_save/post_delete.
+    _bump([_generation_key(model, pk) for pk in pks])
+
+
+def cached_representation(func):
+    @functools.wraps(func)
+    def wrapper(self, instance):
+        with metrics.serializer_timer():
+            return get_or_set(type(self), instance, lambda: func(self, instance))
+    return wrapper
@@ -1,4 +1,12 @@
+import base64
+import json
+from operator import attrgetter
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination, LimitOffsetPagination, CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -15,10 +23,120 @@ class StandardLimitOffsetPagination(LimitOffsetPagination):
    max_limit = 100
 
 
+def keyset_filter(ordering, values):
+   # Rows strictly after `values` in `ordering`, e.g. for ('-salary', 'id'):
+   # salary <= v0 AND (salary < v0 OR (salary = v0 AND id > v1))
+   # The redundant leading bound lets the planner seek into the composite
+   # index and walk it in order instead of sorting the OR branches.
+   condition = Q()
+   equal = Q()
+   for field, value in zip(ordering, values):
+       name = field.lstrip('-')
+       lookup = 'lt' if field.startswith('-') else 'gt'
+       condition |= equal & Q(**{f'{name}__{lookup}': value})
+       equal &= Q(**{name: value})
+   first = ordering[0]
+   bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": values[0]})
+   return bound & condition
+
+
+def _reverse_ordering(ordering):
+   return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
 class StandardCursorPagination(CursorPagination):
+   # Keyset pagination over a composite ordering. Views set `cursor_ordering`
+   # (backed by a matching index); the primary key is appended as a tie-breaker
+   # so the ordering is total and every page is a single index range scan.
    page_size = 5
-   ordering = '-created'
+   page_size_query_param = 'page_size'
+   max_page_size = 100
+   ordering = ('-id',)
    cursor_query_param = 'cursor'
 
 
+   def get_ordering(self, request, queryset, view):
+       ordering = tuple(getattr(view, 'cursor_ordering', self.ordering))
+       if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+           ordering += ('id',)
+       return ordering
+
+
+   def paginate_queryset(self, queryset, request, view=None):
+       queryset, values = self._page_queryset(queryset, request, view)
+       if queryset is None:
+           return None
+       return self._set_page(list(queryset), values)
+
+
+   async def apaginate_queryset(self, queryset, request, view=None):
+       queryset, values = self._page_queryset(queryset, request, view)
+       if queryset is None:
+           return None
+       return self._set_page([row async for row in queryset], values)
+
+
+   def _page_queryset(self, queryset, request, view):
+       self.request = request
+       self.page_size = self.get_page_size(request)
+       if not self.page_size:
+           return None, None
+
+       self.base_url = request.build_absolute_uri()
+       self.ordering = self.get_ordering(request, queryset, view)
+       values, self.reverse = self.decode_cursor(request)
+
+       ordering = _reverse_ordering(self.ordering) if self.reverse else self.ordering
+       queryset = queryset.order_by(*ordering)
+       if values is not None:
+           queryset = queryset.filter(keyset_filter(ordering, values))
+       return queryset[:self.page_size + 1], values
+
+
+   def _set_page(self, results, values):
+       has_more = len(results) > self.page_size
+       self.page = results[:self.page_size]
+       if self.reverse:
+           self.page.reverse()
+           self.has_next, self.has_previous = values is not None, has_more
+       else:
+           self.has_next, self.has_previous = has_more, values is not None
+       return self.page
+
+
+   def _position(self, instance):
+       return [attrgetter(field.lstrip('-').replace('__', '.'))(instance) for field in self.ordering]
+
+
+   def decode_cursor(self, request):
+       encoded = request.query_params.get(self.cursor_query_param)
+       if encoded is None:
+           return None, False
+       try:
+           cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+           values, reverse = cursor['v'], bool(cursor.get('r'))
+       except (TypeError, ValueError, KeyError):
+           raise NotFound(self.invalid_cursor_message)
+       if not isinstance(values, list) or len(values) != len(self.ordering):
+           raise NotFound(self.invalid_cursor_message)
+       return values, reverse
+
+
+   def _link(self, values, reverse):
+       payload = {'v': values, 'r': 1} if reverse else {'v': values}
+       encoded = base64.urlsafe_b64encode(json.dumps(payload, cls=DjangoJSONEncoder).encode()).decode('ascii')
+       return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+   def get_next_link(self):
+       if not self.has_next or not self.page:
+           return None
+       return self._link(self._position(self.page[-1]), reverse=False)
+
 
+   def get_previous_link(self):
+       if not self.has_previous:
+           return None
+       if not self.page:
+           return remove_query_param(self.base_url, self.cursor_query_param)
+       return self._link(self._position(self.page[0]), reverse=True)
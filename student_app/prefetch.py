@@ -0,0 +1,92 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+# Serializers can declare the relations their to_representation() touches
+# by hand through Meta.select_related / Meta.prefetch_related; everything
+# reachable through declared fields is discovered automatically.
+
+
+def _relation(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Reverse relations are addressed by accessor name (e.g. studentcourse_set).
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == name:
+                return relation
+        return None
+
+
+def _is_single(relation):
+    return relation is not None and (relation.many_to_one or relation.one_to_one)
+
+
+def _join(prefix, name):
+    return f'{prefix}__{name}' if prefix else name
+
+
+def _walk_path(model, path, prefix, plan):
+    # Select along forward/one-to-one hops, switch to prefetching at the first to-many hop.
+    parts = path.split('__')
+    for index, name in enumerate(parts):
+        relation = _relation(model, name)
+        if relation is None or not relation.is_relation:
+            return
+        current = _join(prefix, '__'.join(parts[:index + 1]))
+        if _is_single(relation):
+            plan['select'].add(current)
+        else:
+            plan['prefetch'][current] = None
+            return
+        model = relation.related_model
+
+
+def _plan(serializer, model, prefix, plan):
+    meta = getattr(serializer, 'Meta', None)
+    for path in getattr(meta, 'select_related', ()):
+        _walk_path(model, path, prefix, plan)
+    for path in getattr(meta, 'prefetch_related', ()):
+        plan['prefetch'].setdefault(_join(prefix, path), None)
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        source = field.source.replace('.', '__')
+        relation = _relation(model, source.split('__')[0])
+        if relation is None or not relation.is_relation:
+            continue
+
+        if isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.ModelSerializer):
+            child_model = field.child.Meta.model
+            plan['prefetch'][_join(prefix, source)] = plan_queryset(child_model.objects.all(), field.child)
+        elif isinstance(field, serializers.ModelSerializer):
+            if _is_single(relation):
+                _walk_path(model, source, prefix, plan)
+                _plan(field, relation.related_model, _join(prefix, source), plan)
+            else:
+                plan['prefetch'][_join(prefix, source)] = plan_queryset(relation.related_model.objects.all(), field)
+        elif isinstance(field, serializers.ManyRelatedField):
+            plan['prefetch'].setdefault(_join(prefix, source), None)
+        elif isinstance(field, serializers.SlugRelatedField):
+            _walk_path(model, source, prefix, plan)
+            slug_path = field.slug_field.split('__')[:-1]
+            if slug_path and _is_single(relation):
+                _walk_path(relation.related_model, '__'.join(slug_path), _join(prefix, source), plan)
+
+
+def plan_queryset(queryset, serializer):
+    if isinstance(serializer, type):
+        serializer = serializer()
+    plan = {'select': set(), 'prefetch': {}}
+    _plan(serializer, queryset.model, '', plan)
+    if plan['select']:
+        queryset = queryset.select_related(*sorted(plan['select']))
+    lookups = [
+        Prefetch(path, queryset=nested) if nested is not None else path
+        for path, nested in sorted(plan['prefetch'].items())
+    ]
+    if lookups:
+        queryset = queryset.prefetch_related(*lookups)
+    return queryset
@@ -0,0 +1,130 @@
+import itertools
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+STICKY_COOKIE = 'primary_until'
+
+_state = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    # Reads may go to a replica until the request writes (or arrives inside
+    # the sticky window of an earlier write); from then on everything stays
+    # on the primary.
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def begin(pinned):
+    return _state.set(RoutingState(pinned))
+
+
+def end(token):
+    state = _state.get()
+    _state.reset(token)
+    return state
+
+
+def current():
+    return _state.get()
+
+
+_replica_cycle = None
+_replica_cycle_for = None
+
+
+def _next_replica():
+    global _replica_cycle, _replica_cycle_for
+    replicas = tuple(getattr(settings, 'DATABASE_REPLICAS', ()))
+    if not replicas:
+        return DEFAULT_DB_ALIAS
+    if replicas != _replica_cycle_for:
+        _replica_cycle, _replica_cycle_for = itertools.cycle(replicas), replicas
+    return next(_replica_cycle)
+
+
+class ReplicaRouter:
+    # Only requests marked by ReplicaRoutingMiddleware read from replicas;
+    # management commands, workers and shells always use the primary.
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.pinned:
+            return DEFAULT_DB_ALIAS
+        # Keep related lookups on the database their parent row came from.
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return _next_replica()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', ())}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary (see sync_replicas).
+        if db in getattr(settings, 'DATABASE_REPLICAS', ()):
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    # Safe requests read from replicas unless the client wrote within the last
+    # REPLICA_STICKY_SECONDS (tracked with a cookie), so users see their own
+    # new enrollments and reviews. Unsafe requests stay on the primary.
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = begin(pinned=self._pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            state = end(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        token = begin(pinned=self._pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            state = end(token)
+        return self._finish(state, response)
+
+    def _finish(self, state, response):
+        if state.wrote:
+            window = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+            response.set_cookie(STICKY_COOKIE, str(int(time.time() + window)), max_age=window, httponly=True, samesite='Lax')
+        return response
+
+    def _pinned(self, request):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return True
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,303 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+
+from .models import Course, Module, Review
+
+
+# Indexed documents: (type, model, title field, body field). The FTS rowid
+# packs the type into the low bits so updates and deletes are rowid lookups.
+DOCUMENT_TYPES = {
+    'course': (1, Course, 'name', 'description'),
+    'module': (2, Module, 'name', 'description'),
+    'review': (3, Review, None, 'comment'),
+}
+TYPE_BY_CODE = {code: name for name, (code, *_) in DOCUMENT_TYPES.items()}
+TYPE_BY_MODEL = {model: name for name, (_, model, *_) in DOCUMENT_TYPES.items()}
+
+FTS_TABLE = 'student_app_search'
+TITLE_WEIGHT = 5.0
+
+_TOKEN = re.compile(r'\w+\*?')
+
+
+def _rowid(doc_type, object_id):
+    return object_id * 4 + DOCUMENT_TYPES[doc_type][0]
+
+
+def _document(instance):
+    doc_type = TYPE_BY_MODEL[type(instance)]
+    _, _, title_field, body_field = DOCUMENT_TYPES[doc_type]
+    title = getattr(instance, title_field) if title_field else ''
+    return doc_type, instance.pk, title, getattr(instance, body_field)
+
+
+def _fold(text):
+    # Same folding as FTS5's unicode61 tokenizer with remove_diacritics.
+    return ''.join(c for c in unicodedata.normalize('NFKD', text.lower()) if not unicodedata.combining(c))
+
+
+def parse_query(text):
+    # Words are ANDed; a trailing * makes a word a prefix query.
+    terms = []
+    for token in _TOKEN.findall(_fold(text)):
+        prefix = token.endswith('*')
+        word = token.rstrip('*')
+        if word:
+            terms.append((word, prefix))
+    return terms
+
+
+class FTS5Backend:
+    # SQLite FTS5 table created by migration 0006; ranked with bm25().
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def index(self, documents):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)',
+                [(_rowid(doc_type, object_id), title, body) for doc_type, object_id, title, body in documents],
+            )
+
+    def remove(self, doc_type, object_id):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [_rowid(doc_type, object_id)])
+
+    def rebuild(self):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            for doc_type, (code, model, title_field, body_field) in DOCUMENT_TYPES.items():
+                table = model._meta.db_table
+                title = title_field or "''"
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, title, body) SELECT id * 4 + {code}, {title}, {body_field} FROM {table}'
+                )
+
+    def search(self, terms, types, limit, offset, rank_limit):
+        match = ' '.join('"{}"{}'.format(word.replace('"', '""'), '*' if prefix else '') for word, prefix in terms)
+        where = f'{FTS_TABLE} MATCH %s'
+        params = [match]
+        if types is not None and len(types) < len(DOCUMENT_TYPES):
+            where += ' AND (rowid %% 4) IN ({})'.format(', '.join('%s' for _ in types))
+            params.extend(DOCUMENT_TYPES[doc_type][0] for doc_type in types)
+        with connections[self.alias].cursor() as cursor:
+            # bm25() must score every match before sorting; past rank_limit
+            # matches, walk the index newest first instead (early exit).
+            cursor.execute(f'SELECT count(*) FROM (SELECT rowid FROM {FTS_TABLE} WHERE {where} LIMIT %s)', [*params, rank_limit + 1])
+            ranked = cursor.fetchone()[0] <= rank_limit
+            order = 'score, rowid' if ranked else 'rowid DESC'
+            cursor.execute(
+                f'SELECT rowid, bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1.0) AS score FROM {FTS_TABLE} '
+                f'WHERE {where} ORDER BY {order} LIMIT %s OFFSET %s',
+                [*params, limit, offset],
+            )
+            # bm25() is negative; flip it so larger means more relevant.
+            return [(TYPE_BY_CODE[rowid % 4], rowid // 4, -score) for rowid, score in cursor.fetchall()], ranked
+
+
+class PythonBackend:
+    # In-process inverted index (term -> {rowid: (title tf, body tf)}) with
+    # BM25 ranking and a sorted vocabulary for prefix expansion. Loaded from
+    # the database on first use; each process keeps its own copy.
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._postings = defaultdict(dict)
+        self._documents = {}
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+        self._total_length = 0
+
+    def _tokens(self, text):
+        return [word for word, _ in parse_query(text or '')]
+
+    def _add(self, rowid, title, body):
+        self._discard(rowid)
+        title_tokens, body_tokens = self._tokens(title), self._tokens(body)
+        counts = defaultdict(lambda: [0, 0])
+        for token in title_tokens:
+            counts[token][0] += 1
+        for token in body_tokens:
+            counts[token][1] += 1
+        for token, (title_tf, body_tf) in counts.items():
+            if token not in self._postings:
+                self._vocabulary_dirty = True
+            self._postings[token][rowid] = (title_tf, body_tf)
+        length = len(title_tokens) + len(body_tokens)
+        self._documents[rowid] = (length, tuple(counts))
+        self._total_length += length
+
+    def _discard(self, rowid):
+        document = self._documents.pop(rowid, None)
+        if document is None:
+            return
+        length, tokens = document
+        self._total_length -= length
+        for token in tokens:
+            postings = self._postings[token]
+            postings.pop(rowid, None)
+            if not postings:
+                del self._postings[token]
+                self._vocabulary_dirty = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._load()
+
+    def _load(self):
+        self._postings.clear()
+        self._documents.clear()
+        self._total_length = 0
+        for doc_type, (code, model, title_field, body_field) in DOCUMENT_TYPES.items():
+            fields = ['pk', title_field, body_field] if title_field else ['pk', body_field]
+            for row in model.objects.values_list(*fields).iterator(chunk_size=5000):
+                title, body = (row[1], row[2]) if title_field else ('', row[1])
+                self._add(_rowid(doc_type, row[0]), title, body)
+        self._vocabulary_dirty = True
+        self._loaded = True
+
+    def index(self, documents):
+        with self._lock:
+            if self._loaded:
+                for doc_type, object_id, title, body in documents:
+                    self._add(_rowid(doc_type, object_id), title, body)
+
+    def remove(self, doc_type, object_id):
+        with self._lock:
+            if self._loaded:
+                self._discard(_rowid(doc_type, object_id))
+
+    def rebuild(self):
+        # Reloaded lazily by the next search in this process.
+        with self._lock:
+            self._loaded = False
+
+    def _expand(self, word, prefix):
+        if not prefix:
+            return [word] if word in self._postings else []
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect_left(self._vocabulary, word)
+        end = bisect_left(self._vocabulary, word + '\U0010ffff')
+        return self._vocabulary[start:end]
+
+    def search(self, terms, types, limit, offset, rank_limit):
+        codes = None if types is None else {DOCUMENT_TYPES[doc_type][0] for doc_type in types}
+        with self._lock:
+            self._ensure_loaded()
+            total = len(self._documents)
+            if not total:
+                return [], True
+            matches = []
+            for word, prefix in terms:
+                postings = [self._postings[token] for token in self._expand(word, prefix)]
+                if not postings:
+                    return [], True
+                matches.append(postings)
+
+            # AND across terms, starting from the rarest.
+            matches.sort(key=lambda postings: sum(map(len, postings)))
+            candidates = set().union(*matches[0])
+            for postings in matches[1:]:
+                candidates = {rowid for rowid in candidates if any(rowid in posting for posting in postings)}
+            if codes is not None:
+                candidates = {rowid for rowid in candidates if rowid % 4 in codes}
+
+            if len(candidates) > rank_limit:
+                # Same cut-off as the FTS5 backend: newest first, unscored.
+                newest = heapq.nlargest(offset + limit, candidates)[offset:]
+                return [(TYPE_BY_CODE[rowid % 4], rowid // 4, 0.0) for rowid in newest], False
+
+            average_length = self._total_length / total
+            scores = dict.fromkeys(candidates, 0.0)
+            for postings in matches:
+                for posting in postings:
+                    idf = math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+                    for rowid in candidates:
+                        frequencies = posting.get(rowid)
+                        if frequencies is None:
+                            continue
+                        tf = TITLE_WEIGHT * frequencies[0] + frequencies[1]
+                        length = self._documents[rowid][0]
+                        scores[rowid] += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / average_length))
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(TYPE_BY_CODE[rowid % 4], rowid // 4, score) for rowid, score in ranked[offset:offset + limit]], True
+
+
+_python_backend = PythonBackend()
+_fts_available = {}
+
+
+def _has_fts_table(alias):
+    if alias not in _fts_available:
+        connection = connections[alias]
+        _fts_available[alias] = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_available[alias]
+
+
+def backend(alias=None):
+    alias = alias or router.db_for_read(Course)
+    if _has_fts_table(alias):
+        return FTS5Backend(alias)
+    return _python_backend
+
+
+def index(instance):
+    document = _document(instance)
+    transaction.on_commit(lambda: backend(DEFAULT_DB_ALIAS).index([document]))
+
+
+def remove(instance):
+    doc_type, object_id = TYPE_BY_MODEL[type(instance)], instance.pk
+    transaction.on_commit(lambda: backend(DEFAULT_DB_ALIAS).remove(doc_type, object_id))
+
+
+def rebuild():
+    backend(DEFAULT_DB_ALIAS).rebuild()
+
+
+def search(text, types=None, limit=20, offset=0):
+    # Returns (results, ranked); ranked is False when the query matched more
+    # than SEARCH_RANK_LIMIT documents and results are newest first.
+    terms = parse_query(text)
+    if not terms:
+        return [], True
+    hits, ranked = backend().search(terms, types, limit, offset, getattr(settings, 'SEARCH_RANK_LIMIT', 5000))
+    return _hydrate(hits), ranked
+
+
+def _hydrate(hits):
+    # One query per document type for the fields shown in results.
+    ids = defaultdict(list)
+    for doc_type, object_id, _ in hits:
+        ids[doc_type].append(object_id)
+    rows = {}
+    if ids['course']:
+        for pk, name in Course.objects.filter(pk__in=ids['course']).values_list('pk', 'name'):
+            rows['course', pk] = {'title': name, 'course': pk}
+    if ids['module']:
+        for pk, name, course_id in Module.objects.filter(pk__in=ids['module']).values_list('pk', 'name', 'course_id'):
+            rows['module', pk] = {'title': name, 'course': course_id}
+    if ids['review']:
+        for pk, comment, course_id, course_name in Review.objects.filter(pk__in=ids['review']).values_list('pk', 'comment', 'course_id', 'course__name'):
+            rows['review', pk] = {'title': course_name, 'course': course_id, 'comment': comment}
+    results = []
+    for doc_type, object_id, score in hits:
+        row = rows.get((doc_type, object_id))
+        if row is not None:
+            results.append({'type': doc_type, 'id': object_id, 'score': round(score, 4), **row})
+    return results
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Person, Profile, Instructor, Student, Course, Module, Enrollment, Review, StudentCourse
 from django.core.validators import RegexValidator
+from .object_cache import cached_representation
 
 
 # Phone number validator
@@ -15,6 +16,11 @@ class PersonSerializer(serializers.ModelSerializer):
        extra_kwargs = {
            'password': {'write_only': True},
        }
+
+    @cached_representation
+    def to_representation(self, instance):
+       return super().to_representation(instance)
+
     def create(self, validated_data):
        person = Person(**validated_data)
        person.full_clean()  # Ensuring the data is valid before saving
@@ -39,6 +45,11 @@ class ProfileSerializer(serializers.ModelSerializer):
        fields = '__all__'
 
 
+   @cached_representation
+   def to_representation(self, instance):
+       return super().to_representation(instance)
+
+
 class CourseSerializer(serializers.ModelSerializer):
    instructor = serializers.SlugRelatedField(slug_field='person__email', queryset=Instructor.objects.all())
 
@@ -48,6 +59,7 @@ class CourseSerializer(serializers.ModelSerializer):
        fields = ['id', 'name', 'description', 'instructor']
 
 
+   @cached_representation
    def to_representation(self, instance):
        response = super().to_representation(instance)
        response['instructor'] = {
@@ -75,6 +87,7 @@ class InstructorSerializer(serializers.ModelSerializer):
        return value
 
 
+   @cached_representation
    def to_representation(self, instance):
        response = super().to_representation(instance)
        response['person'] = PersonSerializer(instance.person).data
@@ -89,7 +102,7 @@ class StudentCourseSerializer(serializers.ModelSerializer):
 
 class StudentSerializer(serializers.ModelSerializer):
    person = serializers.SlugRelatedField(slug_field='email', queryset=Person.objects.all())
-   courses = StudentCourseSerializer(many=True, read_only=True)
+   courses = StudentCourseSerializer(source='studentcourse_set', many=True, read_only=True)
 
 
    class Meta:
@@ -103,15 +116,15 @@ class StudentSerializer(serializers.ModelSerializer):
        return value
 
 
+   @cached_representation
    def to_representation(self, instance):
        response = super().to_representation(instance)
        response['person'] = PersonSerializer(instance.person).data
-       response['courses'] = StudentCourseSerializer(instance.studentcourse_set.all(), many=True).data
        return response
 
 
 class EnrollmentSerializer(serializers.ModelSerializer):
-   student = serializers.SlugRelatedField(slug_field='email', queryset=Person.objects.all())
+   student = serializers.SlugRelatedField(slug_field='person__email', queryset=Student.objects.all())
    course = CourseSerializer()
 
 
@@ -120,6 +133,11 @@ class EnrollmentSerializer(serializers.ModelSerializer):
        fields = '__all__'
 
 
+   @cached_representation
+   def to_representation(self, instance):
+       return super().to_representation(instance)
+
+
 class ModuleSerializer(serializers.ModelSerializer):
    course = CourseSerializer()
 
@@ -129,6 +147,11 @@ class ModuleSerializer(serializers.ModelSerializer):
        fields = '__all__'
 
 
+   @cached_representation
+   def to_representation(self, instance):
+       return super().to_representation(instance)
+
+
 class ReviewSerializer(serializers.ModelSerializer):
    course = CourseSerializer()
    student = StudentSerializer()
@@ -139,4 +162,9 @@ class ReviewSerializer(serializers.ModelSerializer):
        fields = '__all__'
 
 
+   @cached_representation
+   def to_representation(self, instance):
+       return super().to_representation(instance)
+
+
 
@@ -1,7 +1,138 @@
+from collections import Counter, defaultdict
+
 from django.db.models.signals import post_save, post_delete, pre_save
-from django.dispatch import receiver
-from .models import Person, Profile, Course, Enrollment, Review, Student, Instructor
-from django.core.mail import send_mail
+from django import dispatch
+from django.conf import settings
+from django.utils import timezone
+from .models import Person, Profile, Course, Enrollment, Review, Student, Instructor, Notification, Module, StudentCourse, CourseStats
+from .notifications import enqueue_notification
+from .enrollments import existing_pairs
+from . import authentication, batching, catalog, coenrollment, leaderboard, metrics, object_cache, search
+
+
+def receiver(signal, **kwargs):
+   # django.dispatch.receiver that also counts executions per request
+   # (student_app.metrics); stacked decorators share one counting wrapper.
+   def decorator(func):
+       counted = func if getattr(func, 'counts_signals', False) else metrics.counting_receiver(func)
+       return dispatch.receiver(signal, **kwargs)(counted)
+   return decorator
+
+
+def _chunks(items, size=2000):
+   items = list(items)
+   for start in range(0, len(items), size):
+       yield items[start:start + size]
+
+
+# Set-based forms of the receivers below, run once at the end of a signal
+# batch (student_app.batching) over everything the batch collected.
+def _touch_profiles(person_ids):
+   now = timezone.now()
+   for chunk in _chunks(set(person_ids)):
+       profiles = Profile.objects.filter(person_id__in=chunk)
+       pks = list(profiles.values_list('pk', flat=True))
+       profiles.update(updated_at=now)
+       object_cache.invalidate_pks(Profile, pks)
+
+
+def _lookup(model, ids, field):
+   found = {}
+   for chunk in _chunks(set(ids)):
+       found.update(model.objects.filter(pk__in=chunk).values_list('pk', field))
+   return found
+
+
+def _notify_students(subject, message, pairs):
+   # pairs: (student_id, course_id); one outbox row per course.
+   names = _lookup(Course, [course_id for _, course_id in pairs], 'name')
+   emails = _lookup(Student, [student_id for student_id, _ in pairs], 'person__email')
+   by_course = defaultdict(list)
+   for student_id, course_id in pairs:
+       if course_id in names and student_id in emails:
+           by_course[course_id].append(emails[student_id])
+   for course_id, recipients in by_course.items():
+       enqueue_notification(subject, message.format(course=names[course_id]), recipients)
+
+
+def _notify_enrolled(pairs):
+   _notify_students('Enrollment Confirmed', 'You have been enrolled in the course: {course}.', pairs)
+
+
+def _notify_unenrolled(pairs):
+   _notify_students('Enrollment Cancelled', 'Your enrollment in the course: {course} has been cancelled.', pairs)
+
+
+def _notify_instructors(subject, message, course_ids):
+   counts = Counter(course_ids)
+   courses = {}
+   for chunk in _chunks(counts):
+       courses.update((row[0], row[1:]) for row in Course.objects.filter(pk__in=chunk).values_list('pk', 'name', 'instructor__person__email'))
+   for course_id, (name, email) in courses.items():
+       enqueue_notification(subject, message(name, counts[course_id]), [email])
+
+
+def _notify_reviewed(course_ids):
+   _notify_instructors(
+       'New Review Received',
+       lambda name, count: f'You have received a new review for the course: {name}.' if count == 1 else f'You have received {count} new reviews for the course: {name}.',
+       course_ids,
+   )
+
+
+def _notify_review_deleted(course_ids):
+   _notify_instructors(
+       'Review Deleted',
+       lambda name, count: f'A review for the course: {name} has been deleted.' if count == 1 else f'{count} reviews for the course: {name} have been deleted.',
+       course_ids,
+   )
+
+
+def _require_enrolled(pairs):
+   pairs = set(pairs)
+   if pairs - existing_pairs(pairs, 2000):
+       raise ValueError('Student must be enrolled in the course to leave a review.')
+
+
+def _invalidate(entries):
+   # entries: (model, pk, [(parent model, parent pk)]); pks are taken when the
+   # signal fires, since a deleted instance loses its own by the end.
+   by_model = defaultdict(set)
+   for model, pk, parents in entries:
+       by_model[model].add(pk)
+       for parent, parent_pk in parents:
+           by_model[parent].add(parent_pk)
+   for model, pks in by_model.items():
+       object_cache.invalidate_pks(model, pks)
+
+
+def _touch_parents(entries):
+   now = timezone.now()
+   by_model = defaultdict(set)
+   for model, pk in entries:
+       by_model[model].add(pk)
+   for model, pks in by_model.items():
+       for chunk in _chunks(pks):
+           model.objects.filter(pk__in=chunk).update(updated_at=now)
+
+
+def _apply_stats(entries):
+   totals = defaultdict(Counter)
+   for course_id, deltas in entries:
+       totals[course_id].update(deltas)
+   for course_id, deltas in totals.items():
+       CourseStats.objects.apply(course_id, {field: delta for field, delta in deltas.items() if delta})
+
+
+def _record_coenrollment(entries):
+   # entries: (enrolled, (course_id, student_id)), applied in order in runs of the same kind.
+   run, enrolled = [], None
+   for kind, pair in entries + [(None, None)]:
+       if kind != enrolled and run:
+           (coenrollment.record_enrollments if enrolled else coenrollment.record_unenrollments)(run)
+           run = []
+       run.append(pair)
+       enrolled = kind
 
 
 @receiver(post_save, sender=Person)
@@ -11,8 +142,10 @@ def create_profile(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=Person)
-def save_profile(sender, instance, **kwargs):
-   instance.profile.save()
+def save_profile(sender, instance, created, **kwargs):
+   # A profile created by create_profile a moment ago needs no second write.
+   if not created and not batching.defer(_touch_profiles, instance.pk):
+       instance.profile.save()
 
 
 @receiver(post_delete, sender=Person)
@@ -28,63 +161,55 @@ def delete_related_records(sender, instance, **kwargs):
 @receiver(post_save, sender=Course)
 def course_post_save(sender, instance, created, **kwargs):
    if created:
+       CourseStats.objects.create(course=instance)
        # Notify students about the new course
-       students = Student.objects.all()
-       for student in students:
-           send_mail(
-               'New Course Available',
-               f'A new course named {instance.name} is now available.',
-               'from@example.com',
-               [student.person.email],
-               fail_silently=False,
-           )
+       enqueue_notification(
+           'New Course Available',
+           f'A new course named {instance.name} is now available.',
+           audience=Notification.AUDIENCE_STUDENTS,
+       )
 
 
 @receiver(post_delete, sender=Course)
 def course_post_delete(sender, instance, **kwargs):
    # Notify students about the course deletion
-   students = Student.objects.all()
-   for student in students:
-       send_mail(
-           'Course Deleted',
-           f'The course named {instance.name} has been deleted.',
-           'from@example.com',
-           [student.person.email],
-           fail_silently=False,
-       )
+   enqueue_notification(
+       'Course Deleted',
+       f'The course named {instance.name} has been deleted.',
+       audience=Notification.AUDIENCE_STUDENTS,
+   )
 
 
 # Signal to handle updates on Enrollment model
 @receiver(pre_save, sender=Enrollment)
 def enrollment_pre_save(sender, instance, **kwargs):
-   # Ensure a student cannot enroll in the same course twice
-   if instance.pk is None:
+   # Ensure a student cannot enroll in the same course twice. In a signal
+   # batch the (student, course) unique constraint rejects it at INSERT.
+   if instance.pk is None and not batching.active():
        if Enrollment.objects.filter(student=instance.student, course=instance.course).exists():
            raise ValueError('Student is already enrolled in this course.')
 
 
 @receiver(post_save, sender=Enrollment)
 def enrollment_post_save(sender, instance, created, **kwargs):
-   if created:
+   if created and not batching.defer(_notify_enrolled, (instance.student_id, instance.course_id)):
        # Notify student about the new enrollment
-       send_mail(
+       enqueue_notification(
            'Enrollment Confirmed',
            f'You have been enrolled in the course: {instance.course.name}.',
-           'from@example.com',
            [instance.student.person.email],
-           fail_silently=False,
        )
 
 
 @receiver(post_delete, sender=Enrollment)
 def enrollment_post_delete(sender, instance, **kwargs):
    # Notify student about the enrollment cancellation
-   send_mail(
+   if batching.defer(_notify_unenrolled, (instance.student_id, instance.course_id)):
+       return
+   enqueue_notification(
        'Enrollment Cancelled',
        f'Your enrollment in the course: {instance.course.name} has been cancelled.',
-       'from@example.com',
        [instance.student.person.email],
-       fail_silently=False,
    )
 
 
@@ -92,33 +217,176 @@ def enrollment_post_delete(sender, instance, **kwargs):
 @receiver(pre_save, sender=Review)
 def review_pre_save(sender, instance, **kwargs):
    # Ensure the student is enrolled in the course before they can leave a review
+   if batching.defer(_require_enrolled, (instance.student_id, instance.course_id)):
+       return
    if not Enrollment.objects.filter(student=instance.student, course=instance.course).exists():
        raise ValueError('Student must be enrolled in the course to leave a review.')
 
 
 @receiver(post_save, sender=Review)
 def review_post_save(sender, instance, created, **kwargs):
-   if created:
+   if created and not batching.defer(_notify_reviewed, instance.course_id):
        # Notify instructor about the new review
-       send_mail(
+       enqueue_notification(
            'New Review Received',
            f'You have received a new review for the course: {instance.course.name}.',
-           'from@example.com',
            [instance.course.instructor.person.email],
-           fail_silently=False,
        )
 
 
 @receiver(post_delete, sender=Review)
 def review_post_delete(sender, instance, **kwargs):
    # Notify instructor about the review deletion
-   send_mail(
+   if batching.defer(_notify_review_deleted, instance.course_id):
+       return
+   enqueue_notification(
        'Review Deleted',
        f'A review for the course: {instance.course.name} has been deleted.',
-       'from@example.com',
        [instance.course.instructor.person.email],
-       fail_silently=False,
    )
 
 
+# Keep cached serializer representations in sync with writes
+@receiver([post_save, post_delete], sender=Person)
+@receiver([post_save, post_delete], sender=Profile)
+@receiver([post_save, post_delete], sender=Instructor)
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Module)
+@receiver([post_save, post_delete], sender=Enrollment)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=StudentCourse)
+def invalidate_cached_representation(sender, instance, **kwargs):
+   if not batching.active():
+       object_cache.invalidate(instance)
+       return
+   parents = [(model, getattr(instance, attname, None)) for model, attname in object_cache.EMBEDDED_IN.get(sender, [])]
+   batching.defer(_invalidate, (sender, instance.pk, [(model, pk) for model, pk in parents if pk is not None]))
+
+
+# A row embedded in its parent's representation (a course in its instructor,
+# marks in their student) changes the parent's ETag, deletions included.
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=StudentCourse)
+def touch_embedding_parent(sender, instance, **kwargs):
+   for model, attname in object_cache.EMBEDDED_IN[sender]:
+       if not batching.defer(_touch_parents, (model, getattr(instance, attname))):
+           model.objects.filter(pk=getattr(instance, attname)).update(updated_at=timezone.now())
+
+
+# Incremental maintenance of CourseStats. Each row contributes a set of
+# counter deltas to its course; an update retracts the contribution of the
+# stored row before adding the new one. Bulk writes bypass these receivers
+# and must be followed by CourseStats.objects.rebuild().
+STATS_CONTRIBUTIONS = {
+   Review: (('course_id', 'rating'), lambda row: {'review_count': 1, 'rating_sum': int(row['rating']), f"rating_{int(row['rating'])}": 1}),
+   Enrollment: (('course_id', 'student_id'), lambda row: {'enrollment_count': 1}),
+   StudentCourse: (('course_id', 'marks'), lambda row: {} if row['marks'] is None else {'marks_sum': int(row['marks']), 'marks_count': 1}),
+}
+
+
+def _stats_row(instance, fields):
+   return {field: getattr(instance, field) for field in fields}
+
+
+def _stats_delta(course_id, deltas, sign=1):
+   if not batching.defer(_apply_stats, (course_id, {field: sign * delta for field, delta in deltas.items()})):
+       CourseStats.objects.apply(course_id, deltas, sign=sign)
+
+
+@receiver(pre_save, sender=Review)
+@receiver(pre_save, sender=Enrollment)
+@receiver(pre_save, sender=StudentCourse)
+def stats_pre_save(sender, instance, **kwargs):
+   fields, _ = STATS_CONTRIBUTIONS[sender]
+   instance._stats_original = None
+   if not instance._state.adding:
+       instance._stats_original = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Enrollment)
+@receiver(post_save, sender=StudentCourse)
+def stats_post_save(sender, instance, **kwargs):
+   fields, contribution = STATS_CONTRIBUTIONS[sender]
+   current = _stats_row(instance, fields)
+   original = getattr(instance, '_stats_original', None)
+   if original == current:
+       return
+   if original is not None:
+       _stats_delta(original['course_id'], contribution(original), sign=-1)
+   _stats_delta(current['course_id'], contribution(current))
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_delete, sender=StudentCourse)
+def stats_post_delete(sender, instance, **kwargs):
+   fields, contribution = STATS_CONTRIBUTIONS[sender]
+   _stats_delta(instance.course_id, contribution(_stats_row(instance, fields)), sign=-1)
+
+
+@receiver(post_save, sender=StudentCourse)
+def leaderboard_post_save(sender, instance, **kwargs):
+   original = getattr(instance, '_stats_original', None)
+   if instance.marks is None:
+       # Enrolled but not graded (again): ranked nowhere.
+       if original is not None and original['marks'] is not None:
+           leaderboard.record_removal(instance.student_id, original['course_id'])
+   elif original is not None and original['course_id'] != instance.course_id:
+       leaderboard.record_move(instance.student_id, instance.course_id, int(instance.marks), original['course_id'])
+   elif original is None or original['marks'] != instance.marks:
+       leaderboard.record_marks(instance.course_id, {instance.student_id: int(instance.marks)})
+
+
+@receiver(post_delete, sender=StudentCourse)
+def leaderboard_post_delete(sender, instance, **kwargs):
+   leaderboard.record_removal(instance.student_id, instance.course_id)
+
+
+@receiver(post_save, sender=Enrollment)
+def coenrollment_post_save(sender, instance, created, **kwargs):
+   original = getattr(instance, '_stats_original', None)
+   moved = original is not None and (original['course_id'], original['student_id']) != (instance.course_id, instance.student_id)
+   if moved and not batching.defer(_record_coenrollment, (False, (original['course_id'], original['student_id']))):
+       coenrollment.record_unenrollments([(original['course_id'], original['student_id'])])
+   if (created or moved) and not batching.defer(_record_coenrollment, (True, (instance.course_id, instance.student_id))):
+       coenrollment.record_enrollments([(instance.course_id, instance.student_id)])
+
+
+@receiver(post_delete, sender=Enrollment)
+def coenrollment_post_delete(sender, instance, **kwargs):
+   if not batching.defer(_record_coenrollment, (False, (instance.course_id, instance.student_id))):
+       coenrollment.record_unenrollments([(instance.course_id, instance.student_id)])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Module)
+@receiver(post_save, sender=Review)
+def search_index_post_save(sender, instance, **kwargs):
+   search.index(instance)
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Module)
+@receiver(post_delete, sender=Review)
+def search_index_post_delete(sender, instance, **kwargs):
+   search.remove(instance)
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Instructor)
+def invalidate_catalog(sender, instance, **kwargs):
+   catalog.invalidate()
+
+
+@receiver(post_save, sender=Person)
+def catalog_person_post_save(sender, instance, created, **kwargs):
+   # Instructor names and emails are part of every course in the catalog.
+   if not created and Instructor.objects.filter(person=instance).exists():
+       catalog.invalidate()
+
 
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_principal(sender, instance, **kwargs):
+   authentication.invalidate_principal(instance.pk)
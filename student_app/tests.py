@@ -1 +1,517 @@
-from django.test import TestCase
+import contextlib
+import io
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import analytics, authentication, batching, coenrollment, leaderboard, object_cache, routers
+from .enrollments import ALREADY_ENROLLED, CREATED, bulk_enroll, reconcile, unenroll
+from .grading import import_marks
+from .models import Course, CourseStats, Enrollment, Instructor, Module, Notification, Person, Review, Student, StudentCourse
+from .notifications import OutboxWorker, enqueue_notification
+from .urls import router
+
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'student-app-tests'}}
+
+
+def _person(email):
+    # No password: hashing at the configured cost would dominate the suite.
+    return Person.objects.create_user(email, 'Test', email.split('@')[0], '5550100', '1 Test Street')
+
+
+def seed(count=12):
+    # `count` rows for every list endpoint. The student, module and enrollment
+    # lists only show rows of courses named "Mathematics", so every course is.
+    students = []
+    for index in range(count):
+        instructor = Instructor.objects.create(person=_person(f'instructor{index}@example.com'), bio='Teaches.', salary=Decimal(60000 + index))
+        course = Course.objects.create(name='Mathematics', description='Numbers.', instructor=instructor)
+        Module.objects.create(course=course, name=f'Module {index}', description='Part of the course.')
+        student = Student.objects.create(person=_person(f'student{index}@example.com'), registration_number=f'2024{index:04d}')
+        Enrollment.objects.create(student=student, course=course)
+        StudentCourse.objects.create(student=student, course=course, marks=50 + index)
+        Review.objects.create(student=student, course=course, rating=5, comment='Clear and well paced.')
+        students.append(student)
+    return students
+
+
+def admin_client():
+    client = APIClient()
+    client.force_authenticate(get_user_model()(username='test-admin', is_staff=True, is_superuser=True))
+    return client
+
+
+@override_settings(CACHES=NO_CACHE, CATALOG_SNAPSHOT_ENABLED=False)
+class ListQueryCountTests(TestCase):
+    # Every list endpoint issues the same number of queries whatever the page
+    # size. Cached representations would hide N+1 queries and the catalog
+    # snapshot serves warm /api/courses/ pages with none, so both are off.
+    PAGE_SIZES = (1, 5, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        seed()
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        client = admin_client()
+        for prefix, viewset, basename in router.registry:
+            url = reverse(f'{basename}-list')
+            with self.subTest(url=url):
+                expected = None
+                for page_size in self.PAGE_SIZES:
+                    if expected is None:
+                        with CaptureQueriesContext(connection) as queries:
+                            response = client.get(url, {'page_size': page_size})
+                        expected = len(queries)
+                    else:
+                        with self.assertNumQueries(expected):
+                            response = client.get(url, {'page_size': page_size})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.json()['results']), page_size)
+
+
+@override_settings(CACHES=NO_CACHE)
+class HighSalaryInstructorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(3)
+
+    def test_base_must_be_finite(self):
+        client = admin_client()
+        url = reverse('instructor-get-high-salary-instructors')
+        for base in ('NaN', 'sNaN', 'Infinity', '-Infinity', 'abc'):
+            with self.subTest(base=base):
+                self.assertEqual(client.get(url, {'base': base}).status_code, 400)
+        # Salaries are 60000, 60001 and 60002; the threshold is 1.2 * base.
+        response = client.get(url, {'base': '50000.5'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+@override_settings(CACHES=NO_CACHE)
+class EnrollmentWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed(3)
+        cls.courses = [Enrollment.objects.get(student=student).course for student in cls.students]
+
+    def test_destroy_removes_both_rows(self):
+        enrollment = Enrollment.objects.get(student=self.students[0])
+        response = admin_client().delete(reverse('enrollment-detail', args=[enrollment.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(StudentCourse.objects.filter(student=self.students[0], course=self.courses[0]).exists())
+        self.assertEqual(reconcile()['enrollment_created'], 0)
+        self.assertFalse(Enrollment.objects.filter(pk=enrollment.pk).exists())
+
+    def test_update_cannot_move_an_enrollment(self):
+        enrollment = Enrollment.objects.get(student=self.students[0])
+        url = reverse('enrollment-detail', args=[enrollment.pk])
+        client = admin_client()
+        self.assertEqual(client.patch(url, {'student': self.students[1].person.email}, format='json').status_code, 400)
+        self.assertEqual(client.patch(url, {'course': {'id': self.courses[1].pk}}, format='json').status_code, 400)
+        enrollment.refresh_from_db()
+        self.assertEqual((enrollment.student_id, enrollment.course_id), (self.students[0].pk, self.courses[0].pk))
+
+    def test_update_students_writes_both_tables(self):
+        course = self.courses[0]
+        response = admin_client().put(
+            reverse('course-update-students', args=[course.pk]),
+            {'students': [self.students[1].pk, self.students[2].pk]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['unenrolled'], [self.students[0].pk])
+        expected = {self.students[1].pk, self.students[2].pk}
+        self.assertEqual(set(Enrollment.objects.filter(course=course).values_list('student_id', flat=True)), expected)
+        self.assertEqual(set(StudentCourse.objects.filter(course=course).values_list('student_id', flat=True)), expected)
+
+
+    def test_bulk_enroll_counts_only_inserted_rows(self):
+        # A concurrent request enrolled students[0] after this one read the
+        # existing pairs: only the other row is created and counted.
+        course = self.courses[1]
+        before = CourseStats.objects.get(course=course).enrollment_count
+        with mock.patch('student_app.enrollments.existing_pairs', return_value=set()):
+            results = bulk_enroll([
+                {'student': self.students[0].pk, 'course': course.pk},
+                {'student': self.students[1].pk, 'course': course.pk},
+                {'student': self.students[2].pk, 'course': course.pk},
+            ])
+        self.assertEqual([result['status'] for result in results], [CREATED, ALREADY_ENROLLED, CREATED])
+        self.assertEqual(CourseStats.objects.get(course=course).enrollment_count, before + 2)
+        self.assertEqual(Enrollment.objects.filter(course=course).count(), 3)
+        marks = StudentCourse.objects.get(student=self.students[0], course=course)
+        self.assertIsNone(marks.marks)
+        self.assertEqual(marks.date_enrolled, Enrollment.objects.get(student=self.students[0], course=course).enrollment_date)
+
+    def test_unenroll_deletes_per_course_set(self):
+        course = self.courses[0]
+        bulk_enroll([{'student': student.pk, 'course': course.pk} for student in self.students[1:]])
+        with CaptureQueriesContext(connection) as queries:
+            removed = unenroll([(student.pk, course.pk) for student in self.students])
+        self.assertEqual(removed, 3)
+        deletes = [query['sql'] for query in queries if query['sql'].startswith('DELETE FROM "student_app_enrollment"')]
+        self.assertEqual(len(deletes), 1)
+        self.assertFalse(StudentCourse.objects.filter(course=course).exists())
+
+
+@override_settings(CACHES=NO_CACHE)
+class CourseStatsTests(TestCase):
+    # CourseStats is kept by signal deltas; check_course_stats fails on any
+    # difference from the live aggregates.
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed(3)
+        cls.courses = [Enrollment.objects.get(student=student).course for student in cls.students]
+
+    def assertConsistent(self):
+        call_command('check_course_stats', stdout=io.StringIO())
+
+    def _create_move_delete(self, scope):
+        student, (_, second, third) = self.students[0], self.courses
+        with scope():
+            Enrollment.objects.create(student=student, course=second)
+            Enrollment.objects.create(student=student, course=third)
+        self.assertConsistent()
+        with scope():
+            marks = StudentCourse.objects.create(student=student, course=second, marks=70)
+            review = Review.objects.create(student=student, course=second, rating=3, comment='Fine.')
+        self.assertConsistent()
+        with scope():
+            marks.marks, review.rating = 90, 5
+            marks.save()
+            review.save()
+        self.assertConsistent()
+        with scope():
+            marks.course, marks.marks, review.course = third, None, third
+            marks.save()
+            review.save()
+        self.assertConsistent()
+        self.assertEqual((CourseStats.objects.get(course=third).review_count, CourseStats.objects.get(course=second).marks_count), (2, 1))
+        with scope():
+            marks.delete()
+            review.delete()
+        self.assertConsistent()
+
+    def test_signal_deltas_track_create_move_delete(self):
+        self._create_move_delete(contextlib.nullcontext)
+
+    def test_batched_deltas_track_create_move_delete(self):
+        self._create_move_delete(batching.batch)
+
+
+@override_settings(CACHES=NO_CACHE, MARKS_ANALYTICS_MAX_AGE=3600)
+class MarksAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed(2)
+
+    def setUp(self):
+        analytics.invalidate_marks()
+
+    def test_import_marks_refreshes_the_loaded_columns(self):
+        course = Enrollment.objects.get(student=self.students[0]).course
+        self.assertEqual(sorted(analytics.marks_columns()['marks'].tolist()), [50, 51])
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_marks(course, [{'student': self.students[0].pk, 'marks': 99}, {'student': self.students[1].pk, 'marks': 70}])
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(sorted(analytics.marks_columns()['marks'].tolist()), [51, 70, 99])
+
+    def test_import_marks_rejects_fractions_and_touches_updated_at(self):
+        course = Enrollment.objects.get(student=self.students[0]).course
+        before = StudentCourse.objects.get(student=self.students[0], course=course).updated_at
+        result = import_marks(course, [
+            {'student': self.students[0].pk, 'marks': 88.0},
+            {'student': self.students[1].pk, 'marks': 95.7},
+            {'student': self.students[1].pk, 'marks': '95.7'},
+        ])
+        self.assertEqual([error['index'] for error in result['errors']], [1, 2])
+        row = StudentCourse.objects.get(student=self.students[0], course=course)
+        self.assertEqual(row.marks, 88)
+        self.assertGreater(row.updated_at, before)
+
+
+@override_settings(CACHES=NO_CACHE)
+class LeaderboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # In the first course: 90, 80, 80, 70. Global averages: 90, 65.5, 66, 61.5.
+        cls.students = seed(4)
+        cls.course = Enrollment.objects.get(student=cls.students[0]).course
+        StudentCourse.objects.filter(student=cls.students[0]).update(marks=90)
+        for student, marks in zip(cls.students[1:], (80, 80, 70)):
+            StudentCourse.objects.create(student=student, course=cls.course, marks=marks)
+
+    def setUp(self):
+        leaderboard.store().clear()
+
+    def test_course_ranking_shares_ranks_on_ties(self):
+        first, second, third, fourth = (student.pk for student in self.students)
+        self.assertEqual(leaderboard.course_top(self.course.pk), [(first, 90), (third, 80), (second, 80), (fourth, 70)])
+        self.assertEqual(leaderboard.course_rank(self.course.pk, first), {'score': 90, 'rank': 1, 'total': 4, 'percentile': 87.5})
+        self.assertEqual(leaderboard.course_rank(self.course.pk, second), {'score': 80, 'rank': 2, 'total': 4, 'percentile': 50.0})
+        self.assertEqual(leaderboard.course_rank(self.course.pk, third)['rank'], 2)
+        self.assertEqual(leaderboard.course_rank(self.course.pk, fourth), {'score': 70, 'rank': 4, 'total': 4, 'percentile': 12.5})
+        self.assertIsNone(leaderboard.course_rank(self.course.pk, 0))
+
+    def test_describe_ranks_leave_no_gap_for_deleted_students(self):
+        entries = leaderboard.course_top(self.course.pk)
+        self.assertEqual([row['rank'] for row in leaderboard.describe(entries, 'marks')], [1, 2, 2, 4])
+        self.students[2].delete()
+        rows = leaderboard.describe(entries, 'marks')
+        self.assertEqual([(row['student'], row['rank']) for row in rows], [(self.students[0].pk, 1), (self.students[1].pk, 2), (self.students[3].pk, 3)])
+
+    def test_high_achievers_rank_by_average(self):
+        response = admin_client().get(reverse('student-get-high-achievers'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(row['student'], row['average_marks']) for row in response.data], [(self.students[0].pk, 90.0)])
+        self.assertEqual(leaderboard.global_rank(self.students[2].pk)['rank'], 2)
+
+
+@override_settings(CACHES=LOCMEM, AUTH_PRINCIPAL_CACHE_TTL=60)
+class PrincipalCacheTests(TestCase):
+    def setUp(self):
+        authentication.cache().clear()
+        self.user = get_user_model().objects.create(username='staff', password='pbkdf2_sha256$1$salt$hash', is_staff=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.url = reverse('instructor-get-instructor-analytics')
+
+    def test_caches_principal_fields_only(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        cached = authentication.cache().get(authentication._principal_key(self.user.pk))
+        self.assertCountEqual(cached, [self.user.pk, 'staff', True, True, False])
+        self.assertNotIn(self.user.password, cached)
+        # Served from the cache: no query loads the user.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertFalse([query for query in queries if 'auth_user' in query['sql']])
+
+    def test_saving_the_user_drops_the_entry(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = False
+            self.user.save()
+        self.assertIsNone(authentication.cache().get(authentication._principal_key(self.user.pk)))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+@override_settings(CACHES=NO_CACHE)
+class CoEnrollmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed(3)
+        cls.courses = [Enrollment.objects.get(student=student).course for student in cls.students]
+        # students[0] also takes courses[1].
+        Enrollment.objects.create(student=cls.students[0], course=cls.courses[1])
+
+    def test_unknown_course_is_404(self):
+        client = admin_client()
+        for name in ('course-get-also-took', 'course-get-similar-courses'):
+            with self.subTest(name=name):
+                self.assertEqual(client.get(reverse(name, args=[0])).status_code, 404)
+
+    def test_index_files_reload_only_when_rebuilt(self):
+        if coenrollment.np is None:
+            self.skipTest('NumPy is not installed')
+        first, second, third = self.courses
+        with tempfile.TemporaryDirectory() as path, override_settings(COENROLLMENT_INDEX_PATH=path, COENROLLMENT_MAX_AGE=-1):
+            snapshot = coenrollment.Snapshot.from_database()
+            snapshot.save(path)
+            index = coenrollment.CoEnrollmentIndex()
+            self.assertEqual(index.also_took(first.pk, 10), [(second.pk, 1)])
+            # Written by this process after the build: kept across expired reloads of the same files.
+            index.add([(third.pk, self.students[0].pk)])
+            self.assertEqual(index.also_took(first.pk, 10), [(second.pk, 1), (third.pk, 1)])
+            self.assertEqual(index.also_took(first.pk, 10), [(second.pk, 1), (third.pk, 1)])
+            # A newer build replaces the snapshot and the overlay.
+            rebuilt = coenrollment.Snapshot.from_database()
+            rebuilt.built_at = snapshot.built_at + 1
+            rebuilt.save(path)
+            self.assertEqual(index.also_took(first.pk, 10), [(second.pk, 1)])
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxWorkerTests(TestCase):
+    RECIPIENTS = ['a@example.com', 'b@example.com', 'c@example.com']
+
+    def test_drain_sends_every_recipient(self):
+        notification = enqueue_notification('Subject', 'Body', self.RECIPIENTS)
+        stats = OutboxWorker(batch_size=2, concurrency=2).drain()
+        self.assertEqual((stats['jobs'], stats['batches'], stats['messages']), (1, 2, 3))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), self.RECIPIENTS)
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.cursor, notification.sent_count), (Notification.SENT, 3, 3))
+
+    def test_failed_batch_resumes_after_the_last_sent_one(self):
+        notification = enqueue_notification('Subject', 'Body', self.RECIPIENTS)
+        send = OutboxWorker._send
+
+        def fail_for_b(worker, messages):
+            if messages[0].to == ['b@example.com']:
+                raise ConnectionError('refused')
+            return send(worker, messages)
+
+        with mock.patch.object(OutboxWorker, '_send', fail_for_b):
+            stats = OutboxWorker(batch_size=1, concurrency=3).drain()
+        self.assertEqual(stats['failed'], 1)
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.cursor, notification.sent_count), (Notification.PENDING, 1, 1))
+        self.assertEqual(notification.last_error, 'refused')
+
+        # c@example.com may have gone out after the failure; only a@example.com is checkpointed.
+        mail.outbox = []
+        OutboxWorker(batch_size=1, concurrency=3).drain()
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), self.RECIPIENTS[1:])
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.cursor, notification.attempts), (Notification.SENT, 3, 2))
+
+    @override_settings(NOTIFICATION_CLAIM_TIMEOUT=60)
+    def test_stale_processing_jobs_are_reclaimed(self):
+        stale = enqueue_notification('Stale', 'Body', self.RECIPIENTS[:1])
+        active = enqueue_notification('Active', 'Body', self.RECIPIENTS[1:2])
+        Notification.objects.filter(pk=stale.pk).update(status=Notification.PROCESSING, claimed_at=timezone.now() - timedelta(minutes=5))
+        Notification.objects.filter(pk=active.pk).update(status=Notification.PROCESSING, claimed_at=timezone.now())
+        OutboxWorker().drain()
+        self.assertEqual([message.subject for message in mail.outbox], ['Stale'])
+        self.assertEqual(Notification.objects.get(pk=active.pk).status, Notification.PROCESSING)
+
+
+@override_settings(CACHES=NO_CACHE)
+class GradebookExportMemoryTests(TestCase):
+    # Buffering the export would hold every row tuple (several MB at this
+    # size); streamed, the peak is one chunk of rows whatever the row count.
+    ROWS = 20000
+    MEMORY_CEILING = 4 * 1024 * 1024
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Enrollment.objects.get(student=seed(1)[0]).course
+        persons = Person.objects.bulk_create(
+            Person(email=f'export{index}@example.com', first_name='Export', last_name=f'Student {index}', phone_number='5550100', address='1 Test Street')
+            for index in range(cls.ROWS)
+        )
+        students = Student.objects.bulk_create(Student(person=person, registration_number=f'E{index:07d}') for index, person in enumerate(persons))
+        StudentCourse.objects.bulk_create(StudentCourse(student=student, course=cls.course, marks=index % 101) for index, student in enumerate(students))
+
+    def test_export_streams_in_bounded_memory(self):
+        client = admin_client()
+        url = reverse('course-export-gradebook', args=[self.course.pk])
+        for export_format in ('csv', 'ndjson'):
+            with self.subTest(export_format=export_format):
+                tracemalloc.start()
+                try:
+                    response = client.get(url, {'export_format': export_format})
+                    lines = 0
+                    for chunk in response.streaming_content:
+                        lines += chunk.count(b'\n')
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(lines, self.ROWS + 1 + (export_format == 'csv'))
+                self.assertLess(peak, self.MEMORY_CEILING)
+
+
+@override_settings(CACHES=NO_CACHE, CATALOG_SNAPSHOT_ENABLED=False, DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(TransactionTestCase):
+    # replica1 mirrors default with a connection of its own, so the rows are
+    # committed (TransactionTestCase) for it to see them.
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        self.students = seed(2)
+        self.courses = [Enrollment.objects.get(student=student).course for student in self.students]
+        self.client = admin_client()
+
+    def _get(self, url):
+        with CaptureQueriesContext(connections['default']) as primary, CaptureQueriesContext(connections['replica1']) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(primary), len(replica)
+
+    def test_safe_requests_read_from_the_replica(self):
+        response, primary, replica = self._get(reverse('course-list'))
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        response = self.client.post(reverse('enrollment-list'), {'student': self.students[0].pk, 'course': self.courses[1].pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+        until = float(response.cookies[routers.STICKY_COOKIE].value)
+        self.assertAlmostEqual(until, time.time() + 5, delta=2)
+
+        # The client sends the cookie back: inside the window, reads see the write on the primary.
+        _, primary, replica = self._get(reverse('course-list'))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        # Once the window has passed, reads go back to the replica.
+        self.client.cookies[routers.STICKY_COOKIE] = str(int(time.time() - 1))
+        _, primary, replica = self._get(reverse('course-list'))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_outside_requests_use_the_primary(self):
+        self.assertEqual(routers.ReplicaRouter().db_for_read(Course), 'default')
+        self.assertEqual(Course.objects.all().db, 'default')
+
+
+@override_settings(CACHES=LOCMEM)
+class ObjectCacheTests(TransactionTestCase):
+    # Writes really commit here, so invalidations run when they would in production.
+    def setUp(self):
+        self.student = seed(1)[0]
+        object_cache.cache().clear()
+        object_cache.reset_stats()
+        self.client = admin_client()
+        self.url = reverse('student-detail', args=[self.student.pk])
+
+    def _first_name(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['person']['first_name']
+
+    def test_save_makes_the_next_read_miss(self):
+        self.assertEqual(self._first_name(), 'Test')
+        self.assertEqual(self._first_name(), 'Test')
+        hits = object_cache.stats()['hits']
+        self.assertGreater(hits, 0)
+        person = self.student.person
+        person.first_name = 'Renamed'
+        person.save()
+        misses = object_cache.stats()['misses']
+        self.assertEqual(self._first_name(), 'Renamed')
+        self.assertGreater(object_cache.stats()['misses'], misses)
+
+    def test_generations_change_on_commit_only(self):
+        self._first_name()
+        key = object_cache._generation_key(Person, self.student.person.pk)
+        before = object_cache.cache().get(key)
+        person = self.student.person
+        person.first_name = 'Pending'
+        with transaction.atomic():
+            person.save()
+            # Other readers still get the committed row's stamp; this
+            # transaction builds its own representation without the cache.
+            self.assertEqual(object_cache.cache().get(key), before)
+            self.assertEqual(self._first_name(), 'Pending')
+        self.assertNotEqual(object_cache.cache().get(key), before)
+        self.assertEqual(self._first_name(), 'Pending')
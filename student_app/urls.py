@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PersonViewSet, ProfileViewSet, InstructorViewSet, StudentViewSet, CourseViewSet, ModuleViewSet, EnrollmentViewSet, ReviewViewSet
+from . import async_views
+from .views import PersonViewSet, ProfileViewSet, InstructorViewSet, StudentViewSet, CourseViewSet, ModuleViewSet, EnrollmentViewSet, ReviewViewSet, CacheStatsView, MetricsView, SearchView
 
 router = DefaultRouter()
 router.register(r'persons', PersonViewSet, basename='person')
@@ -15,6 +16,13 @@ router.register(r'reviews', ReviewViewSet, basename='review')
 
 urlpatterns = [
   path('api/', include(router.urls)),
+  path('api/async/courses/', async_views.course_list, name='async-course-list'),
+  path('api/async/courses/<int:pk>/', async_views.course_detail, name='async-course-detail'),
+  path('api/async/students/<int:pk>/marks/', async_views.student_marks, name='async-student-marks'),
+  path('api/async/reviews/statistics/', async_views.review_statistics, name='async-review-statistics'),
+  path('api/search/', SearchView.as_view(), name='search'),
+  path('api/cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+  path('api/internal/metrics/', MetricsView.as_view(), name='metrics'),
   path('api/auth/', include('dj_rest_auth.urls')),
   path('api/auth/registration/', include('dj_rest_auth.registration.urls')),
 ]
@@ -1,61 +1,107 @@
-from django.utils.decorators import method_decorator
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.response import Response
-from django.db.models import F, Q, Value, Case, When, Count
+from django.db.models import F, Q, Value, Count
 from .models import Person, Profile, Instructor, Student, Course, Module, Enrollment, Review, StudentCourse
 from .serializers import PersonSerializer, ProfileSerializer, InstructorSerializer, StudentSerializer, CourseSerializer, ModuleSerializer, EnrollmentSerializer, ReviewSerializer
-from .pagination import StandardResultsSetPagination
-from django.views.decorators.cache import cache_page
+from .pagination import StandardCursorPagination
 from .decorators import handle_exceptions  # Import the decorator
+from .writes import serialize_writes
+from .conditional import ConditionalRetrieveMixin
+from . import activity, analytics, catalog, coenrollment, leaderboard, metrics, object_cache, people, search
+from .prefetch import plan_queryset
+from .enrollments import ALREADY_ENROLLED, CREATED, bulk_enroll, set_courses, set_students, unenroll
+from .exports import EXPORT_FORMATS, gradebook_response, course_gradebook, instructor_gradebook
+from .grading import import_marks, read_csv_rows
 from django.db.models import Avg, Min, Max, Sum, Count
 from django.db import transaction
 from django.db.transaction import on_commit
 from datetime import timedelta
-from django.db import models
+from decimal import Decimal, InvalidOperation
+from collections import Counter
+from django.conf import settings
+from django.http import HttpResponse
 from django.db.models.functions import Concat
+from django.utils import timezone
 from django.db.models import F, Value
 
 
-CACHE_TTL = 60 * 15  # 15 minutes.
+def _leaderboard_limit(request):
+   try:
+       limit = int(request.query_params.get('limit', 10))
+   except ValueError:
+       limit = 10
+   return max(1, min(limit, getattr(settings, 'LEADERBOARD_MAX_LIMIT', 100)))
 
 
-class PersonViewSet(viewsets.ModelViewSet):
+def _recent_response(view, request, queryset, field, date_only=False):
+   # Rows created in the ?since=&until= window (default: last 30 days), newest
+   # first, paged by cursor over the (-field, id) index.
+   try:
+       since, until = activity.parse_window(request.query_params)
+   except ValueError as e:
+       return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+   queryset = queryset.filter(activity.window_filter(field, since, until, date_only))
+   view.cursor_ordering = (f'-{field}', 'id')
+   page = view.paginate_queryset(plan_queryset(queryset, view.get_serializer_class()))
+   serializer = view.get_serializer(page, many=True)
+   return view.get_paginated_response(serializer.data)
+
+
+def _activity_response(request, queryset, field, date_only=False):
+   # Row counts per day or week (?bucket=day|week) inside the window.
+   try:
+       since, until = activity.parse_window(request.query_params)
+       bucket = activity.parse_bucket(request.query_params)
+   except ValueError as e:
+       return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+   queryset = queryset.filter(activity.window_filter(field, since, until, date_only))
+   return Response({
+       'bucket': bucket,
+       'since': since,
+       'until': until,
+       'results': activity.bucket_counts(queryset, field, bucket, date_only),
+   }, status=status.HTTP_200_OK)
+
+
+
+
+class PersonViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
 
    serializer_class = PersonSerializer
-   pagination_class = StandardResultsSetPagination
+   pagination_class = StandardCursorPagination
+   cursor_ordering = ('last_name', 'id')
 
 
    def get_queryset(self):
-       return Person.objects.select_related('profile').annotate(
+       queryset = Person.objects.annotate(
            full_name=Concat(F('first_name'), Value(' '), F('last_name'))
-       ).order_by('last_name')[:10]
+       )
+       return plan_queryset(queryset, self.get_serializer_class())
 
 
-   @method_decorator(cache_page(CACHE_TTL))
    @handle_exceptions
    def list(self, request, *args, **kwargs):
-       queryset = self.get_queryset()
-       serializer = self.get_serializer(queryset, many=True)
-       return Response(serializer.data)
+       return super().list(request, *args, **kwargs)
 
 
    @handle_exceptions
    @transaction.atomic
    def create(self, request, *args, **kwargs):
-       person, created = Person.objects.get_or_create(
+       if Person.objects.filter(email=Person.objects.normalize_email(request.data['email'])).exists():
+           return Response({'error': 'Person with this email already exists'}, status=status.HTTP_400_BAD_REQUEST)
+       # create_user hashes the password and runs full_clean before its single save.
+       person = Person.objects.create_user(
            email=request.data['email'],
-           defaults={
-               'first_name': request.data['first_name'],
-               'last_name': request.data['last_name'],
-               'phone_number': request.data['phone_number'],
-               'address': request.data['address'],
-               'password': request.data['password']
-           }
+           first_name=request.data['first_name'],
+           last_name=request.data['last_name'],
+           phone_number=request.data['phone_number'],
+           address=request.data['address'],
+           password=request.data['password'],
        )
-       if not created:
-           return Response({'error': 'Person with this email already exists'}, status=status.HTTP_400_BAD_REQUEST)
-       person.full_clean()  
-       person.save()
 
 
        def post_commit():
@@ -69,31 +115,42 @@ class PersonViewSet(viewsets.ModelViewSet):
        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-   @handle_exceptions
-   def retrieve(self, request, *args, **kwargs):
-       instance = self.get_object()
-       instance.full_clean()  
-       instance.save()  
-       return super().retrieve(request, *args, **kwargs)
+   @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAdminUser])
+   @handle_exceptions
+   def import_people(self, request, *args, **kwargs):
+       if 'file' in request.FILES:
+           rows = read_csv_rows(request.FILES['file'])
+       else:
+           rows = request.data.get('persons') if isinstance(request.data, dict) else request.data
+       if not isinstance(rows, list):
+           return Response({'error': 'Upload a CSV file or send a list of person objects'}, status=status.HTTP_400_BAD_REQUEST)
+       max_rows = getattr(settings, 'PERSON_IMPORT_MAX_ROWS', 5000)
+       if len(rows) > max_rows:
+           return Response({'error': f'At most {max_rows} persons per request; use manage.py import_people for more'}, status=status.HTTP_400_BAD_REQUEST)
+       result = people.import_people(
+           rows,
+           chunk_size=getattr(settings, 'PERSON_IMPORT_CHUNK_SIZE', 1000),
+           workers=getattr(settings, 'PERSON_IMPORT_WORKERS', 0),
+       )
+       return Response(result, status=status.HTTP_200_OK)
 
 
 
 
-@method_decorator(cache_page(CACHE_TTL), name='dispatch')
-class ProfileViewSet(viewsets.ModelViewSet):
+class ProfileViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
    serializer_class = ProfileSerializer
-   pagination_class = StandardResultsSetPagination
+   pagination_class = StandardCursorPagination
+   cursor_ordering = ('id',)
 
 
    def get_queryset(self):
-       return Profile.objects.select_related('person').order_by('-person__last_name')[:10]
+       queryset = Profile.objects.all()
+       return plan_queryset(queryset, self.get_serializer_class())
 
 
    @handle_exceptions
    def list(self, request, *args, **kwargs):
-       queryset = self.get_queryset()
-       serializer = self.get_serializer(queryset, many=True)
-       return Response(serializer.data)
+       return super().list(request, *args, **kwargs)
 
 
    @handle_exceptions
@@ -122,21 +179,20 @@ class ProfileViewSet(viewsets.ModelViewSet):
 
 
 
-class InstructorViewSet(viewsets.ModelViewSet):
+class InstructorViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
    serializer_class = InstructorSerializer
-   pagination_class = StandardResultsSetPagination
+   pagination_class = StandardCursorPagination
+   cursor_ordering = ('-salary', 'id')
 
 
    def get_queryset(self):
-       return Instructor.objects.select_related('person').filter(salary__gte=50000).exclude(bio='Retired').order_by('-salary')[:10]
+       queryset = Instructor.objects.filter(salary__gte=50000).exclude(bio='Retired')
+       return plan_queryset(queryset, self.get_serializer_class())
 
 
-   @method_decorator(cache_page(CACHE_TTL))
    @handle_exceptions
    def list(self, request, *args, **kwargs):
-       queryset = self.get_queryset()
-       serializer = self.get_serializer(queryset, many=True)
-       return Response(serializer.data)
+       return super().list(request, *args, **kwargs)
 
 
    @handle_exceptions
@@ -163,38 +219,57 @@ class InstructorViewSet(viewsets.ModelViewSet):
        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+   @action(detail=True, methods=['get'], url_path='gradebook')
+   @handle_exceptions
+   def export_gradebook(self, request, *args, **kwargs):
+       instructor = self.get_object()
+       export_format = request.query_params.get('export_format', 'csv')
+       if export_format not in EXPORT_FORMATS:
+           return Response({'error': f'export_format must be one of {", ".join(EXPORT_FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+       return gradebook_response(instructor_gradebook(instructor), export_format, f'instructor-{instructor.pk}-gradebook')
+
+
+   @action(detail=False, methods=['get'], url_path='analytics', permission_classes=[IsAdminUser])
    @handle_exceptions
-   def retrieve(self, request, *args, **kwargs):
-       instance = self.get_object()
-       instance.full_clean()  
-       instance.save()  
-       return super().retrieve(request, *args, **kwargs)
+   def get_instructor_analytics(self, request, *args, **kwargs):
+       return Response(analytics.instructor_analytics(), status=status.HTTP_200_OK)
 
 
+   @action(detail=False, methods=['get'], url_path='high-salary')
    @handle_exceptions
    def get_high_salary_instructors(self, request, *args, **kwargs):
-       high_salary_instructors = Instructor.objects.filter(salary__gte=F('salary') * 1.2)
-       serializer = self.get_serializer(high_salary_instructors, many=True)
-       return Response(serializer.data)
+       # 20% or more above ?base= (default: the mean salary from the analytics snapshot).
+       try:
+           base = Decimal(request.query_params['base']) if 'base' in request.query_params else None
+       except InvalidOperation:
+           return Response({'error': 'base must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+       if base is not None and not base.is_finite():
+           return Response({'error': 'base must be a finite number'}, status=status.HTTP_400_BAD_REQUEST)
+       if base is None:
+           mean = analytics.instructor_analytics()['salary']['mean']
+           base = Decimal(str(mean)) if mean is not None else Decimal(0)
+       queryset = plan_queryset(Instructor.objects.filter(salary__gte=base * Decimal('1.2')), self.get_serializer_class())
+       page = self.paginate_queryset(queryset)
+       serializer = self.get_serializer(page, many=True)
+       return self.get_paginated_response(serializer.data)
 
 
 
 
-@method_decorator(cache_page(CACHE_TTL), name='dispatch')
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
    serializer_class = StudentSerializer
-   pagination_class = StandardResultsSetPagination
+   pagination_class = StandardCursorPagination
+   cursor_ordering = ('registration_number', 'id')
 
 
    def get_queryset(self):
-       return Student.objects.select_related('person').prefetch_related('courses').filter(courses__name='Mathematics').exclude(registration_number__startswith='2022').order_by('registration_number')[:10]
+       queryset = Student.objects.filter(courses__name='Mathematics').exclude(registration_number__startswith='2022')
+       return plan_queryset(queryset, self.get_serializer_class())
 
 
    @handle_exceptions
    def list(self, request, *args, **kwargs):
-       queryset = self.get_queryset()
-       serializer = self.get_serializer(queryset, many=True)
-       return Response(serializer.data)
+       return super().list(request, *args, **kwargs)
 
 
    @handle_exceptions
@@ -221,23 +296,23 @@ class StudentViewSet(viewsets.ModelViewSet):
        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+   @action(detail=True, methods=['put'], url_path='courses')
    @handle_exceptions
-   def retrieve(self, request, *args, **kwargs):
-       instance = self.get_object()
-       instance.full_clean()  
-       instance.save()  
-       return super().retrieve(request, *args, **kwargs)
-
-
-   @handle_exceptions
+   @serialize_writes
    def update_courses(self, request, *args, **kwargs):
        student = self.get_object()
        courses_data = request.data.get('courses', [])
-       student.courses.set(courses_data)
-       student.save()
-       return Response({'status': 'courses updated'}, status=status.HTTP_200_OK)
+       try:
+           course_ids = [int(course_id) for course_id in courses_data]
+       except (TypeError, ValueError):
+           return Response({'error': 'courses must be a list of course ids'}, status=status.HTTP_400_BAD_REQUEST)
+       result = set_courses(student.pk, course_ids, chunk_size=getattr(settings, 'BULK_ENROLLMENT_CHUNK_SIZE', 2000))
+       if result['errors']:
+           return Response({'error': ' '.join(result['errors'])}, status=status.HTTP_400_BAD_REQUEST)
+       return Response({'status': 'courses updated', 'enrolled': result['enrolled'], 'unenrolled': result['unenrolled']}, status=status.HTTP_200_OK)
 
 
+   @action(detail=True, methods=['get'], url_path='marks')
    @handle_exceptions
    def get_student_marks(self, request, *args, **kwargs):
        student = self.get_object()
@@ -245,50 +320,62 @@ class StudentViewSet(viewsets.ModelViewSet):
        return Response(marks, status=status.HTTP_200_OK)
 
 
+   @action(detail=False, methods=['get'], url_path='high-achievers')
    @handle_exceptions
    def get_high_achievers(self, request, *args, **kwargs):
-       high_achievers = Student.objects.filter(studentcourse__marks__gte=90).distinct()
-       serializer = self.get_serializer(high_achievers, many=True)
-       return Response(serializer.data, status=status.HTTP_200_OK)
+       # Students whose average across their graded courses is 90 or more, best
+       # first. This used to mean any single mark >= 90; the average is what the
+       # global leaderboard ranks by, and one strong course no longer qualifies.
+       entries = leaderboard.global_top(_leaderboard_limit(request), min_average=90)
+       return Response(leaderboard.describe(entries, 'average_marks'), status=status.HTTP_200_OK)
 
 
+   @action(detail=False, methods=['get'], url_path='recent')
    @handle_exceptions
    def get_recent_students(self, request, *args, **kwargs):
-       recent_students = Student.objects.filter(person__date_joined__gte=F('person__date_joined') - timedelta(days=30))
-       serializer = self.get_serializer(recent_students, many=True)
-       return Response(serializer.data, status=status.HTTP_200_OK)
+       return _recent_response(self, request, Student.objects.all(), 'created_at')
+
+
+   @action(detail=False, methods=['get'], url_path='activity')
+   @handle_exceptions
+   def get_student_activity(self, request, *args, **kwargs):
+       return _activity_response(request, Student.objects.all(), 'created_at')
 
 
+   @action(detail=False, methods=['get'], url_path='top')
    @handle_exceptions
    def get_top_students(self, request, *args, **kwargs):
-       students = Student.objects.annotate(
-           high_achiever=Case(
-               When(studentcourse__marks__gte=85, then=Value(True)),
-               default=Value(False),
-               output_field=models.BooleanField(),
-           )
-       ).filter(high_achiever=True)
-       serializer = self.get_serializer(students, many=True)
-       return Response(serializer.data)
+       entries = leaderboard.global_top(_leaderboard_limit(request))
+       return Response(leaderboard.describe(entries, 'average_marks'), status=status.HTTP_200_OK)
+
+
+   @action(detail=True, methods=['get'], url_path='rank')
+   @handle_exceptions
+   def get_student_rank(self, request, pk=None, *args, **kwargs):
+       ranking = leaderboard.global_rank(int(pk))
+       if ranking is None:
+           return Response({'error': 'Student has no marks'}, status=status.HTTP_404_NOT_FOUND)
+       return Response(ranking, status=status.HTTP_200_OK)
 
 
 
 
-@method_decorator(cache_page(CACHE_TTL), name='dispatch')
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
    serializer_class = CourseSerializer
-   pagination_class = StandardResultsSetPagination
+   pagination_class = StandardCursorPagination
+   cursor_ordering = ('name', 'id')
 
 
    def get_queryset(self):
-       return Course.objects.select_related('instructor').prefetch_related('students', 'reviews').filter(instructor__salary__gte=50000).exclude(description='Deprecated Course').order_by('name')[:10]
+       return plan_queryset(catalog.queryset(), self.get_serializer_class())
 
 
    @handle_exceptions
    def list(self, request, *args, **kwargs):
-       queryset = self.get_queryset()
-       serializer = self.get_serializer(queryset, many=True)
-       return Response(serializer.data)
+       # JSON pages come straight from the in-memory catalog snapshot.
+       if getattr(settings, 'CATALOG_SNAPSHOT_ENABLED', True) and request.accepted_renderer.format == 'json':
+           return catalog.list_response(request, self.paginator)
+       return super().list(request, *args, **kwargs)
 
 
    @handle_exceptions
@@ -315,64 +402,156 @@ class CourseViewSet(viewsets.ModelViewSet):
        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+   @action(detail=True, methods=['put'], url_path='students')
    @handle_exceptions
-   def retrieve(self, request, *args, **kwargs):
-       instance = self.get_object()
-       enrollments_count = instance.enrollments.count() 
-       latest_enrollment = instance.enrollments.latest('enrollment_date') 
-       instance.full_clean()  
-       instance.save()
-       return super().retrieve(request, *args, **kwargs)
-
-
-   @handle_exceptions
+   @serialize_writes
    def update_students(self, request, *args, **kwargs):
        course = self.get_object()
        students_data = request.data.get('students', [])
-       course.students.set(students_data)
-       course.save()
-       return Response({'status': 'students updated'}, status=status.HTTP_200_OK)
+       try:
+           student_ids = [int(student_id) for student_id in students_data]
+       except (TypeError, ValueError):
+           return Response({'error': 'students must be a list of student ids'}, status=status.HTTP_400_BAD_REQUEST)
+       result = set_students(course.pk, student_ids, chunk_size=getattr(settings, 'BULK_ENROLLMENT_CHUNK_SIZE', 2000))
+       if result['errors']:
+           return Response({'error': ' '.join(result['errors'])}, status=status.HTTP_400_BAD_REQUEST)
+       return Response({'status': 'students updated', 'enrolled': result['enrolled'], 'unenrolled': result['unenrolled']}, status=status.HTTP_200_OK)
 
 
+   @action(detail=True, methods=['get'], url_path='statistics')
    @handle_exceptions
    def get_course_statistics(self, request, *args, **kwargs):
        course = self.get_object()
-       statistics = course.reviews.aggregate(Avg('rating'), Min('rating'), Max('rating'), Sum('rating'))
-       return Response(statistics, status=status.HTTP_200_OK)
+       return Response(course.course_stats.as_statistics(), status=status.HTTP_200_OK)
 
 
+   @action(detail=True, methods=['get'], url_path='gradebook')
    @handle_exceptions
-   def get_top_students(self, request, *args, **kwargs):
+   def export_gradebook(self, request, *args, **kwargs):
+       course = self.get_object()
+       export_format = request.query_params.get('export_format', 'csv')
+       if export_format not in EXPORT_FORMATS:
+           return Response({'error': f'export_format must be one of {", ".join(EXPORT_FORMATS)}'}, status=status.HTTP_400_BAD_REQUEST)
+       return gradebook_response(course_gradebook(course), export_format, f'course-{course.pk}-gradebook')
+
+
+   @export_gradebook.mapping.post
+   @handle_exceptions
+   @serialize_writes
+   def import_gradebook(self, request, *args, **kwargs):
+       course = self.get_object()
+       if 'file' in request.FILES:
+           rows = read_csv_rows(request.FILES['file'])
+       else:
+           rows = request.data.get('marks') if isinstance(request.data, dict) else request.data
+       if not isinstance(rows, list):
+           return Response({'error': 'Upload a CSV file or send a list of {"student", "marks"} objects'}, status=status.HTTP_400_BAD_REQUEST)
+       result = import_marks(course, rows, chunk_size=getattr(settings, 'GRADEBOOK_IMPORT_CHUNK_SIZE', 2000))
+       return Response(result, status=status.HTTP_200_OK)
+
+
+   @action(detail=True, methods=['get'], url_path='top-students')
+   @handle_exceptions
+   def get_top_students(self, request, pk=None, *args, **kwargs):
+       entries = leaderboard.course_top(int(pk), _leaderboard_limit(request))
+       return Response(leaderboard.describe(entries, 'marks'), status=status.HTTP_200_OK)
+
+
+   @action(detail=True, methods=['get'], url_path='rank')
+   @handle_exceptions
+   def get_student_rank(self, request, pk=None, *args, **kwargs):
+       try:
+           student_id = int(request.query_params['student'])
+       except (KeyError, ValueError):
+           return Response({'error': 'student query parameter must be a student id'}, status=status.HTTP_400_BAD_REQUEST)
+       ranking = leaderboard.course_rank(int(pk), student_id)
+       if ranking is None:
+           return Response({'error': 'Student has no marks in this course'}, status=status.HTTP_404_NOT_FOUND)
+       return Response(ranking, status=status.HTTP_200_OK)
+
+
+   @action(detail=True, methods=['get'], url_path='also-took')
+   @handle_exceptions
+   def get_also_took(self, request, pk=None, *args, **kwargs):
+       # Courses most often taken by this course's students.
        course = self.get_object()
-       top_students = course.students.filter(studentcourse__marks__gte=85).order_by('-studentcourse__marks')
-       serializer = self.get_serializer(top_students, many=True)
-       return Response(serializer.data, status=status.HTTP_200_OK)
+       pairs = coenrollment.also_took(course.pk, _leaderboard_limit(request))
+       names = dict(Course.objects.filter(pk__in=[course_id for course_id, _ in pairs]).values_list('pk', 'name'))
+       results = [{'course': course_id, 'name': names.get(course_id), 'students': count} for course_id, count in pairs]
+       return Response({'course': course.pk, 'results': results}, status=status.HTTP_200_OK)
 
 
+   @action(detail=True, methods=['get'], url_path='similar')
+   @handle_exceptions
+   def get_similar_courses(self, request, pk=None, *args, **kwargs):
+       # Courses ranked by overlap of their student sets (?metric=cosine|jaccard).
+       metric = request.query_params.get('metric', 'cosine')
+       if metric not in coenrollment.METRICS:
+           return Response({'error': f'metric must be one of {", ".join(coenrollment.METRICS)}'}, status=status.HTTP_400_BAD_REQUEST)
+       course = self.get_object()
+       scored = coenrollment.similar(course.pk, _leaderboard_limit(request), metric)
+       names = dict(Course.objects.filter(pk__in=[course_id for course_id, _, _ in scored]).values_list('pk', 'name'))
+       results = [
+           {'course': course_id, 'name': names.get(course_id), 'score': score, 'shared_students': count}
+           for course_id, score, count in scored
+       ]
+       return Response({'course': course.pk, 'metric': metric, 'results': results}, status=status.HTTP_200_OK)
+
+
+   @action(detail=False, methods=['get'], url_path='marks-report', permission_classes=[IsAdminUser])
+   @handle_exceptions
+   def get_marks_report(self, request, *args, **kwargs):
+       # Marks statistics per course, term or course and term (?group=), all time
+       # unless ?since=/?until= are given; ?course=1,2 restricts the courses.
+       if analytics.np is None:
+           return Response({'error': 'Marks reports require NumPy.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+       group = request.query_params.get('group', 'course')
+       if group not in analytics.MARKS_GROUPS:
+           return Response({'error': f'group must be one of {", ".join(analytics.MARKS_GROUPS)}'}, status=status.HTTP_400_BAD_REQUEST)
+       try:
+           course_ids = [int(value) for value in request.query_params.get('course', '').split(',') if value]
+       except ValueError:
+           return Response({'error': 'course must be a comma separated list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+       try:
+           since = until = None
+           if 'since' in request.query_params or 'until' in request.query_params:
+               since, until = activity.parse_window(request.query_params)
+               since = timezone.localdate(since)
+               until = None if until is None else timezone.localdate(until - timedelta(microseconds=1)) + timedelta(days=1)
+       except ValueError as e:
+           return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+       results = analytics.marks_report(group, course_ids, since, until)
+       return Response({'group': group, 'since': since, 'until': until, 'results': results}, status=status.HTTP_200_OK)
+
+
+   @action(detail=False, methods=['get'], url_path='recent')
    @handle_exceptions
    def get_recent_courses(self, request, *args, **kwargs):
-       recent_courses = Course.objects.filter(created_at__gte=F('created_at') - timedelta(days=30))
-       serializer = self.get_serializer(recent_courses, many=True)
-       return Response(serializer.data, status=status.HTTP_200_OK)
+       return _recent_response(self, request, Course.objects.all(), 'created_at')
+
 
+   @action(detail=False, methods=['get'], url_path='activity')
+   @handle_exceptions
+   def get_course_activity(self, request, *args, **kwargs):
+       return _activity_response(request, Course.objects.all(), 'created_at')
 
 
 
-@method_decorator(cache_page(CACHE_TTL), name='dispatch')
-class ModuleViewSet(viewsets.ModelViewSet):
+
+class ModuleViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
    serializer_class = ModuleSerializer
-   pagination_class = StandardResultsSetPagination
+   pagination_class = StandardCursorPagination
+   cursor_ordering = ('-name', '-id')
 
 
    def get_queryset(self):
-       return Module.objects.select_related('course').filter(course__name='Mathematics').order_by('-name')[:10]
+       queryset = Module.objects.filter(course__name='Mathematics')
+       return plan_queryset(queryset, self.get_serializer_class())
 
 
    @handle_exceptions
    def list(self, request, *args, **kwargs):
-       queryset = self.get_queryset()
-       serializer = self.get_serializer(queryset, many=True)
-       return Response(serializer.data)
+       return super().list(request, *args, **kwargs)
 
 
    @handle_exceptions
@@ -401,34 +580,33 @@ class ModuleViewSet(viewsets.ModelViewSet):
 
 
 
-@method_decorator(cache_page(CACHE_TTL), name='dispatch')
-class EnrollmentViewSet(viewsets.ModelViewSet):
+class EnrollmentViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
    serializer_class = EnrollmentSerializer
-   pagination_class = StandardResultsSetPagination
+   pagination_class = StandardCursorPagination
+   cursor_ordering = ('-enrollment_date', 'id')
 
 
    def get_queryset(self):
-       return Enrollment.objects.select_related('student', 'course').filter(course__name='Mathematics').order_by('-enrollment_date')[:5]
+       queryset = Enrollment.objects.filter(course__name='Mathematics')
+       return plan_queryset(queryset, self.get_serializer_class())
 
 
    @handle_exceptions
    def list(self, request, *args, **kwargs):
-       queryset = self.get_queryset()
-       serializer = self.get_serializer(queryset, many=True)
-       return Response(serializer.data)
+       return super().list(request, *args, **kwargs)
 
 
    @handle_exceptions
+   @serialize_writes
    @transaction.atomic
    def create(self, request, *args, **kwargs):
-       enrollment, created = Enrollment.objects.get_or_create(
-           student_id=request.data['student'],
-           course_id=request.data['course']
-       )
-       if not created:
+       # The bulk path with one row: writes the Enrollment and StudentCourse rows together.
+       result, = bulk_enroll([{'student': request.data['student'], 'course': request.data['course']}])
+       if result['status'] == ALREADY_ENROLLED:
            return Response({'error': 'This enrollment already exists'}, status=status.HTTP_400_BAD_REQUEST)
-       enrollment.full_clean()  
-       enrollment.save()
+       if result['status'] != CREATED:
+           return Response({'error': result['error']}, status=status.HTTP_400_BAD_REQUEST)
+       enrollment = plan_queryset(Enrollment.objects.all(), self.get_serializer_class()).get(student_id=result['student'], course_id=result['course'])
 
 
        def post_commit():
@@ -443,40 +621,71 @@ class EnrollmentViewSet(viewsets.ModelViewSet):
 
 
    @handle_exceptions
-   def retrieve(self, request, *args, **kwargs):
-       instance = self.get_object()
-       instance.full_clean()  
-       instance.save() 
-       return super().retrieve(request, *args, **kwargs)
+   def update(self, request, *args, **kwargs):
+       # Moving an enrollment would leave its StudentCourse row behind.
+       if 'student' in request.data or 'course' in request.data:
+           return Response({'error': 'The student and course of an enrollment cannot be changed; delete it and enroll again'}, status=status.HTTP_400_BAD_REQUEST)
+       return super().update(request, *args, **kwargs)
+
+
+   @handle_exceptions
+   @serialize_writes
+   def destroy(self, request, *args, **kwargs):
+       return super().destroy(request, *args, **kwargs)
+
 
+   def perform_destroy(self, instance):
+       # Both rows go, or reconcile_enrollments would restore the Enrollment from its marks.
+       unenroll([(instance.student_id, instance.course_id)])
 
+
+   @action(detail=False, methods=['post'], url_path='bulk')
+   @handle_exceptions
+   @serialize_writes
+   def bulk_create(self, request, *args, **kwargs):
+       rows = request.data.get('enrollments') if isinstance(request.data, dict) else request.data
+       if not isinstance(rows, list):
+           return Response({'error': 'Expected a list of {"student", "course"} objects'}, status=status.HTTP_400_BAD_REQUEST)
+       max_rows = getattr(settings, 'BULK_ENROLLMENT_MAX_ROWS', 50000)
+       if len(rows) > max_rows:
+           return Response({'error': f'At most {max_rows} enrollments per request'}, status=status.HTTP_400_BAD_REQUEST)
+       results = bulk_enroll(rows, chunk_size=getattr(settings, 'BULK_ENROLLMENT_CHUNK_SIZE', 2000))
+       summary = Counter(result['status'] for result in results)
+       return Response({'summary': summary, 'results': results}, status=status.HTTP_200_OK)
+
+
+   @action(detail=False, methods=['get'], url_path='recent')
    @handle_exceptions
    def get_recent_enrollments(self, request, *args, **kwargs):
-       recent_enrollments = Enrollment.objects.filter(enrollment_date__gte=F('enrollment_date') - timedelta(days=30))
-       serializer = self.get_serializer(recent_enrollments, many=True)
-       return Response(serializer.data, status=status.HTTP_200_OK)
+       return _recent_response(self, request, Enrollment.objects.all(), 'enrollment_date', date_only=True)
+
 
+   @action(detail=False, methods=['get'], url_path='activity')
+   @handle_exceptions
+   def get_enrollment_activity(self, request, *args, **kwargs):
+       return _activity_response(request, Enrollment.objects.all(), 'enrollment_date', date_only=True)
 
 
 
-@method_decorator(cache_page(CACHE_TTL), name='dispatch')
-class ReviewViewSet(viewsets.ModelViewSet):
+
+class ReviewViewSet(ConditionalRetrieveMixin, viewsets.ModelViewSet):
    serializer_class = ReviewSerializer
-   pagination_class = StandardResultsSetPagination
+   pagination_class = StandardCursorPagination
+   cursor_ordering = ('-rating', 'id')
 
 
    def get_queryset(self):
-       return Review.objects.select_related('course', 'student').filter(rating__gte=4).exclude(comment__isnull=True).order_by('-rating')[:10]
+       queryset = Review.objects.filter(rating__gte=4).exclude(comment__isnull=True)
+       return plan_queryset(queryset, self.get_serializer_class())
 
 
    @handle_exceptions
    def list(self, request, *args, **kwargs):
-       queryset = self.get_queryset()
-       serializer = self.get_serializer(queryset, many=True)
-       return Response(serializer.data)
+       return super().list(request, *args, **kwargs)
 
 
    @handle_exceptions
+   @serialize_writes
    @transaction.atomic
    def create(self, request, *args, **kwargs):
        review, created = Review.objects.get_or_create(
@@ -501,14 +710,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-   @handle_exceptions
-   def retrieve(self, request, *args, **kwargs):
-       instance = self.get_object()
-       instance.full_clean() 
-       instance.save()  
-       return super().retrieve(request, *args, **kwargs)
-
-
+   @action(detail=False, methods=['get'], url_path='statistics')
    @handle_exceptions
    def get_review_statistics(self, request, *args, **kwargs):
        reviews = Review.objects.all()
@@ -516,11 +718,67 @@ class ReviewViewSet(viewsets.ModelViewSet):
        return Response(statistics, status=status.HTTP_200_OK)
 
 
+   @action(detail=False, methods=['get'], url_path='recent')
    @handle_exceptions
    def get_recent_reviews(self, request, *args, **kwargs):
-       recent_reviews = Review.objects.filter(created_at__gte=F('created_at') - timedelta(days=30))
-       serializer = self.get_serializer(recent_reviews, many=True)
-       return Response(serializer.data, status=status.HTTP_200_OK)
+       return _recent_response(self, request, Review.objects.all(), 'created_at')
+
+
+   @action(detail=False, methods=['get'], url_path='activity')
+   @handle_exceptions
+   def get_review_activity(self, request, *args, **kwargs):
+       return _activity_response(request, Review.objects.all(), 'created_at')
+
+
+
+
+
+
+
+class SearchView(APIView):
+   # GET /api/search/?q=intro algeb*&type=course,module&page=2
+   page_size = 20
+   max_page_size = 100
+
+
+   @handle_exceptions
+   def get(self, request, *args, **kwargs):
+       query = request.query_params.get('q', '').strip()
+       if not query:
+           return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+       types = request.query_params.get('type')
+       types = [doc_type for doc_type in types.split(',') if doc_type] if types else None
+       if types and not set(types) <= set(search.DOCUMENT_TYPES):
+           return Response({'error': f'type must be among {", ".join(search.DOCUMENT_TYPES)}'}, status=status.HTTP_400_BAD_REQUEST)
+       try:
+           page = max(1, int(request.query_params.get('page', 1)))
+           page_size = max(1, min(int(request.query_params.get('page_size', self.page_size)), self.max_page_size))
+       except ValueError:
+           return Response({'error': 'page and page_size must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+       # One extra hit tells whether there is a next page without counting matches.
+       results, ranked = search.search(query, types, limit=page_size + 1, offset=(page - 1) * page_size)
+       url = request.build_absolute_uri()
+       return Response({
+           'ordering': 'relevance' if ranked else 'newest',
+           'next': replace_query_param(url, 'page', page + 1) if len(results) > page_size else None,
+           'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+           'results': results[:page_size],
+       }, status=status.HTTP_200_OK)
+
+
+class MetricsView(APIView):
+   # Prometheus text exposition of this process's request metrics.
+   permission_classes = [IsAdminUser]
+
+
+   def get(self, request, *args, **kwargs):
+       return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 
+class CacheStatsView(APIView):
+   permission_classes = [IsAdminUser]
 
 
+   def get(self, request, *args, **kwargs):
+       return Response(object_cache.stats(), status=status.HTTP_200_OK)
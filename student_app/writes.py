@@ -0,0 +1,38 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# SQLite has a single writer. Threads of one process that write at the same
+# time otherwise all start a transaction and poll the busy handler until the
+# lock frees up; queuing them on a process-wide lock instead hands the write
+# lock over in turn. Other processes still wait on busy_timeout.
+_lock = threading.RLock()
+
+
+def _enabled(using):
+    return getattr(settings, 'SQLITE_SERIALIZE_WRITES', False) and connections[using].vendor == 'sqlite'
+
+
+@contextmanager
+def serialized(using=DEFAULT_DB_ALIAS):
+    # Inside an open transaction this thread may already hold the database
+    # lock; waiting for another thread here could only deadlock.
+    if not _enabled(using) or connections[using].in_atomic_block:
+        yield
+        return
+    with _lock:
+        yield
+
+
+def serialize_writes(func):
+    # For view methods; goes above @transaction.atomic so the lock is taken
+    # before the transaction begins.
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with serialized():
+            return func(*args, **kwargs)
+    return wrapper